@@ -0,0 +1,440 @@
+"""
+Benchmarks for the ingestion -> scoring -> API hot paths.
+
+Each benchmark records the median and 95th-percentile wall time of repeated
+runs (and a throughput where it makes sense) into a JSON results file. If a
+baseline file exists, every benchmark is compared against it and the run
+exits non-zero when one is slower than the baseline by more than the
+tolerance, so it can gate a deploy.
+
+The startup group imports the API in a fresh interpreter and checks it
+against an import-time budget, and that none of the libraries that are
+meant to load lazily (spacepy, scikit-learn, TensorFlow, shap) were pulled
+in by the import; either failure also exits non-zero.
+
+Benchmarks whose optional dependencies are missing (spacepy for CDF files,
+TensorFlow for the VAE, shap for explanations) are reported as skipped.
+
+Usage:
+    python benchmarks/run_benchmarks.py                       # run and compare
+    python benchmarks/run_benchmarks.py --save-baseline       # record a new baseline
+    python benchmarks/run_benchmarks.py --quick --only api    # subset, smaller sizes
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(ROOT, 'src'))
+sys.path.append(os.path.join(ROOT, 'deployment', 'api'))
+
+DEFAULT_RESULTS_PATH = os.path.join(ROOT, 'benchmarks', 'results', 'latest.json')
+DEFAULT_BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'results', 'baseline.json')
+
+# Libraries only specific subsystems need; importing the API must not load them
+LAZY_MODULES = ('spacepy', 'sklearn', 'tensorflow', 'shap')
+
+
+class Skip(Exception):
+    """Raised by a benchmark whose optional dependencies are unavailable."""
+
+
+def measure(fn, repeat: int = 5, warmup: int = 1, items: int = None) -> dict:
+    """
+    Times `fn` over several runs.
+
+    Args:
+        fn: Zero-argument callable to time.
+        repeat: Number of timed runs.
+        warmup: Untimed runs first, to populate caches.
+        items: Rows (or requests) processed per run, to report throughput.
+
+    Returns:
+        Dict with median/p95/min seconds and, if `items` is given, items per second.
+    """
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return _summarize(times, items)
+
+
+def _summarize(times, items=None) -> dict:
+    times = np.asarray(times)
+    result = {
+        'median_s': float(np.median(times)),
+        'p95_s': float(np.percentile(times, 95)),
+        'min_s': float(times.min()),
+        'runs': int(len(times)),
+    }
+    if items:
+        result['items_per_s'] = items / result['median_s']
+    return result
+
+
+def bench_cdf_loading(sizes):
+    """load_cdf_to_dataframe on generated CDF files of several sizes."""
+    try:
+        from spacepy import pycdf
+        from pigade.data_processing.loaders import load_cdf_to_dataframe
+    except ImportError as e:
+        raise Skip(f"spacepy unavailable: {e}")
+    from pigade.data_processing.synthetic import generate_solar_wind
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, hours in sizes.items():
+            df = generate_solar_wind(hours=hours, rng=np.random.default_rng(0))
+            path = os.path.join(tmp, f'{label}.cdf')
+            with pycdf.CDF(path, '') as cdf:
+                cdf['Epoch'] = df.index.to_pydatetime()
+                for col in df.columns:
+                    cdf[col] = df[col].to_numpy()
+            results[f'cdf_load[{label}]'] = measure(lambda: load_cdf_to_dataframe(path), items=len(df))
+    return results
+
+
+def bench_pipeline(sizes):
+    """DataService.process_data_pipeline over 1-minute data of several lengths."""
+    from data_service import DataService
+    from pigade.data_processing.synthetic import generate_solar_wind
+
+    results = {}
+    for label, hours in sizes.items():
+        df = generate_solar_wind(hours=hours, rng=np.random.default_rng(0))
+        service = DataService()
+        results[f'pipeline[{label}]'] = measure(lambda: service.process_data_pipeline(df),
+                                                repeat=3, items=len(df))
+    return results
+
+
+def bench_cleaning(hours: int):
+    """The cleaning stage on 5-second SWIS-cadence data, with and without the Kalman filter."""
+    import pandas as pd
+    from pigade.data_processing.preprocessing import clean_solar_wind
+    from pigade.data_processing.synthetic import generate_solar_wind
+
+    # Generated per minute, then relabelled to 5 s so the series spans `hours`
+    df = generate_solar_wind(hours=hours * 12, rng=np.random.default_rng(0))
+    df.index = pd.date_range(end=df.index[-1], periods=len(df), freq='5s', name='timestamp')
+    results = {}
+    for label, kalman in (('despike+hampel', False), ('despike+hampel+kalman', True)):
+        result = measure(lambda: clean_solar_wind(df, kalman=kalman), repeat=3, items=len(df))
+        # Seconds of 5 s data cleaned per second of wall time
+        result['realtime_factor'] = result['items_per_s'] * 5
+        results[f'clean[{label}]'] = result
+    return results
+
+
+def bench_api(concurrency: int, requests_per_endpoint: int):
+    """
+    Per-request latency of every GET endpoint under concurrent in-process load.
+
+    Each endpoint is measured twice. 'cached' repeats the same request, so
+    endpoints with a response cache serve hits after the first; 'uncached'
+    runs with a cache that retains nothing, so each response is built and
+    serialized again, as on the first request after a pipeline run. The
+    share of cache hits observed is reported with each.
+    """
+    try:
+        import httpx
+        import main
+        from pigade.utils.instrumentation import registry
+        from response_cache import ResponseCache
+    except ImportError as e:
+        raise Skip(f"API dependencies unavailable: {e}")
+
+    endpoints = [
+        '/api/system-metrics',
+        '/api/data-pipeline/metrics',
+        '/api/data-pipeline/steps',
+        '/api/anomaly-detection/metrics',
+        '/api/anomaly-detection/current-score',
+        '/api/anomaly-detection/recent',
+        '/api/anomaly-detection/threshold/what-if?threshold=0.5',
+        '/api/real-time/data?hours=1',
+        '/api/real-time/data?hours=24',
+        '/api/model/status',
+        '/api/xai/explanation/1',
+    ]
+
+    def cache_counts():
+        return (registry.sum_counter('api_cache_requests_total', result='hit'),
+                registry.sum_counter('api_cache_requests_total', result='miss'))
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            # Warm the data service so the first endpoint does not pay for loading
+            await client.get('/api/real-time/data?hours=1')
+            results = {}
+            for endpoint in endpoints:
+                for variant, cache in (('cached', main.response_cache), ('uncached', ResponseCache(0, 0))):
+                    latencies = []
+                    semaphore = asyncio.Semaphore(concurrency)
+
+                    async def one():
+                        async with semaphore:
+                            started = time.perf_counter()
+                            response = await client.get(endpoint)
+                            latencies.append(time.perf_counter() - started)
+                            response.raise_for_status()
+
+                    served_cache, main.response_cache = main.response_cache, cache
+                    hits, misses = cache_counts()
+                    started = time.perf_counter()
+                    try:
+                        await asyncio.gather(*(one() for _ in range(requests_per_endpoint)))
+                    finally:
+                        main.response_cache = served_cache
+                    elapsed = time.perf_counter() - started
+                    new_hits, new_misses = cache_counts()
+                    result = _summarize(latencies)
+                    result['items_per_s'] = requests_per_endpoint / elapsed
+                    lookups = (new_hits - hits) + (new_misses - misses)
+                    # None for endpoints without a response cache
+                    result['cache_hit_ratio'] = (new_hits - hits) / lookups if lookups else None
+                    results[f'api_{variant}[{endpoint}]'] = result
+            return results
+
+    return asyncio.run(run())
+
+
+def bench_startup(runs: int):
+    """Cold `import main` time of the API in a fresh interpreter, with the slowest imports."""
+    api_dir = os.path.join(ROOT, 'deployment', 'api')
+    probe = f"import json, sys, main; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+
+    times, eager = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-W', 'ignore', '-c', probe], cwd=api_dir,
+                                   capture_output=True, text=True)
+        times.append(time.perf_counter() - started)
+        if completed.returncode != 0:
+            raise Skip(f"API import failed: {completed.stderr.strip().splitlines()[-1:]}")
+        eager = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    # -X importtime reports per-module self/cumulative microseconds on stderr
+    completed = subprocess.run([sys.executable, '-W', 'ignore', '-X', 'importtime', '-c', 'import main'],
+                               cwd=api_dir, capture_output=True, text=True)
+    modules = []
+    for line in completed.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            # Nesting is shown as two spaces of indentation per level
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            if cumulative.strip().isdigit() and depth <= 1:
+                modules.append((int(cumulative) / 1e6, name.strip()))
+
+    result = _summarize(times)
+    result['eager_modules'] = eager
+    result['slowest_imports'] = {name: seconds for seconds, name in sorted(modules, reverse=True)[:10]}
+    return {'api_import': result}
+
+
+def bench_vae(rows: int):
+    """VAE fit and predict throughput on random data."""
+    try:
+        from pigade.models.vae import VAE
+    except ImportError as e:
+        raise Skip(f"TensorFlow unavailable: {e}")
+
+    data = np.random.default_rng(0).random((rows, 10)).astype('float32')
+    vae = VAE(original_dim=10, latent_dim=2, intermediate_dim=64)
+    vae.compile(optimizer='adam', loss='mse')
+    return {
+        'vae_fit[1 epoch]': measure(lambda: vae.fit(data, data, epochs=1, batch_size=256, verbose=0),
+                                    repeat=3, items=rows),
+        'vae_predict': measure(lambda: vae.predict(data, batch_size=4096, verbose=0), items=rows),
+    }
+
+
+def bench_runtime(rows: int):
+    """Reconstruction-error scoring with the NumPy runtimes at each precision, and Keras if available."""
+    from pigade.models.runtime import PRECISIONS, NumpyTemporalVAE, NumpyVAE, quantize_weights
+
+    rng = np.random.default_rng(0)
+    shapes = {'encoder/hidden': (5, 64), 'encoder/z_mean': (64, 2), 'encoder/z_log_var': (64, 2),
+              'decoder/hidden': (2, 64), 'decoder/output': (64, 5)}
+    weights = {}
+    for name, (fan_in, fan_out) in shapes.items():
+        weights[f'{name}/kernel'] = rng.normal(0, fan_in ** -0.5, (fan_in, fan_out)).astype('float32')
+        weights[f'{name}/bias'] = np.zeros(fan_out, dtype='float32')
+    data = rng.random((rows, 5)).astype('float32')
+
+    results = {}
+    for precision in PRECISIONS:
+        runtime = NumpyVAE(quantize_weights(weights, precision), precision)
+        results[f'score_runtime[{precision}]'] = measure(lambda: runtime.reconstruction_error(data), items=rows)
+
+    # Temporal model: a whole sequence, and the cost of one new minute with carried state
+    units = 32
+    temporal = {
+        'encoder/gru/kernel': rng.normal(0, 5 ** -0.5, (5, 3 * units)),
+        'encoder/gru/recurrent_kernel': rng.normal(0, units ** -0.5, (units, 3 * units)),
+        'encoder/gru/bias': np.zeros((2, 3 * units)),
+        'encoder/z_mean/kernel': rng.normal(0, units ** -0.5, (units, 2)),
+        'encoder/z_mean/bias': np.zeros(2),
+        'decoder/hidden/kernel': rng.normal(0, 2 ** -0.5, (2, units)),
+        'decoder/hidden/bias': np.zeros(units),
+        'decoder/output/kernel': rng.normal(0, units ** -0.5, (units, 5)),
+        'decoder/output/bias': np.zeros(5),
+    }
+    runtime = NumpyTemporalVAE({name: value.astype('float32') for name, value in temporal.items()})
+    sequence = data[:min(rows, 10_000)]
+    results['score_runtime[temporal sequence]'] = measure(lambda: runtime.run(sequence), repeat=3,
+                                                          items=len(sequence))
+    _, state = runtime.run(sequence[:100])
+    results['score_runtime[temporal step]'] = measure(lambda: runtime.run(sequence[:1], state), repeat=200, items=1)
+    try:
+        from pigade.models.vae import VAE
+    except ImportError:
+        return results
+    vae = VAE(original_dim=5, latent_dim=2, intermediate_dim=64)
+
+    def keras_score():
+        z_mean, _ = vae.encoder.predict(data, batch_size=4096, verbose=0)
+        return np.mean(np.square(data - vae.decoder.predict(z_mean, batch_size=4096, verbose=0)), axis=1)
+
+    results['score_runtime[keras]'] = measure(keras_score, items=rows)
+    return results
+
+
+def bench_explain(background_rows: int):
+    """explain_anomaly latency for one instance."""
+    try:
+        from pigade.models.vae import VAE
+        from pigade.xai.explainers import explain_anomaly
+    except ImportError as e:
+        raise Skip(f"TensorFlow/shap unavailable: {e}")
+
+    rng = np.random.default_rng(0)
+    background = rng.random((background_rows, 5)).astype('float32')
+    instance = rng.random((1, 5)).astype('float32')
+    vae = VAE(original_dim=5, latent_dim=2, intermediate_dim=8)
+    vae.compile(optimizer='adam', loss='mse')
+    vae.fit(background, background, epochs=1, verbose=0)
+    names = [f'feature_{i}' for i in range(5)]
+    return {'explain_anomaly': measure(lambda: explain_anomaly(vae, background, instance, names),
+                                       repeat=3, warmup=0)}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Returns (name, ratio) for every benchmark slower than baseline by more than `tolerance`."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference or 'median_s' not in result or 'median_s' not in reference:
+            continue
+        ratio = result['median_s'] / reference['median_s']
+        result['baseline_ratio'] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PIGADE-X hot paths")
+    parser.add_argument('--quick', action='store_true', help="Smaller sizes for a fast smoke run")
+    parser.add_argument('--only', action='append', default=[],
+                        help="Run only these groups (startup, cdf, pipeline, clean, api, vae, runtime, explain); repeatable")
+    parser.add_argument('--output', default=DEFAULT_RESULTS_PATH, help="Results JSON path")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument('--save-baseline', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed slowdown relative to baseline (0.2 = 20%%)")
+    parser.add_argument('--import-budget', type=float, default=1.5,
+                        help="Maximum median seconds to import the API in a fresh interpreter")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        sizes = {'1 day': 24, '1 week': 24 * 7}
+        groups = {
+            'startup': lambda: bench_startup(runs=3),
+            'cdf': lambda: bench_cdf_loading(sizes),
+            'pipeline': lambda: bench_pipeline(sizes),
+            'clean': lambda: bench_cleaning(hours=24),
+            'api': lambda: bench_api(concurrency=8, requests_per_endpoint=40),
+            'vae': lambda: bench_vae(rows=10_000),
+            'runtime': lambda: bench_runtime(rows=10_000),
+            'explain': lambda: bench_explain(background_rows=20),
+        }
+    else:
+        sizes = {'1 day': 24, '1 month': 24 * 30, '1 year': 24 * 365}
+        groups = {
+            'startup': lambda: bench_startup(runs=10),
+            'cdf': lambda: bench_cdf_loading(sizes),
+            'pipeline': lambda: bench_pipeline(sizes),
+            'clean': lambda: bench_cleaning(hours=24 * 7),
+            'api': lambda: bench_api(concurrency=32, requests_per_endpoint=200),
+            'vae': lambda: bench_vae(rows=100_000),
+            'runtime': lambda: bench_runtime(rows=100_000),
+            'explain': lambda: bench_explain(background_rows=50),
+        }
+
+    results, skipped = {}, {}
+    for group, run in groups.items():
+        if args.only and group not in args.only:
+            continue
+        print(f"Running {group} benchmarks...")
+        try:
+            results.update(run())
+        except Skip as e:
+            skipped[group] = str(e)
+            print(f"  skipped: {e}")
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.tolerance)
+    startup = results.get('api_import')
+    if startup and startup['median_s'] > args.import_budget:
+        regressions.append(('api_import (budget)', startup['median_s'] / args.import_budget))
+    if startup and startup['eager_modules']:
+        print(f"\nAPI import eagerly loaded: {', '.join(startup['eager_modules'])}")
+        regressions.append(('api_import (eager modules)', float(len(startup['eager_modules']))))
+
+    report = {
+        'generatedAt': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'cpus': os.cpu_count(),
+        'quick': args.quick,
+        'results': results,
+        'skipped': skipped,
+    }
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    print(f"\n{'benchmark':<60} {'median':>10} {'p95':>10} {'items/s':>12} {'vs base':>8}")
+    for name, result in results.items():
+        throughput = f"{result['items_per_s']:,.0f}" if 'items_per_s' in result else '-'
+        ratio = f"{result['baseline_ratio']:.2f}x" if 'baseline_ratio' in result else '-'
+        print(f"{name:<60} {result['median_s'] * 1000:>8.2f}ms {result['p95_s'] * 1000:>8.2f}ms "
+              f"{throughput:>12} {ratio:>8}")
+
+    if regressions:
+        print("\nRegressions beyond tolerance:")
+        for name, ratio in regressions:
+            print(f"  {name}: {ratio:.2f}x {'budget' if 'budget' in name else 'baseline'}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class Snapshot:
+    """Read-only view of one published version of the processed data"""
+
+    def __init__(self, version: int, features: pd.DataFrame, scores: pd.Series, metadata: Dict[str, Any],
+                 records: Optional[np.ndarray] = None):
+        self.version = version
+        self.features = features
+        self.scores = scores
+        self.metadata = metadata
+        # Structured per-sample records published alongside, if any
+        self.records = records
+
+
+class DataPlane:
+    """
+    Versioned, memory-mapped snapshots of the processed feature and score arrays.
+
+    One ingestion process publishes each pipeline result as a directory of
+    .npy files and then atomically repoints a CURRENT file at it. API workers
+    map the arrays read-only, so every worker shares the same physical pages
+    (put the root on tmpfs, e.g. /dev/shm, to keep them in memory) and
+    attaching to a new version costs a few system calls rather than a reload.
+    Old versions are unlinked after `keep` newer ones exist; workers still
+    mapping them keep their pages until they move on.
+
+    Settings that workers must agree on, such as the detection threshold,
+    live in a small JSON file next to the snapshots.
+    """
+
+    def __init__(self, root: str, keep: int = 3):
+        self.root = root
+        self.keep = keep
+        os.makedirs(root, exist_ok=True)
+        self._pointer = os.path.join(root, 'CURRENT')
+        self._settings = os.path.join(root, 'settings.json')
+        self._pointer_stat = None
+        self._pointer_version = 0
+        self._settings_stat = None
+        self._settings_cache: Dict[str, Any] = {}
+
+    def current_version(self) -> int:
+        """Latest published version, or 0 if nothing has been published yet"""
+        try:
+            stat = os.stat(self._pointer)
+        except FileNotFoundError:
+            return 0
+        # Only re-read the pointer when it was replaced
+        key = (stat.st_ino, stat.st_mtime_ns)
+        if key != self._pointer_stat:
+            with open(self._pointer) as f:
+                self._pointer_version = int(f.read().strip())
+            self._pointer_stat = key
+        return self._pointer_version
+
+    def publish(self, features: pd.DataFrame, scores: pd.Series, metadata: Dict[str, Any],
+                records: Optional[np.ndarray] = None) -> int:
+        """
+        Write a new snapshot and make it current; returns its version. `records`,
+        a structured array derived from the features and scores, is published
+        with them so workers map it instead of each rebuilding it.
+        """
+        version = self.current_version() + 1
+        final_dir = os.path.join(self.root, f'v{version:010d}')
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.root)
+
+        np.save(os.path.join(staging, 'index.npy'), features.index.asi8)
+        np.save(os.path.join(staging, 'features.npy'), np.ascontiguousarray(features.to_numpy(dtype=np.float64)))
+        np.save(os.path.join(staging, 'scores.npy'), scores.reindex(features.index).to_numpy(dtype=np.float64))
+        if records is not None:
+            np.save(os.path.join(staging, 'records.npy'), records)
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump({'columns': list(features.columns), **metadata}, f, default=str)
+        os.rename(staging, final_dir)
+
+        pointer_tmp = self._pointer + '.tmp'
+        with open(pointer_tmp, 'w') as f:
+            f.write(str(version))
+        os.replace(pointer_tmp, self._pointer)
+
+        self._prune(version)
+        return version
+
+    def attach(self, version: Optional[int] = None) -> Optional[Snapshot]:
+        """Map a snapshot read-only (the current one by default)"""
+        version = version or self.current_version()
+        if not version:
+            return None
+        directory = os.path.join(self.root, f'v{version:010d}')
+        with open(os.path.join(directory, 'meta.json')) as f:
+            metadata = json.load(f)
+
+        index = pd.DatetimeIndex(np.load(os.path.join(directory, 'index.npy')).view('datetime64[ns]'))
+        values = np.load(os.path.join(directory, 'features.npy'), mmap_mode='r')
+        scores = np.load(os.path.join(directory, 'scores.npy'), mmap_mode='r')
+        records_path = os.path.join(directory, 'records.npy')
+        records = np.load(records_path, mmap_mode='r') if os.path.exists(records_path) else None
+
+        features = pd.DataFrame(values, index=index, columns=metadata['columns'], copy=False)
+        return Snapshot(version, features, pd.Series(scores, index=index, name='anomaly_score', copy=False), metadata,
+                        records)
+
+    def read_settings(self) -> Dict[str, Any]:
+        """Shared settings, re-read only when the file was replaced"""
+        try:
+            stat = os.stat(self._settings)
+        except FileNotFoundError:
+            return {}
+        key = (stat.st_ino, stat.st_mtime_ns)
+        if key != self._settings_stat:
+            try:
+                with open(self._settings) as f:
+                    self._settings_cache = json.load(f)
+                self._settings_stat = key
+            except (FileNotFoundError, ValueError):
+                return {}
+        return self._settings_cache
+
+    def write_settings(self, **settings):
+        """Merge settings into the shared settings file atomically"""
+        merged = {**self.read_settings(), **settings}
+        tmp = self._settings + f'.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(merged, f)
+        os.replace(tmp, self._settings)
+
+    def _prune(self, version: int):
+        for name in os.listdir(self.root):
+            if name.startswith('v') and name[1:].isdigit() and int(name[1:]) <= version - self.keep:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
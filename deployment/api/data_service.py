@@ -1,17 +1,22 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 import sys
 from typing import List, Dict, Any, Optional, Tuple
 import json
+import threading
+import time
 
 # Add the src directory to the path to import PIGADE modules
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
 try:
     from pigade.data_processing.loaders import load_cdf_to_dataframe
-    from pigade.data_processing.preprocessing import handle_missing_values, resample_time_series, normalize_features
+    from pigade.data_processing.preprocessing import (handle_missing_values, resample_time_series, normalize_features,
+                                                      clean_solar_wind, StreamingCleaner, QC_MISSING, QC_SPIKE)
+    # Input samples after which later samples can still change a cleaned one
+    CLEANING_LAG = StreamingCleaner().lag
 except ImportError:
     # Fallback if PIGADE modules are not available
     print("Warning: PIGADE modules not available, using fallback implementations")
@@ -27,16 +32,108 @@ except ImportError:
     
     def normalize_features(df: pd.DataFrame) -> pd.DataFrame:
         return df
+    
+    QC_MISSING = 1
+    QC_SPIKE = 2
+    CLEANING_LAG = 0
+    
+    def clean_solar_wind(df: pd.DataFrame, kalman: bool = False) -> Tuple[pd.DataFrame, pd.Series]:
+        missing = df.isnull().any(axis=1).to_numpy()
+        return df, pd.Series(np.where(missing, QC_MISSING, 0).astype(np.uint8), index=df.index)
+
+from pigade.data_processing.features import add_derived_features
+from pigade.data_processing.synthetic import generate_solar_wind
+from pigade.detection.events import StreamingEventDetector, EventStore, CMEEvent
+from pigade.detection.scoring import calculate_anomaly_scores
+from pigade.detection.thresholds import ScoreIndex
+from pigade.models.registry import DEFAULT_THRESHOLDS, ModelRegistry
+from pigade.utils.instrumentation import registry, resident_memory_bytes
+from records import SAMPLE_DTYPE, Detection, sample_records
+
+# Columns at an event's peak that _extract_anomaly_features looks at
+ANOMALY_FEATURE_COLUMNS = ('proton_density', 'alpha_proton_ratio', 'proton_velocity', 'proton_temperature')
+
+class DetectionState:
+    """
+    The stored window, its scores, and the events and score index derived from
+    them. Built aside and swapped in as a whole, so a request sees either the
+    previous state or the next one, never a store being refilled.
+    """
+    __slots__ = ('features', 'scores', 'detector', 'store', 'index')
+    
+    def __init__(self, features: Optional[pd.DataFrame], scores: Optional[pd.Series],
+                 detector: StreamingEventDetector, store: EventStore, index: ScoreIndex):
+        self.features = features
+        self.scores = scores
+        self.detector = detector
+        self.store = store
+        self.index = index
 
 class DataService:
     """Service for handling real data processing and metrics calculation"""
     
     def __init__(self, data_dir: str = None):
         self.data_dir = data_dir or os.path.join(os.path.dirname(__file__), '..', '..', 'data')
-        self.current_data = None
+        # Bumped whenever current_data or the detections derived from it change
+        self.data_version = 0
+        # Set when attached read-only to a data plane published by an ingestion process
+        self.data_plane = None
+        self._plane_version = 0
+        self._plane_threshold = None
+        # Model the ingestion process scored the attached snapshot with (see model_info)
+        self._published_model = None
+        # Serializes the initial load between the warm-up task and early requests
+        self._load_lock = threading.Lock()
+        self.warmup_state = {'status': 'cold', 'startedAt': None, 'completedAt': None,
+                             'seconds': None, 'error': None}
         self.data_metrics = self._initialize_metrics()
         self.pipeline_status = self._initialize_pipeline_status()
-        
+        # Per-sample quality flags (preprocessing.QC_*) of the last cleaned input
+        self.quality_flags = None
+        # Run the Kalman filter in the cleaning stage (off by default: it lags sharp shock fronts)
+        self.kalman_smoothing = os.environ.get('PIGADE_KALMAN_SMOOTHING', '').lower() in ('1', 'true', 'yes')
+        # Structured-array view of current_data and anomaly_scores for the monitoring endpoints
+        self._sample_records = None
+        self._sample_records_source = None
+        self.threshold_hysteresis = 0.15
+        self.detection = DetectionState(None, None, StreamingEventDetector(
+            enter_threshold=DEFAULT_THRESHOLDS['enter'], exit_threshold=DEFAULT_THRESHOLDS['exit']
+        ), EventStore(), ScoreIndex())
+        # Serializes the writers of self.detection; readers take the reference lock-free
+        self._state_lock = threading.Lock()
+        self.evaluation_report_path = os.path.join(self.data_dir, 'evaluation', 'report.json')
+        self._evaluation_report = None
+        self._evaluation_report_mtime = None
+        # Scoring model; replaced as a whole on hot-swap, so readers holding the old one are unaffected
+        self.model_registry = ModelRegistry(os.path.join(self.data_dir, 'models', 'vae'))
+        self.model = None
+        self.model_stream = None
+        self.model_error = None
+        # Registry version last loaded or tried by load_current_model
+        self._model_requested = None
+        
+    @property
+    def current_data(self) -> Optional[pd.DataFrame]:
+        """The stored, processed window"""
+        return self.detection.features
+    
+    @property
+    def anomaly_scores(self) -> Optional[pd.Series]:
+        """Anomaly scores of the stored window"""
+        return self.detection.scores
+    
+    @property
+    def event_detector(self) -> StreamingEventDetector:
+        return self.detection.detector
+    
+    @property
+    def event_store(self) -> EventStore:
+        return self.detection.store
+    
+    @property
+    def score_index(self) -> ScoreIndex:
+        return self.detection.index
+    
     def _initialize_metrics(self) -> Dict[str, Any]:
         """Initialize data metrics"""
         return {
@@ -90,6 +187,12 @@ class DataService:
     
     def load_real_data(self) -> pd.DataFrame:
         """Load real data from CDF files or generate realistic solar wind data"""
+        with registry.timer('pipeline_stage_seconds', stage='load') as timing:
+            df = self._load_real_data()
+        self._record_stage('ingestion', 'load', df, timing['seconds'])
+        return df
+    
+    def _load_real_data(self) -> pd.DataFrame:
         try:
             # Try to load from actual CDF files first
             cdf_files = self._find_cdf_files()
@@ -127,8 +230,9 @@ class DataService:
                 print(f"Error loading {cdf_file}: {e}")
         
         if all_data:
-            combined_df = pd.concat(all_data, ignore_index=True)
-            combined_df = combined_df.sort_index()
+            # Keep the Epoch index so the time-based cleaning and resampling steps work
+            combined_df = pd.concat(all_data).sort_index()
+            combined_df = combined_df[~combined_df.index.duplicated(keep='first')]
             
             # Update metrics
             self.data_metrics['total_volume'] = total_size / (1024**3)  # Convert to GB
@@ -141,52 +245,7 @@ class DataService:
     
     def _generate_realistic_solar_wind_data(self, hours: int = 24) -> pd.DataFrame:
         """Generate realistic solar wind data based on known patterns"""
-        now = datetime.now()
-        timestamps = [now - timedelta(minutes=i) for i in range(hours * 60)]
-        
-        data = []
-        for i, timestamp in enumerate(timestamps):
-            # Base solar wind parameters (typical values)
-            base_proton_density = 8.0  # cm^-3
-            base_alpha_density = 0.32  # cm^-3 (4% of protons)
-            base_velocity = 400.0  # km/s
-            base_temperature = 100000.0  # K
-            
-            # Add realistic variations
-            time_factor = i / 60.0  # Hours
-            
-            # Solar rotation effects (27-day period)
-            solar_rotation = np.sin(2 * np.pi * time_factor / (27 * 24))
-            
-            # Coronal hole effects
-            coronal_hole = np.sin(2 * np.pi * time_factor / (24 * 7))  # Weekly variations
-            
-            # Random fluctuations
-            noise = np.random.normal(0, 0.1)
-            
-            # Calculate realistic values
-            proton_density = base_proton_density * (1 + 0.3 * solar_rotation + 0.2 * coronal_hole + noise)
-            alpha_density = base_alpha_density * (1 + 0.4 * solar_rotation + 0.3 * coronal_hole + noise)
-            velocity = base_velocity * (1 + 0.15 * solar_rotation + 0.1 * coronal_hole + noise)
-            temperature = base_temperature * (1 + 0.2 * solar_rotation + 0.15 * coronal_hole + noise)
-            
-            # Ensure physical constraints
-            proton_density = max(1.0, proton_density)
-            alpha_density = max(0.01, alpha_density)
-            velocity = max(200.0, velocity)
-            temperature = max(10000.0, temperature)
-            
-            data.append({
-                'timestamp': timestamp,
-                'proton_density': proton_density,
-                'alpha_density': alpha_density,
-                'proton_velocity': velocity,
-                'proton_temperature': temperature,
-                'alpha_proton_ratio': alpha_density / proton_density
-            })
-        
-        df = pd.DataFrame(data)
-        df.set_index('timestamp', inplace=True)
+        df = generate_solar_wind(hours=hours)
         
         # Update metrics
         self.data_metrics['total_volume'] = len(df) * 8 * 5 / (1024**3)  # Rough estimate
@@ -200,26 +259,38 @@ class DataService:
         try:
             # Step 1: Data Cleaning
             self._update_pipeline_step('cleaning', 'running', 25)
-            df_cleaned = handle_missing_values(df, method='interpolate')
+            with registry.timer('pipeline_stage_seconds', stage='clean') as timing:
+                # Spikes come back as NaN and are interpolated like missing samples
+                df_cleaned, self.quality_flags = clean_solar_wind(df, kalman=self.kalman_smoothing)
+                df_cleaned = handle_missing_values(df_cleaned, method='interpolate')
+            self._record_stage('cleaning', 'clean', df_cleaned, timing['seconds'])
             self._update_pipeline_step('cleaning', 'completed', 100)
             
             # Step 2: Resampling
             self._update_pipeline_step('preprocessing', 'running', 50)
-            df_resampled = resample_time_series(df_cleaned, rule='1T')
+            with registry.timer('pipeline_stage_seconds', stage='resample') as timing:
+                df_resampled = resample_time_series(df_cleaned, rule='1T')
+            self._record_stage('preprocessing', 'resample', df_resampled, timing['seconds'])
             self._update_pipeline_step('preprocessing', 'running', 75)
             
             # Step 3: Feature Engineering
-            df_features = self._add_derived_features(df_resampled)
+            with registry.timer('pipeline_stage_seconds', stage='features') as timing:
+                df_features = add_derived_features(df_resampled)
+            self._record_stage('preprocessing', 'features', df_features, timing['seconds'])
             self._update_pipeline_step('preprocessing', 'completed', 100)
             
             # Step 4: Storage
             self._update_pipeline_step('storage', 'running', 50)
-            self.current_data = df_features
+            with registry.timer('pipeline_stage_seconds', stage='score') as timing:
+                self._update_event_store(df_features)
+            self._record_stage('storage', 'score', df_features, timing['seconds'])
             self._update_pipeline_step('storage', 'completed', 100)
             
             # Update quality metrics
-            self._update_quality_metrics(df_features)
+            self._update_quality_metrics(self.quality_flags)
             
+            # Last, so responses cached under the new version carry every update above
+            self.data_version += 1
             return df_features
             
         except Exception as e:
@@ -230,74 +301,173 @@ class DataService:
                     step['status'] = 'failed'
             raise
     
-    def _add_derived_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Add derived features for anomaly detection"""
-        df_features = df.copy()
-        
-        # Add derived features
-        if 'proton_density' in df_features.columns and 'alpha_density' in df_features.columns:
-            df_features['alpha_proton_ratio'] = df_features['alpha_density'] / df_features['proton_density']
-        
-        if 'proton_velocity' in df_features.columns and 'proton_temperature' in df_features.columns:
-            df_features['velocity_temperature_ratio'] = df_features['proton_velocity'] / df_features['proton_temperature']
-        
-        # Add rolling statistics
-        for col in ['proton_density', 'proton_velocity', 'proton_temperature']:
-            if col in df_features.columns:
-                df_features[f'{col}_rolling_mean'] = df_features[col].rolling(window=10, min_periods=1).mean()
-                df_features[f'{col}_rolling_std'] = df_features[col].rolling(window=10, min_periods=1).std()
-        
-        return df_features
-    
-    def _update_pipeline_step(self, step_id: str, status: str, progress: int):
-        """Update pipeline step status"""
+    def _update_pipeline_step(self, step_id: str, status: str, progress: int,
+                              throughput: Optional[float] = None):
+        """Update pipeline step status, with the measured throughput in MB/min if known"""
         for step in self.pipeline_status:
             if step['id'] == step_id:
                 step['status'] = status
                 step['progress'] = progress
                 step['last_activity'] = datetime.now()
-                if status == 'running':
-                    step['throughput'] = f"{np.random.uniform(1.0, 3.0):.1f} MB/min"
+                if throughput is not None:
+                    step['throughput'] = f"{throughput:.1f} MB/min"
                 break
     
-    def _update_quality_metrics(self, df: pd.DataFrame):
-        """Update data quality metrics"""
-        if df.empty:
+    def _record_stage(self, step_id: str, stage: str, df: pd.DataFrame, seconds: float):
+        """Record rows and bytes processed by a pipeline stage and its measured throughput"""
+        rows = len(df)
+        nbytes = float(df.memory_usage(index=True).sum())
+        registry.inc('pipeline_rows_total', rows, stage=stage)
+        registry.inc('pipeline_bytes_total', nbytes, stage=stage)
+        if seconds > 0:
+            registry.set('pipeline_rows_per_second', rows / seconds, stage=stage)
+            registry.set('pipeline_bytes_per_second', nbytes / seconds, stage=stage)
+            for step in self.pipeline_status:
+                if step['id'] == step_id:
+                    step['throughput'] = f"{nbytes / 1024**2 / (seconds / 60):.1f} MB/min"
+    
+    def _update_quality_metrics(self, flags: pd.Series):
+        """Update data quality metrics from the cleaning stage's per-sample flags"""
+        if flags.empty:
             return
         
-        # Calculate missing data rate
-        missing_rate = (df.isnull().sum().sum() / (df.shape[0] * df.shape[1])) * 100
-        
-        # Calculate quality score based on data completeness and consistency
-        completeness = (1 - missing_rate / 100) * 100
-        consistency = 95.0  # Assume good consistency for generated data
-        quality_score = (completeness + consistency) / 2
+        # Share of input samples with a missing channel, and of samples passing every check
+        flags = flags.to_numpy()
+        missing_rate = float(np.count_nonzero(flags & QC_MISSING)) / len(flags) * 100
+        quality_score = float(np.count_nonzero(flags == 0)) / len(flags) * 100
         
         self.data_metrics['quality_score'] = quality_score
         self.data_metrics['missing_data_rate'] = missing_rate
     
+    def ensure_data(self):
+        """Make sure current_data is available, loading it or syncing from the data plane"""
+        if self.data_plane is not None:
+            self.sync()
+        elif self.current_data is None:
+            with self._load_lock:
+                if self.current_data is None:
+                    df = self.load_real_data()
+                    self.process_data_pipeline(df)
+    
+    def warm_up(self):
+        """Load and process the data and the evaluation report ahead of the first request"""
+        started = time.perf_counter()
+        self.warmup_state.update(status='warming', startedAt=datetime.now().isoformat(), error=None)
+        try:
+            with registry.timer('pipeline_stage_seconds', stage='warmup'):
+                if self.data_plane is None:
+                    # Attached workers serve the scores published by the ingestion process
+                    self.load_current_model()
+                self.ensure_data()
+                self._load_evaluation_report()
+        except Exception as e:
+            print(f"Error warming up data service: {e}")
+            self.warmup_state.update(status='failed', error=str(e))
+        else:
+            self.warmup_state['status'] = 'ready'
+        self.warmup_state.update(completedAt=datetime.now().isoformat(),
+                                 seconds=time.perf_counter() - started)
+    
+    @property
+    def is_ready(self) -> bool:
+        """True once data is available to serve"""
+        return self.current_data is not None
+    
+    def attach_data_plane(self, data_plane):
+        """Serve read-only from snapshots published by a separate ingestion process"""
+        self.data_plane = data_plane
+        self.sync()
+    
+    def detached_copy(self) -> 'DataService':
+        """
+        A service with this one's settings and model but its own data and
+        detections, for dry runs (e.g. profiling) that must not replace what
+        is being served.
+        """
+        copy = DataService(self.data_dir)
+        copy.kalman_smoothing = self.kalman_smoothing
+        copy.threshold_hysteresis = self.threshold_hysteresis
+        detector = self.event_detector
+        copy.detection = copy._derive(None, None, detector.enter_threshold, detector.exit_threshold)
+        copy.model = self.model
+        return copy
+    
+    def publish(self, data_plane) -> int:
+        """Publish the processed data and the model that scored it to a data plane; returns the version"""
+        state = self.detection
+        return data_plane.publish(state.features, state.scores, {
+            'data_metrics': self.data_metrics,
+            'pipeline_status': self.pipeline_status,
+            'model': self.model_info(),
+            'model_error': self.model_error
+        }, records=self.sample_records())
+    
+    def sync(self):
+        """Adopt the latest data plane snapshot and shared threshold if either changed"""
+        version = self.data_plane.current_version()
+        threshold = self.data_plane.read_settings().get('threshold')
+        if version == self._plane_version and threshold == self._plane_threshold:
+            return
+        
+        with self._state_lock:
+            features, scores = self.current_data, self.anomaly_scores
+            if version != self._plane_version:
+                snapshot = self.data_plane.attach(version)
+                if snapshot is None:
+                    return
+                features, scores = snapshot.features, snapshot.scores
+                if snapshot.records is not None:
+                    # Mapped read-only like the other arrays, rather than rebuilt in every worker
+                    self._sample_records = snapshot.records
+                    self._sample_records_source = (features, scores)
+                self.data_metrics.update(snapshot.metadata.get('data_metrics', {}))
+                self.pipeline_status = snapshot.metadata.get('pipeline_status', self.pipeline_status)
+                self._published_model = snapshot.metadata.get('model')
+                self.model_error = snapshot.metadata.get('model_error')
+                self._plane_version = version
+            self._plane_threshold = threshold
+            
+            # A threshold set through the API overrides the published model's own
+            if threshold is not None:
+                self.detection = self._derive(features, scores, threshold)
+            else:
+                thresholds = (self._published_model or {}).get('thresholds') or DEFAULT_THRESHOLDS
+                self.detection = self._derive(features, scores, thresholds['enter'], thresholds['exit'])
+            self.data_version += 1
+    
     def get_system_metrics(self) -> Dict[str, float]:
-        """Get current system performance metrics"""
+        """Get current system performance metrics from the instrumentation registry"""
+        requests = registry.merged_histogram('api_request_seconds')
+        
         if self.current_data is not None:
-            # Calculate real metrics based on data
             data_ingestion = min(100.0, self.data_metrics['quality_score'])
-            model_accuracy = 94.2  # This would come from actual model evaluation
-            latency = 12.3  # This would be measured from actual processing
-            uptime = 99.8  # This would be tracked by the system
+            # Event-level F1 from the offline evaluation at the current threshold
+            model_accuracy = self.get_detection_metrics()['f1Score']
         else:
             # Default values when no data is available
             data_ingestion = 0.0
             model_accuracy = 0.0
-            latency = 0.0
-            uptime = 100.0
         
         return {
             'dataIngestion': data_ingestion,
             'modelAccuracy': model_accuracy,
-            'latency': latency,
-            'uptime': uptime
+            'latency': requests.quantile(0.5) * 1000,
+            'uptime': self._availability(),
+            'latencyP95': requests.quantile(0.95) * 1000,
+            'uptimeSeconds': time.time() - registry.started_at,
+            'requestsInFlight': registry.gauge('api_requests_in_flight') or 0.0,
+            'memoryMb': resident_memory_bytes() / 1024**2,
+            'rowsPerSecond': registry.gauge('pipeline_rows_per_second', stage='score') or 0.0
         }
     
+    def _availability(self) -> float:
+        """Percentage of API requests that did not fail with a server error"""
+        total_requests = registry.sum_counter('api_requests_total')
+        failed_requests = sum(
+            registry.sum_counter('api_requests_total', status=str(code)) for code in range(500, 600)
+        )
+        return 100.0 * (1 - failed_requests / total_requests) if total_requests else 100.0
+    
     def get_data_metrics(self) -> Dict[str, Any]:
         """Get data pipeline metrics"""
         return {
@@ -311,93 +481,356 @@ class DataService:
         """Get current pipeline processing steps"""
         return self.pipeline_status
     
-    def get_real_time_data(self, hours: int = 24) -> List[Dict[str, Any]]:
-        """Get real-time monitoring data"""
-        if self.current_data is None:
-            # Load and process data if not available
-            df = self.load_real_data()
-            self.process_data_pipeline(df)
-        
-        # Get the most recent data
-        recent_data = self.current_data.tail(hours * 60)
-        
-        data_points = []
-        for timestamp, row in recent_data.iterrows():
-            # Calculate anomaly score based on deviations from normal patterns
-            anomaly_score = self._calculate_anomaly_score(row)
+    def get_real_time_data(self, hours: int = 24) -> np.ndarray:
+        """Get real-time monitoring data as sample records (see records.SAMPLE_DTYPE)"""
+        self.ensure_data()
+        records = self.sample_records()
+        if records is None:
+            return np.zeros(0, dtype=SAMPLE_DTYPE)
+        
+        # The most recent data, as a view without copying
+        return records[-hours * 60:] if hours > 0 else records[:0]
+    
+    def sample_records(self) -> Optional[np.ndarray]:
+        """Sample records of the stored data, rebuilt only when the data or scores are replaced"""
+        state = self.detection
+        data, scores = state.features, state.scores
+        if data is None or scores is None:
+            return None
+        source = self._sample_records_source
+        # Data and scores are replaced, never modified in place, so identity tells when to rebuild
+        if source is None or source[0] is not data or source[1] is not scores:
+            self._sample_records = sample_records(data, scores)
+            self._sample_records_source = (data, scores)
+        return self._sample_records
+    
+    def _update_event_store(self, df: pd.DataFrame):
+        """Score the processed window, derive its events and swap both in"""
+        with self._state_lock:
+            scores = self._score(df)
+            # The event store covers exactly the stored window: events whose samples
+            # have slid out of current_data are dropped with them, so every stored
+            # peak can be looked up. Deriving is one vectorized pass over the scores.
+            detector = self.event_detector
+            self.detection = self._derive(df, scores, detector.enter_threshold, detector.exit_threshold)
+    
+    def _score(self, df: pd.DataFrame) -> pd.Series:
+        """Score with the active model if one is loaded, else with the heuristic scorer"""
+        model = self.model
+        if model is None or not model.accepts(df):
+            return calculate_anomaly_scores(df)
+        
+        # The dense model scores rows independently, so rescoring is all there is.
+        # A temporal model continues its stream from the last row whose features
+        # were final when scored (one recurrent step per minute); the rows after
+        # it are rescored, since newer samples revise them. If the window slid
+        # past that row or the history was replaced, it starts over.
+        temporal = model.model_type == 'temporal'
+        settled = self._settled_rows(df) if temporal else None
+        stream = self.model_stream
+        previous = self.anomaly_scores
+        if (temporal and stream is not None and stream.artifact is model
+                and stream.checkpoint is not None and previous is not None):
+            resume = stream.checkpoint[0]
+            if resume is not None and len(df) and df.index[0] <= resume < df.index[-1]:
+                stream.rewind()
+                scored = previous.reindex(df.index[df.index <= resume])
+                return pd.concat([scored, stream.update(df[df.index > resume], settled - len(scored))])
+        
+        stream = self.model_stream = model.stream()
+        return stream.update(df, settled)
+    
+    def _settled_rows(self, df: pd.DataFrame) -> int:
+        """
+        Number of leading rows of the processed window df that later samples can
+        no longer change. The cleaning windows reach CLEANING_LAG input samples
+        ahead, and a run of missing or despiked samples is interpolated anew once
+        a sample after it arrives, so input is final up to the last valid sample
+        before the lag; a resampled row is final if the next one starts by then.
+        """
+        flags = self.quality_flags
+        if flags is None or len(flags) <= CLEANING_LAG:
+            return 0
+        valid = (flags.to_numpy()[:len(flags) - CLEANING_LAG] & (QC_MISSING | QC_SPIKE)) == 0
+        if not valid.any():
+            return 0
+        last_valid = len(valid) - 1 - np.argmax(valid[::-1])
+        if last_valid + 1 >= len(flags):
+            return len(df)
+        return max(int(df.index.searchsorted(flags.index[last_valid + 1], side='right')) - 1, 0)
+    
+    def load_current_model(self):
+        """
+        Load the registry's current version unless it was the last one loaded
+        or tried. A version that fails to load leaves the previous model (or
+        the heuristic scorer) in place, with the error in model_error.
+        """
+        version = self.model_registry.current_version()
+        if version is None or version == self._model_requested:
+            return
+        self._model_requested = version
+        try:
+            self.load_model(version)
+        except (ImportError, KeyError, ValueError) as e:
+            # Serve with the heuristic scorer rather than not at all
+            print(f"Error loading model: {e}")
+            self.model_error = str(e)
+    
+    def model_outdated(self) -> bool:
+        """True if the registry's current version is not the last one loaded or tried"""
+        version = self.model_registry.current_version()
+        return version is not None and version != self._model_requested
+    
+    def load_model(self, version: Optional[int] = None):
+        """
+        Load a model version from the registry (the current one by default) and
+        swap it in. The new model is built and the stored data rescored before
+        the swap, so requests keep being served by the old model until then.
+        """
+        started = time.perf_counter()
+        artifact = self.model_registry.load(version)
+        artifact.build()
+        with self._state_lock:
+            stream = artifact.stream()
+            features, scores = self.current_data, self.anomaly_scores
+            if features is not None and artifact.accepts(features):
+                settled = self._settled_rows(features) if artifact.model_type == 'temporal' else None
+                scores = stream.update(features, settled)
+            thresholds = artifact.thresholds
+            detection = self._derive(features, scores, thresholds['enter'], thresholds['exit'])
             
-            data_points.append({
-                'timestamp': timestamp.isoformat(),
-                'anomalyScore': anomaly_score,
-                'protonDensity': float(row.get('proton_density', 0)),
-                'alphaDensity': float(row.get('alpha_density', 0)),
-                'protonVelocity': float(row.get('proton_velocity', 0)),
-                'protonTemperature': float(row.get('proton_temperature', 0))
-            })
+            self.model, self.model_stream, self.detection = artifact, stream, detection
+            self.model_error = None
+            self._model_requested = artifact.version
+            self.data_version += 1
+        
+        registry.set('model_version', artifact.version)
+        registry.set('model_load_seconds', artifact.load_seconds)
+        registry.set('model_swap_seconds', time.perf_counter() - started)
+        return artifact
+    
+    def model_info(self) -> Optional[Dict[str, Any]]:
+        """The model the served scores come from, or None for the heuristic scorer"""
+        if self.data_plane is not None:
+            # Workers do not score; the ingestion process publishes the model it used
+            return self._published_model
+        model = self.model
+        if model is None:
+            return None
+        return {
+            'version': model.version,
+            'created': model.manifest['created'],
+            'loadedAt': model.loaded_at.isoformat(),
+            'loadMs': model.load_seconds * 1000,
+            'precision': model.precision,
+            'modelType': model.model_type,
+            'swapMs': (registry.gauge('model_swap_seconds') or 0.0) * 1000,
+            'features': model.feature_names,
+            'thresholds': model.thresholds
+        }
+    
+    def get_model_status(self) -> Dict[str, Any]:
+        """Serving model version, when it was trained and loaded, and how long loading took"""
+        info = self.model_info()
+        return {
+            'status': 'active' if info is not None else 'heuristic',
+            'lastTraining': info['created'] if info is not None else None,
+            'accuracy': self.get_detection_metrics()['f1Score'] if self.current_data is not None else 0.0,
+            'version': str(info['version']) if info is not None else None,
+            'uptime': f"{self._availability():.1f}%",
+            'loadedAt': info['loadedAt'] if info is not None else None,
+            'loadMs': info['loadMs'] if info is not None else None,
+            'precision': info['precision'] if info is not None else None,
+            'modelType': info['modelType'] if info is not None else None,
+            'swapMs': info['swapMs'] if info is not None else None,
+            'features': info['features'] if info is not None else [],
+            'thresholds': info['thresholds'] if info is not None else None,
+            'currentVersion': self.model_registry.current_version(),
+            'availableVersions': [manifest['version'] for manifest in self.model_registry.versions()],
+            'error': self.model_error
+        }
+    
+    def _derive(self, features: Optional[pd.DataFrame], scores: Optional[pd.Series],
+                enter_threshold: float, exit_threshold: Optional[float] = None) -> DetectionState:
+        """Build the event store and score index of a window's scores, aside from the live state"""
+        detector = self._detector(enter_threshold, exit_threshold)
+        store = EventStore()
+        index = ScoreIndex()
+        if scores is not None:
+            index.reset(scores.to_numpy())
+            store.extend(detector.process(scores.index, scores.to_numpy()))
+        return DetectionState(features, scores, detector, store, index)
+    
+    @property
+    def detection_threshold(self) -> float:
+        """Score above which an event is opened"""
+        return self.detection.detector.enter_threshold
+    
+    def set_detection_threshold(self, threshold: float):
+        """
+        Change the detection threshold and re-derive events from the stored
+        window's scores: the same events a pipeline run at this threshold derives.
+        """
+        with self._state_lock:
+            self.detection = self._derive(self.current_data, self.anomaly_scores, threshold)
+            if self.data_plane is not None:
+                # Other workers pick the threshold up on their next sync
+                self.data_plane.write_settings(threshold=threshold)
+                self._plane_threshold = threshold
+            self.data_version += 1
+    
+    def evaluate_threshold(self, threshold: float) -> Dict[str, Any]:
+        """What-if summary of the stored scores under a candidate threshold, without applying it"""
+        state = self.detection
+        event_count = 0
+        if state.scores is not None:
+            detector = self._detector(threshold)
+            events = detector.process(state.scores.index, state.scores.to_numpy())
+            event_count = len(events) + (detector.peek() is not None)
         
-        return data_points
-    
-    def _calculate_anomaly_score(self, row: pd.Series) -> float:
-        """Calculate anomaly score based on data patterns"""
-        score = 0.0
-        
-        # Check proton density anomalies
-        if 'proton_density' in row:
-            normal_density = 8.0
-            density_deviation = abs(row['proton_density'] - normal_density) / normal_density
-            score += min(0.3, density_deviation * 0.3)
-        
-        # Check alpha/proton ratio anomalies
-        if 'alpha_proton_ratio' in row:
-            normal_ratio = 0.04
-            ratio_deviation = abs(row['alpha_proton_ratio'] - normal_ratio) / normal_ratio
-            score += min(0.3, ratio_deviation * 0.3)
-        
-        # Check velocity anomalies
-        if 'proton_velocity' in row:
-            normal_velocity = 400.0
-            velocity_deviation = abs(row['proton_velocity'] - normal_velocity) / normal_velocity
-            score += min(0.2, velocity_deviation * 0.2)
-        
-        # Check temperature anomalies
-        if 'proton_temperature' in row:
-            normal_temp = 100000.0
-            temp_deviation = abs(row['proton_temperature'] - normal_temp) / normal_temp
-            score += min(0.2, temp_deviation * 0.2)
-        
-        return min(1.0, score)
-    
-    def get_anomaly_detections(self) -> List[Dict[str, Any]]:
-        """Get recent anomaly detections based on real data"""
-        if self.current_data is None:
+        return {
+            'threshold': threshold,
+            'samplesAbove': state.index.count_above(threshold),
+            'fractionAbove': float(state.index.fraction_above(threshold)),
+            'eventCount': event_count
+        }
+    
+    def _detector(self, enter_threshold: float, exit_threshold: Optional[float] = None) -> StreamingEventDetector:
+        """A fresh event detector like the service's; exits the hysteresis below enter by default"""
+        if exit_threshold is None:
+            exit_threshold = max(0.0, enter_threshold - self.threshold_hysteresis)
+        return StreamingEventDetector(
+            enter_threshold=enter_threshold,
+            exit_threshold=exit_threshold,
+            min_duration=self.event_detector.min_duration,
+            max_gap=self.event_detector.max_gap
+        )
+    
+    def get_anomaly_detections(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                               limit: Optional[int] = 3) -> List[Detection]:
+        """Get CME event detections, optionally restricted to a time range"""
+        state = self.detection
+        if state.features is None:
             return []
         
-        detections = []
-        threshold = 0.65
+        if start is None and end is None:
+            events = state.store.latest(limit) if limit is not None else state.store.query()
+        else:
+            events = state.store.query(start, end)
         
-        # Analyze recent data for anomalies
-        recent_data = self.current_data.tail(100)  # Last 100 data points
+        # The event still in progress is reported alongside the closed ones
+        ongoing = state.detector.peek()
+        if ongoing is not None and (end is None or ongoing.start <= pd.Timestamp(end)):
+            events = events + [ongoing]
         
-        for i, (timestamp, row) in enumerate(recent_data.iterrows()):
-            anomaly_score = self._calculate_anomaly_score(row)
-            
-            if anomaly_score > threshold:
-                detection_type = self._classify_anomaly(row, anomaly_score)
-                confidence = int(anomaly_score * 100)
-                
-                detections.append({
-                    'id': len(detections) + 1,
-                    'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                    'type': detection_type,
-                    'score': anomaly_score,
-                    'confidence': confidence,
-                    'status': 'confirmed' if confidence > 80 else 'under_review',
-                    'features': self._extract_anomaly_features(row, anomaly_score)
-                })
-        
-        return detections[-3:]  # Return last 3 detections
-    
-    def _classify_anomaly(self, row: pd.Series, score: float) -> str:
+        if limit is not None:
+            events = events[-limit:] if limit > 0 else []
+        
+        return [self._event_to_detection(event, state.features, ongoing=event is ongoing) for event in events]
+    
+    def count_anomaly_detections(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+        """Count closed CME events overlapping the given time range"""
+        return self.event_store.count(start, end)
+    
+    def get_detection_metrics(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Get detection performance from the offline evaluation report at the
+        current threshold, plus the live count of events in the stored data
+        """
+        state = self.detection
+        live_detections = state.store.count(start, end)
+        ongoing = state.detector.peek()
+        if ongoing is not None and (end is None or ongoing.start <= pd.Timestamp(end)):
+            live_detections += 1
+        
+        metrics = {
+            # Events in the served data (optionally in [start, end]); not part of the evaluation
+            'liveDetections': live_detections,
+            # Detections in the evaluated data: truePositives + falsePositives
+            'totalDetections': 0,
+            'truePositives': 0,
+            'falsePositives': 0,
+            'precision': 0.0,
+            'recall': 0.0,
+            'f1Score': 0.0,
+            'latencyMinutes': None,
+            'evaluatedAt': None,
+            'evaluationSource': None,
+            'evaluatedModelVersion': None
+        }
+        
+        # Precision/recall need labelled data, so they come from src/scripts/evaluate.py
+        report = self._load_evaluation_report()
+        if report and report.get('sweep'):
+            row = min(report['sweep'], key=lambda r: abs(r['threshold'] - self.detection_threshold))
+            metrics.update({
+                'totalDetections': row['eventTruePositives'] + row['eventFalsePositives'],
+                'truePositives': row['eventTruePositives'],
+                'falsePositives': row['eventFalsePositives'],
+                'precision': row['eventPrecision'] * 100,
+                'recall': row['eventRecall'] * 100,
+                'f1Score': row['eventF1'] * 100,
+                'latencyMinutes': row['latencyMinutes'],
+                'evaluatedAt': report.get('generatedAt'),
+                'evaluationSource': report.get('source'),
+                # None when the report scored with the heuristic
+                'evaluatedModelVersion': report.get('modelVersion')
+            })
+        
+        return metrics
+    
+    def evaluation_report_mtime(self) -> Optional[float]:
+        """Modification time of the evaluation report, or None if there is none"""
+        try:
+            return os.path.getmtime(self.evaluation_report_path)
+        except OSError:
+            return None
+    
+    def _load_evaluation_report(self) -> Optional[Dict[str, Any]]:
+        """Load the evaluation report, re-reading it only when the file changes"""
+        try:
+            mtime = os.path.getmtime(self.evaluation_report_path)
+        except OSError:
+            return None
+        
+        if mtime != self._evaluation_report_mtime:
+            try:
+                with open(self.evaluation_report_path) as f:
+                    self._evaluation_report = json.load(f)
+                self._evaluation_report_mtime = mtime
+            except (OSError, ValueError) as e:
+                print(f"Error loading evaluation report: {e}")
+                return None
+        
+        return self._evaluation_report
+    
+    def _event_to_detection(self, event: CMEEvent, features: pd.DataFrame, ongoing: bool = False) -> Detection:
+        """Convert a CME event interval of the given window into a detection record"""
+        position = features.index.get_loc(event.peak)
+        peak_values = {column: features[column].iat[position]
+                       for column in ANOMALY_FEATURE_COLUMNS if column in features}
+        confidence = int(event.peak_score * 100)
+        
+        if ongoing:
+            status = 'ongoing'
+        else:
+            status = 'confirmed' if confidence > 80 else 'under_review'
+        
+        return Detection(
+            id=event.event_id,
+            timestamp=event.peak.strftime('%Y-%m-%d %H:%M:%S'),
+            type=self._classify_anomaly(peak_values, event.peak_score),
+            score=event.peak_score,
+            confidence=confidence,
+            status=status,
+            features=self._extract_anomaly_features(peak_values, event.peak_score),
+            start_time=event.start.isoformat(),
+            peak_time=event.peak.isoformat(),
+            end_time=event.end.isoformat(),
+            duration_minutes=event.duration.total_seconds() / 60
+        )
+    
+    def _classify_anomaly(self, row: Dict[str, float], score: float) -> str:
         """Classify the type of anomaly"""
         if score > 0.8:
             return "Halo CME"
@@ -408,7 +841,7 @@ class DataService:
         else:
             return "Solar Wind Enhancement"
     
-    def _extract_anomaly_features(self, row: pd.Series, score: float) -> List[str]:
+    def _extract_anomaly_features(self, row: Dict[str, float], score: float) -> List[str]:
         """Extract features that contributed to the anomaly"""
         features = []
         
@@ -0,0 +1,70 @@
+"""
+Ingestion process for multi-worker deployments.
+
+Loads and processes the solar wind data once, publishes the result to a
+shared data plane and repeats every --interval seconds. API workers started
+with PIGADE_DATA_PLANE pointing at the same directory attach to each new
+snapshot without reprocessing anything.
+
+This process also owns the scoring model: it loads the model registry's
+current version and publishes that version with each snapshot. Activating a
+version (POST /api/model/activate on any worker) repoints the registry, and
+the next run, started as soon as the change is seen, scores with it.
+
+Usage:
+    python ingest.py --plane-dir /dev/shm/pigade-x
+    PIGADE_DATA_PLANE=/dev/shm/pigade-x PIGADE_API_WORKERS=4 python main.py
+"""
+import argparse
+import logging
+import time
+
+from data_plane import DataPlane
+from data_service import DataService
+
+logger = logging.getLogger(__name__)
+
+
+def ingest_once(service: DataService, plane: DataPlane) -> int:
+    """Run the pipeline on freshly loaded data with the active model and publish it; returns the new version"""
+    service.load_current_model()
+    df = service.load_real_data()
+    service.process_data_pipeline(df)
+    return service.publish(plane)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish processed PIGADE-X data for API workers")
+    parser.add_argument('--plane-dir', default='/dev/shm/pigade-x',
+                        help="Data plane directory shared with the API workers (tmpfs recommended)")
+    parser.add_argument('--interval', type=float, default=60.0, help="Seconds between pipeline runs")
+    parser.add_argument('--keep', type=int, default=3, help="Number of published versions to keep")
+    parser.add_argument('--once', action='store_true', help="Publish a single snapshot and exit")
+    parser.add_argument('--kalman-smoothing', action='store_true',
+                        help="Also Kalman-filter every channel in the cleaning stage "
+                             "(same as PIGADE_KALMAN_SMOOTHING=1)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    plane = DataPlane(args.plane_dir, keep=args.keep)
+    service = DataService()
+    if args.kalman_smoothing:
+        service.kalman_smoothing = True
+
+    while True:
+        started = time.perf_counter()
+        try:
+            version = ingest_once(service, plane)
+            logger.info("Published version %d in %.2fs", version, time.perf_counter() - started)
+        except Exception:
+            # Keep serving the last good snapshot; try again next interval
+            logger.exception("Ingestion run failed")
+        if args.once:
+            break
+        # Rerun early when another model version is activated
+        while time.perf_counter() - started < args.interval and not service.model_outdated():
+            time.sleep(min(1.0, max(0.0, args.interval - (time.perf_counter() - started))))
+
+
+if __name__ == '__main__':
+    main()
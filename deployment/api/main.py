@@ -1,15 +1,31 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from datetime import datetime
 import asyncio
+import hmac
 import json
+import os
+import time
 from data_service import data_service
+from data_plane import DataPlane
+from records import encode_detections, encode_samples
+from pigade.utils.instrumentation import registry
+from pigade.utils.profiling import Profiler
+from response_cache import ResponseCache, etag_matches
 
-app = FastAPI(title="PIGADE-X API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start warming the data service in the background so startup is not blocked"""
+    loop = asyncio.get_running_loop()
+    app.state.warmup = loop.run_in_executor(None, data_service.warm_up)
+    yield
+
+app = FastAPI(title="PIGADE-X API", version="1.0.0", lifespan=lifespan)
 
 # Enable CORS for the frontend
 app.add_middleware(
@@ -20,12 +36,110 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# In multi-worker mode an ingestion process (ingest.py) owns the pipeline and
+# workers attach read-only to the snapshots it publishes
+if os.environ.get('PIGADE_DATA_PLANE'):
+    data_service.attach_data_plane(DataPlane(os.environ['PIGADE_DATA_PLANE']))
+
+# Opt-in profiler, armed through the /api/admin/profile endpoints
+profiler = Profiler(os.path.join(data_service.data_dir, 'profiles'))
+
+# The /api/admin endpoints exist only when a token is configured, and require it
+ADMIN_TOKEN = os.environ.get('PIGADE_ADMIN_TOKEN')
+
+# A profiled request holds the gate and waits for the requests already past it to
+# finish, so its capture contains no other request's work on the event loop
+profile_gate = asyncio.Lock()
+requests_past_gate = 0
+PROFILE_DRAIN_SECONDS = 10.0
+
+# Serialized responses of read endpoints, keyed on the data version
+response_cache = ResponseCache()
+
+# Most detections one request may ask for
+MAX_DETECTIONS_LIMIT = 1000
+
+registry.describe('api_request_seconds', 'API request latency by endpoint')
+registry.describe('api_requests_total', 'API requests by endpoint and status code')
+registry.describe('api_requests_in_flight', 'API requests currently being handled')
+registry.describe('pipeline_stage_seconds', 'Time spent in each data pipeline stage')
+registry.describe('pipeline_rows_total', 'Rows processed by each pipeline stage')
+registry.describe('pipeline_bytes_total', 'Bytes processed by each pipeline stage')
+
+# Orchestrator probes stay out of the request stats: they are polled constantly,
+# and /ready answers 503 by design while warming up
+PROBE_PATHS = ('/health', '/ready')
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time every request except probes into per-endpoint histograms"""
+    if request.url.path in PROBE_PATHS:
+        if data_service.data_plane is not None:
+            data_service.sync()
+        return await call_unprofiled(request, call_next)
+    
+    registry.add('api_requests_in_flight', 1)
+    started = time.perf_counter()
+    if data_service.data_plane is not None:
+        data_service.sync()
+    status = 500
+    try:
+        if profiler.remaining > 0 and profiler.claim(request.url.path):
+            response = await call_profiled(request, call_next)
+        else:
+            response = await call_unprofiled(request, call_next)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template so path parameters do not explode cardinality
+        route = request.scope.get('route')
+        endpoint = route.path if route is not None else 'unmatched'
+        registry.observe('api_request_seconds', time.perf_counter() - started,
+                         endpoint=endpoint, method=request.method)
+        registry.inc('api_requests_total', endpoint=endpoint, status=str(status))
+        registry.add('api_requests_in_flight', -1)
+
+async def call_unprofiled(request: Request, call_next):
+    """Handle a request, first waiting out any profile capture in progress"""
+    global requests_past_gate
+    if profile_gate.locked():
+        async with profile_gate:
+            pass
+    requests_past_gate += 1
+    try:
+        return await call_next(request)
+    finally:
+        requests_past_gate -= 1
+
+async def call_profiled(request: Request, call_next):
+    """Handle a claimed request alone on the event loop under the profiler"""
+    async with profile_gate:
+        deadline = time.perf_counter() + PROFILE_DRAIN_SECONDS
+        while requests_past_gate and time.perf_counter() < deadline:
+            await asyncio.sleep(0.001)
+        with profiler.capture(request.url.path, claimed=True) as artifact:
+            response = await call_next(request)
+    response.headers['X-Profile-Id'] = artifact['id']
+    return response
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Hide the admin endpoints unless PIGADE_ADMIN_TOKEN is set, and require it in X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
 # Pydantic models for API responses
 class SystemMetrics(BaseModel):
     dataIngestion: float
     modelAccuracy: float
     latency: float
     uptime: float
+    latencyP95: Optional[float] = None
+    uptimeSeconds: Optional[float] = None
+    requestsInFlight: Optional[float] = None
+    memoryMb: Optional[float] = None
+    rowsPerSecond: Optional[float] = None
 
 class PipelineStep(BaseModel):
     id: str
@@ -42,12 +156,17 @@ class DataMetrics(BaseModel):
     missingDataRate: float
 
 class DetectionMetrics(BaseModel):
+    liveDetections: int
     totalDetections: int
     truePositives: int
     falsePositives: int
     precision: float
     recall: float
     f1Score: float
+    latencyMinutes: Optional[float] = None
+    evaluatedAt: Optional[str] = None
+    evaluationSource: Optional[str] = None
+    evaluatedModelVersion: Optional[int] = None
 
 class AnomalyDetection(BaseModel):
     id: int
@@ -57,6 +176,10 @@ class AnomalyDetection(BaseModel):
     confidence: int
     status: str
     features: List[str]
+    startTime: Optional[str] = None
+    peakTime: Optional[str] = None
+    endTime: Optional[str] = None
+    durationMinutes: Optional[float] = None
 
 class RealTimeData(BaseModel):
     timestamp: str
@@ -66,14 +189,61 @@ class RealTimeData(BaseModel):
     protonVelocity: float
     protonTemperature: float
 
+def cached_json(request: Request, key: tuple, build) -> Response:
+    """
+    Serve a read endpoint from the response cache.
+    
+    `key` identifies the endpoint, its parameters and every version its result
+    depends on; `build` is only called on a miss and returns the payload.
+    Clients that send a matching If-None-Match get an empty 304.
+    """
+    return cached_body(request, key, lambda: json.dumps(jsonable_encoder(build()), separators=(',', ':')).encode())
+
+def cached_body(request: Request, key: tuple, build) -> Response:
+    """Like cached_json, for endpoints whose `build` serializes the JSON body itself"""
+    entry = response_cache.get(key)
+    if entry is None:
+        entry = response_cache.put(key, build())
+        result = 'miss'
+    else:
+        result = 'hit'
+    
+    headers = {'ETag': entry.etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), entry.etag):
+        registry.inc('api_cache_requests_total', endpoint=key[0], result='not_modified')
+        return Response(status_code=304, headers=headers)
+    registry.inc('api_cache_requests_total', endpoint=key[0], result=result)
+    return Response(content=entry.body, media_type='application/json', headers=headers)
+
+async def wait_for_data():
+    """Wait for data still being loaded without blocking the event loop, so probes keep answering"""
+    if not data_service.is_ready:
+        await asyncio.get_running_loop().run_in_executor(None, data_service.ensure_data)
+
 # Global state for real-time monitoring
 current_anomaly_score = 0.23
-detection_threshold = 0.65
 
 @app.get("/")
 async def root():
     return {"message": "PIGADE-X API is running"}
 
+@app.get("/health")
+async def health():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "ok", "uptimeSeconds": time.time() - registry.started_at}
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: 200 once data is loaded, 503 while warming up"""
+    ready = data_service.is_ready
+    body = {"ready": ready, "warmup": data_service.warmup_state}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """Expose instrumentation in the Prometheus text format"""
+    return PlainTextResponse(registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/system-metrics", response_model=SystemMetrics)
 async def get_system_metrics():
     """Get current system performance metrics"""
@@ -81,10 +251,12 @@ async def get_system_metrics():
     return SystemMetrics(**metrics)
 
 @app.get("/api/data-pipeline/metrics", response_model=DataMetrics)
-async def get_data_metrics():
+async def get_data_metrics(request: Request):
     """Get data pipeline metrics"""
-    metrics = data_service.get_data_metrics()
-    return DataMetrics(**metrics)
+    return cached_json(
+        request, ('data-metrics', data_service.data_version),
+        lambda: DataMetrics(**data_service.get_data_metrics())
+    )
 
 @app.get("/api/data-pipeline/steps", response_model=List[PipelineStep])
 async def get_pipeline_steps():
@@ -93,36 +265,26 @@ async def get_pipeline_steps():
     return [PipelineStep(**step) for step in steps]
 
 @app.get("/api/anomaly-detection/metrics", response_model=DetectionMetrics)
-async def get_detection_metrics():
-    """Get anomaly detection performance metrics"""
-    # Calculate real metrics based on actual detections
-    detections = data_service.get_anomaly_detections()
-    total_detections = len(detections)
-    true_positives = len([d for d in detections if d['confidence'] > 80])
-    false_positives = total_detections - true_positives
-    
-    precision = (true_positives / total_detections * 100) if total_detections > 0 else 0
-    recall = precision  # Simplified for now
-    f1_score = precision  # Simplified for now
-    
-    return DetectionMetrics(
-        totalDetections=total_detections,
-        truePositives=true_positives,
-        falsePositives=false_positives,
-        precision=precision,
-        recall=recall,
-        f1Score=f1_score
+async def get_detection_metrics(request: Request, start: Optional[datetime] = None,
+                                end: Optional[datetime] = None):
+    """Get anomaly detection performance metrics over an optional time range"""
+    return cached_json(
+        request,
+        ('detection-metrics', start, end, data_service.data_version, data_service.evaluation_report_mtime()),
+        lambda: DetectionMetrics(**data_service.get_detection_metrics(start=start, end=end))
     )
 
 @app.get("/api/anomaly-detection/current-score")
 async def get_current_anomaly_score():
     """Get current real-time anomaly score"""
-    global current_anomaly_score, detection_threshold
+    global current_anomaly_score
+    await wait_for_data()
+    detection_threshold = data_service.detection_threshold
     
     # Get real-time data and calculate current anomaly score
     real_time_data = data_service.get_real_time_data(hours=1)
-    if real_time_data:
-        current_anomaly_score = real_time_data[-1]['anomalyScore']
+    if len(real_time_data):
+        current_anomaly_score = float(real_time_data['anomalyScore'][-1])
     
     return {
         "score": current_anomaly_score,
@@ -132,47 +294,90 @@ async def get_current_anomaly_score():
     }
 
 @app.get("/api/anomaly-detection/recent", response_model=List[AnomalyDetection])
-async def get_recent_detections():
-    """Get recent anomaly detections"""
-    detections = data_service.get_anomaly_detections()
-    return [AnomalyDetection(**detection) for detection in detections]
+async def get_recent_detections(request: Request, start: Optional[datetime] = None,
+                                end: Optional[datetime] = None,
+                                limit: int = Query(3, ge=1, le=MAX_DETECTIONS_LIMIT)):
+    """Get recent CME event detections, optionally restricted to a time range"""
+    # Detection records are serialized directly; the response model only documents the schema
+    return cached_body(
+        request, ('recent-detections', start, end, limit, data_service.data_version),
+        lambda: encode_detections(data_service.get_anomaly_detections(start=start, end=end, limit=limit))
+    )
 
 @app.get("/api/real-time/data", response_model=List[RealTimeData])
-async def get_real_time_data(hours: int = 24):
+async def get_real_time_data(request: Request, hours: int = 24):
     """Get real-time monitoring data for the specified number of hours"""
     # Load and process real data if not already available
-    if data_service.current_data is None:
-        df = data_service.load_real_data()
-        data_service.process_data_pipeline(df)
+    await wait_for_data()
     
-    real_time_data = data_service.get_real_time_data(hours)
-    return [RealTimeData(**data_point) for data_point in real_time_data]
+    # Sample records are serialized directly; the response model only documents the schema
+    return cached_body(
+        request, ('real-time-data', hours, data_service.data_version),
+        lambda: encode_samples(data_service.get_real_time_data(hours))
+    )
 
 @app.post("/api/anomaly-detection/threshold")
 async def update_threshold(threshold: float):
-    """Update the anomaly detection threshold"""
-    global detection_threshold
+    """Update the anomaly detection threshold and re-derive detections"""
     if 0 <= threshold <= 1:
-        detection_threshold = threshold
+        data_service.set_detection_threshold(threshold)
         return {"message": f"Threshold updated to {threshold}", "threshold": threshold}
     else:
         raise HTTPException(status_code=400, detail="Threshold must be between 0 and 1")
 
+@app.get("/api/anomaly-detection/threshold/what-if")
+async def evaluate_threshold(threshold: List[float] = Query(...)):
+    """Preview detections under one or more candidate thresholds without applying them"""
+    if not all(0 <= t <= 1 for t in threshold):
+        raise HTTPException(status_code=400, detail="Threshold must be between 0 and 1")
+    return [data_service.evaluate_threshold(t) for t in threshold]
+
 @app.get("/api/model/status")
 async def get_model_status():
     """Get current model training and deployment status"""
-    return {
-        "status": "active",
-        "lastTraining": "2024-01-15T10:30:00Z",
-        "accuracy": 94.2,
-        "version": "1.2.3",
-        "uptime": "99.8%"
-    }
+    return data_service.get_model_status()
+
+@app.post("/api/model/activate")
+async def activate_model(version: Optional[int] = None):
+    """Hot-swap to a registry model version (the registry's current one by default)"""
+    registry_ = data_service.model_registry
+    
+    def check():
+        # The ingestion process scores for every worker, so only make sure the version loads
+        return registry_.load(version).build()
+    
+    def swap():
+        return data_service.load_model(version)
+    
+    # Load off the event loop so requests keep being served by the old model meanwhile.
+    # The registry is repointed only once the version has loaded (and the stored data
+    # been rescored), so a broken version never becomes the one the next start loads.
+    plane = data_service.data_plane is not None
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(None, check if plane else swap)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=f"Model runtime unavailable: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model version {version} could not be loaded: {e}")
+    if version is not None:
+        registry_.activate(version)
+    
+    if plane:
+        # The ingestion process follows the registry; drop any threshold override
+        # so the new model's thresholds apply
+        data_service.data_plane.write_settings(threshold=None)
+        return JSONResponse(status_code=202, content={"version": registry_.current_version(), "status": "pending"})
+    return {"version": result.version, "loadMs": result.load_seconds * 1000}
 
 @app.get("/api/xai/explanation/{detection_id}")
 async def get_xai_explanation(detection_id: int):
     """Get XAI explanation for a specific detection"""
-    # This would normally use the actual XAI model
+    # This would normally use the actual XAI model. It is not timed as a pipeline
+    # stage: explain_anomaly's cost is measured by the 'explain' benchmark instead.
     return {
         "detectionId": detection_id,
         "explanation": {
@@ -186,6 +391,62 @@ async def get_xai_explanation(detection_id: int):
         "timestamp": datetime.now().isoformat()
     }
 
+@app.post("/api/admin/profile", dependencies=[Depends(require_admin)])
+async def arm_profiler(requests: int = 1, mode: str = "cprofile", endpoint: Optional[str] = None):
+    """Profile the next N requests, optionally only those under an endpoint path"""
+    if requests < 1:
+        raise HTTPException(status_code=400, detail="requests must be at least 1")
+    try:
+        profiler.arm(requests, mode=mode, endpoint=endpoint)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"armed": requests, "mode": mode, "endpoint": endpoint}
+
+@app.delete("/api/admin/profile", dependencies=[Depends(require_admin)])
+async def disarm_profiler():
+    """Cancel any pending request profiling"""
+    profiler.disarm()
+    return {"armed": 0}
+
+@app.post("/api/admin/profile/pipeline", dependencies=[Depends(require_admin)])
+async def profile_pipeline(mode: str = "cprofile"):
+    """Profile a reload and pipeline run on a detached copy of the service; returns the artifact id"""
+    def run():
+        # The copy shares the configuration and model but not the served data
+        service = data_service.detached_copy()
+        with profiler.capture("pipeline", mode=mode) as artifact:
+            service.process_data_pipeline(service.load_real_data())
+        return artifact
+    
+    # In a worker thread, which is the only thread the capture profiles
+    try:
+        artifact = await asyncio.get_running_loop().run_in_executor(None, run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return artifact
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """List stored profile artifacts, newest first"""
+    return profiler.list_artifacts()
+
+@app.get("/api/admin/profiles/{artifact_id}", dependencies=[Depends(require_admin)])
+async def download_profile(artifact_id: str):
+    """Download a profile artifact (.pstats for cProfile, .collapsed for flamegraphs)"""
+    path = profiler.artifact_path(artifact_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=os.path.basename(path), media_type="application/octet-stream")
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = int(os.environ.get('PIGADE_API_WORKERS', '1'))
+    if workers > 1:
+        # Separate worker processes only make sense with a shared data plane
+        if not os.environ.get('PIGADE_DATA_PLANE'):
+            raise SystemExit("PIGADE_API_WORKERS > 1 requires PIGADE_DATA_PLANE (see ingest.py)")
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,96 @@
+import json
+import math
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+# One monitoring sample; field names are the JSON keys of /api/real-time/data
+SAMPLE_DTYPE = np.dtype([
+    ('timestamp', 'M8[ns]'),
+    ('anomalyScore', 'f8'),
+    ('protonDensity', 'f8'),
+    ('alphaDensity', 'f8'),
+    ('protonVelocity', 'f8'),
+    ('protonTemperature', 'f8'),
+])
+
+# Feature column behind each sample field; missing columns read as 0
+SAMPLE_COLUMNS = {
+    'protonDensity': 'proton_density',
+    'alphaDensity': 'alpha_density',
+    'protonVelocity': 'proton_velocity',
+    'protonTemperature': 'proton_temperature',
+}
+
+_SAMPLE_TEMPLATE = ('{"timestamp":"%s","anomalyScore":%s,"protonDensity":%s,"alphaDensity":%s,'
+                    '"protonVelocity":%s,"protonTemperature":%s}')
+
+_DETECTION_TEMPLATE = ('{"id":%d,"timestamp":%s,"type":%s,"score":%s,"confidence":%d,"status":%s,'
+                       '"features":%s,"startTime":%s,"peakTime":%s,"endTime":%s,"durationMinutes":%s}')
+
+
+def sample_records(features: pd.DataFrame, scores: pd.Series) -> np.ndarray:
+    """Packs the monitored columns and scores into one structured array of SAMPLE_DTYPE"""
+    records = np.zeros(len(features), dtype=SAMPLE_DTYPE)
+    records['timestamp'] = features.index.to_numpy(dtype='M8[ns]')
+    records['anomalyScore'] = scores.to_numpy(dtype=float)
+    for field, column in SAMPLE_COLUMNS.items():
+        if column in features:
+            records[field] = features[column].to_numpy(dtype=float)
+    return records
+
+
+def _number_strings(values: np.ndarray) -> list:
+    """Shortest round-trip text of each float, with null for NaN and infinities"""
+    strings = values.tolist()
+    for i in np.flatnonzero(~np.isfinite(values)):
+        strings[i] = 'null'
+    return strings
+
+
+def encode_samples(records: np.ndarray) -> bytes:
+    """Serializes sample records to a JSON array without building per-sample objects"""
+    timestamps = records['timestamp']
+    # Matches Timestamp.isoformat(): whole seconds unless there are sub-second parts
+    unit = 's' if not (timestamps.astype('i8') % 10**9).any() else 'us'
+    columns = [np.datetime_as_string(timestamps, unit=unit).tolist()]
+    columns += [_number_strings(records[field]) for field in SAMPLE_DTYPE.names[1:]]
+    return ('[' + ','.join([_SAMPLE_TEMPLATE % row for row in zip(*columns)]) + ']').encode()
+
+
+class Detection:
+    """A CME detection as reported by /api/anomaly-detection/recent"""
+    __slots__ = ('id', 'timestamp', 'type', 'score', 'confidence', 'status', 'features',
+                 'start_time', 'peak_time', 'end_time', 'duration_minutes')
+
+    def __init__(self, id: int, timestamp: str, type: str, score: float, confidence: int, status: str,
+                 features: List[str], start_time: str, peak_time: str, end_time: str, duration_minutes: float):
+        self.id = id
+        self.timestamp = timestamp
+        self.type = type
+        self.score = score
+        self.confidence = confidence
+        self.status = status
+        self.features = features
+        self.start_time = start_time
+        self.peak_time = peak_time
+        self.end_time = end_time
+        self.duration_minutes = duration_minutes
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if math.isfinite(value) else 'null'
+
+
+def encode_detections(detections: List[Detection]) -> bytes:
+    """Serializes detections to a JSON array in the field order of the API model"""
+    dumps = json.dumps
+    return ('[' + ','.join([
+        _DETECTION_TEMPLATE % (
+            d.id, dumps(d.timestamp), dumps(d.type), _number(d.score), d.confidence, dumps(d.status),
+            dumps(d.features), dumps(d.start_time), dumps(d.peak_time), dumps(d.end_time),
+            _number(d.duration_minutes),
+        )
+        for d in detections
+    ]) + ']').encode()
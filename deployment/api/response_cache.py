@@ -0,0 +1,67 @@
+import hashlib
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+class CachedResponse:
+    """Pre-serialized response body and its entity tag"""
+    __slots__ = ('body', 'etag')
+    
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of serialized read-endpoint responses.
+    
+    Entries are keyed on the endpoint, its parameters and the data version,
+    so a version bump in DataService makes stale entries unreachable; they are
+    then evicted as the least recently used. The ETag is a hash of the body,
+    which lets clients revalidate with If-None-Match and get a 304 even
+    across versions when the content did not change.
+    """
+    
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024**2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: "OrderedDict[Tuple[Hashable, ...], CachedResponse]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+    
+    def put(self, key: Tuple[Hashable, ...], body: bytes) -> CachedResponse:
+        entry = CachedResponse(body)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size_bytes -= len(previous.body)
+        
+        # Bodies larger than the whole budget are served but not retained
+        if len(body) <= self.max_bytes:
+            self._entries[key] = entry
+            self.size_bytes += len(body)
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted.body)
+        return entry
+    
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches the given ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison: a W/ prefix on the client's copy still matches
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
@@ -152,9 +152,9 @@ export default function AnomalyDetection() {
               <div>
                 <p className="text-sm text-slate-400 mb-1">Total Detections</p>
                 <p className="text-2xl font-bold text-blue-400 group-hover:scale-105 transition-transform">
-                  {loading ? "..." : detectionMetrics?.totalDetections}
+                  {loading ? "..." : detectionMetrics?.liveDetections}
                 </p>
-                <p className="text-xs text-blue-300/70 mt-1">Last 30 days</p>
+                <p className="text-xs text-blue-300/70 mt-1">In stored data</p>
               </div>
               <Activity className="h-8 w-8 text-blue-400 group-hover:animate-pulse" />
             </div>
@@ -0,0 +1,29 @@
+import pandas as pd
+
+def add_derived_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the derived features used for anomaly detection.
+
+    Args:
+        df: A resampled DataFrame of SWIS moments (proton/alpha density,
+            proton velocity and temperature).
+
+    Returns:
+        A copy of the DataFrame with ratio features and 10-sample rolling
+        statistics appended.
+    """
+    df_features = df.copy()
+
+    if 'proton_density' in df_features.columns and 'alpha_density' in df_features.columns:
+        df_features['alpha_proton_ratio'] = df_features['alpha_density'] / df_features['proton_density']
+
+    if 'proton_velocity' in df_features.columns and 'proton_temperature' in df_features.columns:
+        df_features['velocity_temperature_ratio'] = df_features['proton_velocity'] / df_features['proton_temperature']
+
+    # Add rolling statistics
+    for col in ['proton_density', 'proton_velocity', 'proton_temperature']:
+        if col in df_features.columns:
+            df_features[f'{col}_rolling_mean'] = df_features[col].rolling(window=10, min_periods=1).mean()
+            df_features[f'{col}_rolling_std'] = df_features[col].rolling(window=10, min_periods=1).std()
+
+    return df_features
@@ -1,5 +1,4 @@
 import pandas as pd
-from spacepy import pycdf
 
 def load_cdf_to_dataframe(file_path: str) -> pd.DataFrame:
     """
@@ -18,6 +17,9 @@ def load_cdf_to_dataframe(file_path: str) -> pd.DataFrame:
         Returns an empty DataFrame if the file cannot be loaded.
     """
     try:
+        # spacepy is slow to import, so defer it until a CDF file is actually read
+        from spacepy import pycdf
+
         with pycdf.CDF(file_path) as cdf:
             data = {var: cdf[var][...] for var in cdf.keys()}
         
@@ -1,5 +1,19 @@
+from typing import Optional, Tuple
+
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Per-sample quality flags set by the cleaning stage, combined as a bit mask
+QC_MISSING = 1   # at least one channel had no measurement
+QC_SPIKE = 2     # at least one channel was removed as a spike
+QC_HAMPEL = 4    # at least one channel was replaced by the Hampel filter
+
+# Lower bound of the MAD scale relative to the median, so that flat or
+# quantized stretches (MAD of 0) do not turn every small step into an outlier
+MAD_FLOOR = 1e-3
+# Converts a median absolute deviation into a Gaussian standard deviation
+MAD_TO_SIGMA = 1.4826
 
 def handle_missing_values(df: pd.DataFrame, method: str = 'interpolate', order: int = 1) -> pd.DataFrame:
     """
@@ -48,6 +62,9 @@ def normalize_features(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         The DataFrame with numerical features normalized.
     """
+    # scikit-learn is only needed here, so it is not imported at module load
+    from sklearn.preprocessing import MinMaxScaler
+
     scaler = MinMaxScaler()
     # Create a copy to avoid SettingWithCopyWarning
     df_normalized = df.copy()
@@ -58,6 +75,211 @@ def normalize_features(df: pd.DataFrame) -> pd.DataFrame:
     
     return df_normalized
 
+def _window_median(windows: np.ndarray) -> np.ndarray:
+    """Median over the last axis, ignoring NaN; NaN where a window has no values."""
+    ordered = np.sort(windows, axis=-1)  # NaN sorts last
+    count = np.count_nonzero(~np.isnan(windows), axis=-1)
+    low = np.take_along_axis(ordered, np.maximum((count - 1) // 2, 0)[..., np.newaxis], axis=-1)[..., 0]
+    high = np.take_along_axis(ordered, np.minimum(count // 2, windows.shape[-1] - 1)[..., np.newaxis], axis=-1)[..., 0]
+    return np.where(count > 0, (low + high) / 2, np.nan)
+
+def rolling_median_mad(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Centered rolling median and robust scale of every column.
+
+    Windows are truncated at the edges and ignore NaN. The scale is the median
+    absolute deviation from the window's median, converted to a standard
+    deviation and floored at MAD_FLOOR times the median.
+
+    Args:
+        values: Array of shape (samples, channels).
+        window: Odd window length in samples.
+
+    Returns:
+        The rolling median and scale, both shaped like `values`.
+    """
+    if not len(values):
+        return np.empty(values.shape), np.empty(values.shape)
+    half = window // 2
+    padded = np.pad(values.astype(float), ((half, half), (0, 0)), constant_values=np.nan)
+    windows = sliding_window_view(padded, 2 * half + 1, axis=0)  # (samples, channels, window)
+    median = _window_median(windows)
+    mad = _window_median(np.abs(windows - median[..., np.newaxis]))
+    return median, np.maximum(MAD_TO_SIGMA * mad, MAD_FLOOR * np.abs(median))
+
+def despike(values: np.ndarray, window: int = 21, threshold: float = 6.0) -> np.ndarray:
+    """
+    Finds gross spikes: samples more than `threshold` robust standard
+    deviations from their rolling median.
+
+    A median window spans a step change such as a CME shock without being
+    pulled across it, so only short glitches stand out.
+
+    Returns:
+        Boolean mask of the spikes, shaped like `values`.
+    """
+    median, scale = rolling_median_mad(values, window)
+    with np.errstate(invalid='ignore'):
+        return np.abs(values - median) > threshold * scale
+
+def hampel_filter(values: np.ndarray, window: int = 15, n_sigmas: float = 3.5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Replaces outliers by their rolling median (Hampel filter).
+
+    Returns:
+        The filtered values and a boolean mask of the replaced samples.
+    """
+    median, scale = rolling_median_mad(values, window)
+    with np.errstate(invalid='ignore'):
+        outliers = np.abs(values - median) > n_sigmas * scale
+    return np.where(outliers, median, values), outliers
+
+def kalman_smooth(values: np.ndarray, process_ratio: float = 0.1,
+                  state: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Local-level Kalman filter, run over all channels at once.
+
+    Each channel is a random walk observed with noise. Only the ratio of the
+    process to the measurement variance matters for the estimate, so variances
+    are in units of the measurement variance. Missing samples (NaN) only
+    advance the prediction, so they come out filled. This is the causal
+    forward pass; `state` carries it across calls on consecutive chunks.
+
+    Args:
+        values: Array of shape (samples, channels).
+        process_ratio: Process variance over measurement variance; larger
+                       values follow the data more closely.
+        state: (level, variance) returned by the previous call.
+
+    Returns:
+        The filtered values and the state after the last sample.
+    """
+    channels = values.shape[1]
+    level, variance = state if state is not None else (np.full(channels, np.nan), np.full(channels, np.nan))
+    level, variance = level.copy(), variance.copy()
+    filtered = np.empty(values.shape)
+    for t, measurement in enumerate(values.astype(float)):
+        observed = ~np.isnan(measurement)
+        # The first measurement of a channel initializes its level
+        first = observed & np.isnan(level)
+        level[first] = measurement[first]
+        variance[first] = 1.0
+        update = observed & ~first
+        variance += process_ratio
+        gain = np.where(update, variance / (variance + 1.0), 0.0)
+        level = np.where(update, level + gain * (measurement - level), level)
+        variance = (1.0 - gain) * variance
+        filtered[t] = level
+    return filtered, (level, variance)
+
+class StreamingCleaner:
+    """
+    Cleans a stream of solar wind samples: despiking, Hampel filtering and an
+    optional Kalman filter, with a per-sample quality flag.
+
+    Spikes are removed (set to NaN, like missing samples, for interpolation
+    downstream) and remaining outliers are replaced by their rolling median.
+    Both filters use centered windows, so a sample is final once `lag` later
+    samples have arrived. `process` returns the samples that are final and
+    keeps the rest, together with enough past samples for their windows.
+    Feeding a series in chunks therefore gives the same result as one call,
+    at a cost linear in the number of samples.
+
+    Samples must be fed in time order. All numeric columns are cleaned.
+    """
+    def __init__(self, despike_window: int = 21, despike_threshold: float = 6.0,
+                 hampel_window: int = 15, hampel_sigmas: float = 3.5,
+                 kalman: bool = False, process_ratio: float = 0.1):
+        self.despike_window = despike_window
+        self.despike_threshold = despike_threshold
+        self.hampel_window = hampel_window
+        self.hampel_sigmas = hampel_sigmas
+        self.kalman = kalman
+        self.process_ratio = process_ratio
+        # The Hampel windows read despiked samples, whose own windows reach further
+        self.lag = despike_window // 2 + hampel_window // 2
+        self.reset()
+
+    def reset(self):
+        """Forget buffered samples and the Kalman state."""
+        self._buffer: Optional[pd.DataFrame] = None
+        self._emitted = 0  # leading buffer rows already returned, kept as window context
+        self._kalman_state = None
+
+    def process(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Feeds a chunk of samples into the cleaner.
+
+        Returns:
+            The samples that became final, cleaned, and their quality flags
+            (bit mask of QC_MISSING, QC_SPIKE and QC_HAMPEL).
+        """
+        frame = df if self._buffer is None else pd.concat([self._buffer, df])
+        ready = max(self._emitted, len(frame) - self.lag)
+        cleaned, flags = self._clean(frame, self._emitted, ready)
+        keep_from = max(0, ready - self.lag)
+        self._buffer = frame.iloc[keep_from:]
+        self._emitted = ready - keep_from
+        return cleaned, flags
+
+    def flush(self) -> Tuple[pd.DataFrame, pd.Series]:
+        """Returns the remaining samples, with windows truncated at the end of the stream."""
+        if self._buffer is None:
+            return self._clean(pd.DataFrame(), 0, 0)
+        cleaned, flags = self._clean(self._buffer, self._emitted, len(self._buffer))
+        self._buffer = self._buffer.iloc[len(self._buffer):]
+        self._emitted = 0
+        return cleaned, flags
+
+    def _clean(self, frame: pd.DataFrame, start: int, stop: int) -> Tuple[pd.DataFrame, pd.Series]:
+        """Cleans `frame` using all of it as context and returns rows start:stop."""
+        columns = frame.select_dtypes(include=['number']).columns
+        values = frame[columns].to_numpy(dtype=float)
+        flags = np.zeros(len(frame), dtype=np.uint8)
+
+        missing = np.isnan(values)
+        spikes = despike(values, self.despike_window, self.despike_threshold)
+        despiked = np.where(spikes, np.nan, values)
+        filtered, replaced = hampel_filter(despiked, self.hampel_window, self.hampel_sigmas)
+
+        flags[missing.any(axis=1)] |= QC_MISSING
+        flags[spikes.any(axis=1)] |= QC_SPIKE
+        flags[replaced.any(axis=1)] |= QC_HAMPEL
+
+        filtered = filtered[start:stop]
+        if self.kalman and len(filtered):
+            filtered, self._kalman_state = kalman_smooth(filtered, self.process_ratio, self._kalman_state)
+
+        cleaned = frame.iloc[start:stop].copy()
+        cleaned[columns] = filtered
+        return cleaned, pd.Series(flags[start:stop], index=cleaned.index, name='quality_flags')
+
+def clean_solar_wind(df: pd.DataFrame, kalman: bool = False, chunk_size: int = 100_000,
+                     **options) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Removes spikes and outliers from solar wind samples (see `StreamingCleaner`).
+
+    The series is processed in chunks so memory stays bounded on long
+    archives; the result is the same as cleaning it in one pass.
+
+    Args:
+        df: Time-ordered samples.
+        kalman: Also run the Kalman filter over every channel.
+        chunk_size: Samples per chunk.
+        **options: Filter windows and thresholds passed to `StreamingCleaner`.
+
+    Returns:
+        The cleaned DataFrame, with removed spikes and missing samples as NaN
+        unless the Kalman filter filled them, and per-sample quality flags.
+    """
+    if df.empty:
+        return df.iloc[:0].copy(), pd.Series(np.zeros(0, dtype=np.uint8), index=df.index, name='quality_flags')
+
+    cleaner = StreamingCleaner(kalman=kalman, **options)
+    parts = [cleaner.process(df.iloc[i:i + chunk_size]) for i in range(0, len(df), chunk_size)]
+    parts.append(cleaner.flush())
+    return pd.concat([part[0] for part in parts]), pd.concat([part[1] for part in parts])
+
 # Example Usage
 if __name__ == '__main__':
     # Create a sample DataFrame with missing values and a time index
@@ -0,0 +1,347 @@
+import bisect
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class CMEEvent:
+    """
+    A contiguous interval of elevated anomaly score, reported as one CME event.
+
+    Attributes:
+        event_id: Monotonically increasing identifier assigned by the detector.
+        start: Timestamp of the first sample above the enter threshold.
+        peak: Timestamp of the highest-scoring sample in the interval.
+        end: Timestamp of the last sample above the exit threshold.
+        peak_score: Anomaly score at the peak.
+        mean_score: Mean anomaly score over the samples inside the interval.
+        n_samples: Number of samples that contributed to the interval.
+    """
+    event_id: int
+    start: pd.Timestamp
+    peak: pd.Timestamp
+    end: pd.Timestamp
+    peak_score: float
+    mean_score: float
+    n_samples: int
+
+    @property
+    def duration(self) -> pd.Timedelta:
+        return self.end - self.start
+
+
+class StreamingEventDetector:
+    """
+    Segments a stream of anomaly scores into CME event intervals.
+
+    An event opens when the score rises above `enter_threshold` and stays open
+    while it remains above `exit_threshold` (hysteresis), so a noisy score
+    hovering around a single threshold does not fragment one CME passage into
+    many detections. Once the score drops below the exit threshold the event is
+    held for up to `max_gap`; if the score re-enters in that window the two
+    intervals are merged. Closed intervals shorter than `min_duration` are
+    discarded as transients.
+
+    Samples must be fed in time order. Each sample costs O(1), so the detector
+    can be driven minute-by-minute from live data or over a whole archive.
+    """
+    def __init__(self, enter_threshold: float = 0.65, exit_threshold: float = 0.5,
+                 min_duration: pd.Timedelta = pd.Timedelta(minutes=5),
+                 max_gap: pd.Timedelta = pd.Timedelta(minutes=10)):
+        self.set_thresholds(enter_threshold, exit_threshold)
+        self.min_duration = pd.Timedelta(min_duration)
+        self.max_gap = pd.Timedelta(max_gap)
+        self.reset()
+
+    def set_thresholds(self, enter_threshold: float, exit_threshold: float):
+        """
+        Changes the hysteresis thresholds.
+
+        The stream is not re-evaluated; call `reset` and `process` the stored
+        scores to re-derive events under the new thresholds.
+        """
+        if exit_threshold > enter_threshold:
+            raise ValueError("exit_threshold must not exceed enter_threshold")
+        self.enter_threshold = enter_threshold
+        self.exit_threshold = exit_threshold
+
+    def reset(self):
+        """Discard any open interval and forget the stream position."""
+        self.last_timestamp: Optional[pd.Timestamp] = None
+        self._next_id = 1
+        self._open = None
+
+    def get_state(self) -> dict:
+        """
+        Returns the stream position and open interval as a JSON-serializable
+        dict, so that a long replay can checkpoint and later resume.
+        """
+        open_state = None
+        if self._open is not None:
+            open_state = {key: value.isoformat() if isinstance(value, pd.Timestamp) else value
+                          for key, value in self._open.items()}
+        return {
+            'last_timestamp': None if self.last_timestamp is None else self.last_timestamp.isoformat(),
+            'next_id': self._next_id,
+            'open': open_state,
+        }
+
+    def set_state(self, state: dict):
+        """Restores a state produced by `get_state`."""
+        self.last_timestamp = None if state['last_timestamp'] is None else pd.Timestamp(state['last_timestamp'])
+        self._next_id = state['next_id']
+        self._open = None
+        if state['open'] is not None:
+            self._open = dict(state['open'])
+            for key in ('start', 'end', 'peak'):
+                self._open[key] = pd.Timestamp(self._open[key])
+
+    def update(self, timestamp: pd.Timestamp, score: float) -> List[CMEEvent]:
+        """
+        Feeds a single sample into the detector.
+
+        Args:
+            timestamp: Sample time; must be later than the previous sample.
+            score: Anomaly score of the sample. NaN scores are treated as
+                   below both thresholds.
+
+        Returns:
+            The events that were closed by this sample (zero or one).
+        """
+        timestamp = pd.Timestamp(timestamp)
+        self.last_timestamp = timestamp
+        closed = []
+        state = self._open
+
+        # A stale interval is closed before the sample is considered, so that
+        # a data outage longer than max_gap always splits events.
+        if state is not None and timestamp - state['end'] > self.max_gap:
+            closed.extend(self._close())
+            state = None
+
+        if state is None:
+            if score > self.enter_threshold:
+                self._open = {
+                    'start': timestamp, 'end': timestamp,
+                    'peak': timestamp, 'peak_score': float(score),
+                    'score_sum': float(score), 'n_samples': 1,
+                    'below': False,
+                }
+            return closed
+
+        # Inside an event the score only has to stay above the exit threshold.
+        # Once it has dropped out, it must climb back over the enter threshold
+        # within max_gap for the two intervals to be merged.
+        threshold = self.enter_threshold if state['below'] else self.exit_threshold
+        if score > threshold:
+            state['end'] = timestamp
+            state['below'] = False
+            state['score_sum'] += float(score)
+            state['n_samples'] += 1
+            if score > state['peak_score']:
+                state['peak'] = timestamp
+                state['peak_score'] = float(score)
+        else:
+            state['below'] = True
+
+        return closed
+
+    def process(self, timestamps, scores) -> List[CMEEvent]:
+        """
+        Feeds a batch of time-ordered samples into the detector.
+
+        A detector with no stream history segments the batch in a single
+        vectorized pass, which is how stored scores are re-derived after a
+        threshold change; otherwise samples are fed one at a time.
+
+        Args:
+            timestamps: A DatetimeIndex or array-like of sample times.
+            scores: Array-like of anomaly scores aligned with `timestamps`.
+
+        Returns:
+            All events closed while processing the batch, in time order.
+        """
+        timestamps = pd.DatetimeIndex(timestamps)
+        scores = np.asarray(scores, dtype=float)
+        if len(scores) == 0:
+            return []
+
+        if self.last_timestamp is None and self._open is None:
+            return self._process_vectorized(timestamps, scores)
+
+        closed = []
+        for timestamp, score in zip(timestamps, scores):
+            closed.extend(self.update(timestamp, score))
+        return closed
+
+    def _process_vectorized(self, timestamps: pd.DatetimeIndex, scores: np.ndarray) -> List[CMEEvent]:
+        states = _segment_scores(timestamps, scores, self.enter_threshold,
+                                 self.exit_threshold, self.max_gap)
+        self.last_timestamp = timestamps[-1]
+
+        # The final interval stays open unless a later sample already lies
+        # beyond max_gap, exactly as it would after sample-by-sample updates.
+        open_state = None
+        if states and self.last_timestamp - states[-1]['end'] <= self.max_gap:
+            open_state = states.pop()
+
+        closed = []
+        for state in states:
+            self._open = state
+            closed.extend(self._close())
+        self._open = open_state
+        return closed
+
+    def flush(self) -> List[CMEEvent]:
+        """Closes the open interval, if any, as of the last sample seen."""
+        return self._close()
+
+    def peek(self) -> Optional[CMEEvent]:
+        """Returns the currently open interval without closing it."""
+        if self._open is None:
+            return None
+        return self._build(self._open, self._next_id)
+
+    def _close(self) -> List[CMEEvent]:
+        state, self._open = self._open, None
+        if state is None or state['end'] - state['start'] < self.min_duration:
+            return []
+        event = self._build(state, self._next_id)
+        self._next_id += 1
+        return [event]
+
+    def _build(self, state, event_id: int) -> CMEEvent:
+        return CMEEvent(
+            event_id=event_id,
+            start=state['start'],
+            peak=state['peak'],
+            end=state['end'],
+            peak_score=state['peak_score'],
+            mean_score=state['score_sum'] / state['n_samples'],
+            n_samples=state['n_samples'],
+        )
+
+
+def _segment_scores(timestamps: pd.DatetimeIndex, scores: np.ndarray, enter_threshold: float,
+                    exit_threshold: float, max_gap: pd.Timedelta) -> List[dict]:
+    """
+    Vectorized form of the StreamingEventDetector state machine.
+
+    Runs of samples above the exit threshold are split at data outages longer
+    than `max_gap`; each run contributes the segment from its first sample above
+    the enter threshold to its last sample. Segments closer than `max_gap` are
+    merged into one interval. Returns the detector state for every interval,
+    without applying the minimum duration.
+    """
+    t = timestamps.asi8
+    n = len(scores)
+    gap = pd.Timedelta(max_gap).value
+
+    above_exit = scores > exit_threshold
+    outage = np.ones(n, dtype=bool)
+    outage[1:] = np.diff(t) > gap
+
+    prev_above = np.concatenate(([False], above_exit[:-1]))
+    next_above = np.concatenate((above_exit[1:], [False]))
+    next_outage = np.concatenate((outage[1:], [True]))
+    run_start = above_exit & (~prev_above | outage)
+    run_end_idx = np.flatnonzero(above_exit & (~next_above | next_outage))
+    run_id = np.cumsum(run_start) - 1
+
+    enter_idx = np.flatnonzero(scores > enter_threshold)
+    if len(enter_idx) == 0:
+        return []
+    enter_runs = run_id[enter_idx]
+    first_in_run = np.concatenate(([True], enter_runs[1:] != enter_runs[:-1]))
+    seg_start = enter_idx[first_in_run]
+    seg_end = run_end_idx[enter_runs[first_in_run]]
+
+    new_group = np.concatenate(([True], t[seg_start[1:]] - t[seg_end[:-1]] > gap))
+    group_first = np.flatnonzero(new_group)
+    group_last = np.concatenate((group_first[1:], [len(seg_start)])) - 1
+
+    # Per-segment sums via a prefix sum; scores inside segments are never NaN
+    csum = np.concatenate(([0.0], np.cumsum(np.nan_to_num(scores))))
+    seg_sum = csum[seg_end + 1] - csum[seg_start]
+    seg_len = seg_end - seg_start + 1
+    group_sum = np.add.reduceat(seg_sum, group_first)
+    group_len = np.add.reduceat(seg_len, group_first)
+
+    # Samples in the dips between merged segments are not part of the event
+    marks = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(marks, seg_start, 1)
+    np.add.at(marks, seg_end + 1, -1)
+    masked = np.where(np.cumsum(marks[:n]) > 0, scores, -np.inf)
+
+    states = []
+    for first, last, total, count in zip(group_first, group_last, group_sum, group_len):
+        lo, hi = seg_start[first], seg_end[last]
+        peak = lo + int(np.argmax(masked[lo:hi + 1]))
+        states.append({
+            'start': timestamps[lo], 'end': timestamps[hi],
+            'peak': timestamps[peak], 'peak_score': float(scores[peak]),
+            'score_sum': float(total), 'n_samples': int(count),
+            'below': bool(hi < n - 1),
+        })
+    return states
+
+
+class EventStore:
+    """
+    Time-indexed store of closed CME events.
+
+    Events produced by a single detector never overlap, so both their start
+    and end times are sorted. Range queries therefore reduce to two binary
+    searches and run in O(log n + k) for k matching events.
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._events: List[CMEEvent] = []
+        self._starts: List[pd.Timestamp] = []
+        self._ends: List[pd.Timestamp] = []
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def add(self, event: CMEEvent):
+        """Inserts an event, keeping the index ordered by start time."""
+        i = bisect.bisect_right(self._starts, event.start)
+        self._events.insert(i, event)
+        self._starts.insert(i, event.start)
+        self._ends.insert(i, event.end)
+
+    def extend(self, events: List[CMEEvent]):
+        for event in events:
+            self.add(event)
+
+    def query(self, start: Optional[pd.Timestamp] = None,
+              end: Optional[pd.Timestamp] = None) -> List[CMEEvent]:
+        """
+        Returns the events overlapping the closed interval [start, end].
+
+        Args:
+            start: Lower bound of the range; unbounded if None.
+            end: Upper bound of the range; unbounded if None.
+
+        Returns:
+            Matching events ordered by start time.
+        """
+        lo = 0 if start is None else bisect.bisect_left(self._ends, pd.Timestamp(start))
+        hi = len(self._events) if end is None else bisect.bisect_right(self._starts, pd.Timestamp(end))
+        return self._events[lo:hi]
+
+    def count(self, start: Optional[pd.Timestamp] = None,
+              end: Optional[pd.Timestamp] = None) -> int:
+        """Counts the events overlapping [start, end] without materialising them."""
+        lo = 0 if start is None else bisect.bisect_left(self._ends, pd.Timestamp(start))
+        hi = len(self._events) if end is None else bisect.bisect_right(self._starts, pd.Timestamp(end))
+        return max(0, hi - lo)
+
+    def latest(self, n: int) -> List[CMEEvent]:
+        """Returns the `n` most recent events, oldest first."""
+        return self._events[-n:] if n > 0 else []
@@ -0,0 +1,150 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from pigade.detection.events import CMEEvent, StreamingEventDetector
+
+
+def _prf(tp, fp, fn):
+    """Precision, recall and F1 from counts; works elementwise on arrays."""
+    tp, fp, fn = (np.asarray(x, dtype=float) for x in (tp, fp, fn))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    return precision, recall, f1
+
+
+def labels_from_intervals(index: pd.DatetimeIndex, intervals: pd.DataFrame) -> np.ndarray:
+    """
+    Expands labelled event intervals into a per-sample boolean mask.
+
+    Args:
+        index: Sample timestamps, sorted ascending.
+        intervals: DataFrame with 'start' and 'end' columns (inclusive bounds).
+
+    Returns:
+        A boolean array, True for samples inside any interval.
+    """
+    t = index.asi8
+    marks = np.zeros(len(t) + 1, dtype=np.int64)
+    if len(intervals):
+        lo = np.searchsorted(t, pd.DatetimeIndex(intervals['start']).asi8, side='left')
+        hi = np.searchsorted(t, pd.DatetimeIndex(intervals['end']).asi8, side='right')
+        np.add.at(marks, lo, 1)
+        np.add.at(marks, hi, -1)
+    return np.cumsum(marks[:-1]) > 0
+
+
+def pointwise_threshold_sweep(scores: np.ndarray, labels: np.ndarray,
+                              thresholds: Sequence[float]) -> Dict[str, np.ndarray]:
+    """
+    Point-wise precision/recall/F1 for many thresholds in one pass.
+
+    Scores are sorted once; the number of predicted and true positives above
+    each threshold then follows from a binary search into a suffix sum of the
+    labels. NaN scores are never predicted positive.
+
+    Args:
+        scores: Per-sample anomaly scores.
+        labels: Per-sample ground truth (True inside an event).
+        thresholds: Thresholds to evaluate; a sample is positive if score > threshold.
+
+    Returns:
+        Dict of arrays aligned with `thresholds`: tp, fp, fn, precision, recall, f1.
+    """
+    scores = np.asarray(scores, dtype=float)
+    labels = np.asarray(labels, dtype=bool)
+    valid = ~np.isnan(scores)
+
+    order = np.argsort(scores[valid], kind='stable')
+    sorted_scores = scores[valid][order]
+    sorted_labels = labels[valid][order]
+    positives_from = np.concatenate((np.cumsum(sorted_labels[::-1])[::-1], [0]))
+
+    idx = np.searchsorted(sorted_scores, np.asarray(thresholds, dtype=float), side='right')
+    tp = positives_from[idx]
+    fp = (len(sorted_scores) - idx) - tp
+    fn = labels.sum() - tp
+    precision, recall, f1 = _prf(tp, fp, fn)
+    return {'tp': tp, 'fp': fp, 'fn': fn, 'precision': precision, 'recall': recall, 'f1': f1}
+
+
+def event_metrics(detected: List[CMEEvent], truth: pd.DataFrame) -> Dict[str, float]:
+    """
+    Event-level precision/recall/F1 with boundary timing and latency.
+
+    A detection is a true positive if it overlaps any labelled event; a
+    labelled event counts as found if any detection overlaps it. For each
+    found event the first overlapping detection is used for timing.
+
+    Args:
+        detected: Detected events, sorted by start and non-overlapping.
+        truth: DataFrame with 'start' and 'end' columns, sorted by start.
+
+    Returns:
+        Dict with tp, fp, fn, precision, recall, f1, the mean absolute start
+        and end boundary errors in minutes, and the mean and median detection
+        latency in minutes (time from true onset to the detector opening the
+        event, floored at zero).
+    """
+    det_start = np.array([e.start.value for e in detected], dtype=np.int64)
+    det_end = np.array([e.end.value for e in detected], dtype=np.int64)
+    true_start = pd.DatetimeIndex(truth['start']).asi8 if len(truth) else np.empty(0, dtype=np.int64)
+    true_end = pd.DatetimeIndex(truth['end']).asi8 if len(truth) else np.empty(0, dtype=np.int64)
+
+    # First detection ending at or after each true start; it overlaps if it also starts before the true end
+    first = np.searchsorted(det_end, true_start, side='left')
+    found = first < len(det_start)
+    found[found] = det_start[first[found]] <= true_end[found]
+
+    # Same lookup from the detection side
+    first_true = np.searchsorted(true_end, det_start, side='left')
+    hit = first_true < len(true_start)
+    hit[hit] = true_start[first_true[hit]] <= det_end[hit]
+
+    tp, fp, fn = int(hit.sum()), int((~hit).sum()), int((~found).sum())
+    precision, recall, f1 = _prf(tp, fp, fn)
+
+    minute = pd.Timedelta(minutes=1).value
+    matched = first[found]
+    start_error = (det_start[matched] - true_start[found]) / minute
+    end_error = (det_end[matched] - true_end[found]) / minute
+    latency = np.maximum(0.0, start_error)
+
+    def _mean(values):
+        return float(np.mean(values)) if len(values) else float('nan')
+
+    return {
+        'tp': tp, 'fp': fp, 'fn': fn,
+        'precision': float(precision), 'recall': float(recall), 'f1': float(f1),
+        'start_error_minutes': _mean(np.abs(start_error)),
+        'end_error_minutes': _mean(np.abs(end_error)),
+        'latency_minutes': _mean(latency),
+        'median_latency_minutes': float(np.median(latency)) if len(latency) else float('nan'),
+    }
+
+
+def event_threshold_sweep(timestamps: pd.DatetimeIndex, scores: np.ndarray, truth: pd.DataFrame,
+                          thresholds: Sequence[float], hysteresis: float = 0.15,
+                          min_duration: pd.Timedelta = pd.Timedelta(minutes=5),
+                          max_gap: pd.Timedelta = pd.Timedelta(minutes=10)) -> List[Dict[str, float]]:
+    """
+    Event-level metrics for each threshold.
+
+    Events are segmented with the same detector settings the API uses
+    (exit threshold = threshold - hysteresis), including any interval still
+    open at the end of the data.
+
+    Returns:
+        One `event_metrics` dict per threshold, with 'threshold' added.
+    """
+    results = []
+    for threshold in thresholds:
+        detector = StreamingEventDetector(enter_threshold=threshold,
+                                          exit_threshold=max(0.0, threshold - hysteresis),
+                                          min_duration=min_duration, max_gap=max_gap)
+        events = detector.process(timestamps, scores) + detector.flush()
+        results.append({'threshold': float(threshold), **event_metrics(events, truth)})
+    return results
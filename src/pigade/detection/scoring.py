@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+# (column, typical quiet solar wind value, maximum contribution to the score)
+SCORE_COMPONENTS = [
+    ('proton_density', 8.0, 0.3),
+    ('alpha_proton_ratio', 0.04, 0.3),
+    ('proton_velocity', 400.0, 0.2),
+    ('proton_temperature', 100000.0, 0.2),
+]
+
+def calculate_anomaly_scores(df: pd.DataFrame) -> pd.Series:
+    """
+    Scores every sample by its relative deviation from quiet solar wind.
+
+    Each parameter contributes its relative deviation from the typical value,
+    scaled by its weight and capped at that weight. A missing value counts as
+    a full deviation. The total is capped at 1.
+
+    Args:
+        df: A feature DataFrame as produced by `add_derived_features`.
+
+    Returns:
+        A Series of anomaly scores in [0, 1] aligned with `df.index`.
+    """
+    score = np.zeros(len(df))
+
+    for col, normal, weight in SCORE_COMPONENTS:
+        if col in df.columns:
+            deviation = np.abs(df[col].to_numpy(dtype=float) - normal) / normal
+            # fmin (unlike minimum) maps NaN deviations to the cap
+            score += np.fmin(weight, deviation * weight)
+
+    return pd.Series(np.minimum(1.0, score), index=df.index, name='anomaly_score')
@@ -0,0 +1,59 @@
+import numpy as np
+
+
+class ScoreIndex:
+    """
+    Sorted index over stored anomaly scores for threshold what-if queries.
+
+    Counting the samples above a candidate threshold is a binary search over
+    the sorted scores, so a dashboard can sweep many thresholds over months of
+    data without touching the raw frame. NaN scores are excluded from the index.
+    """
+    def __init__(self, scores=None):
+        self.reset(scores)
+
+    def reset(self, scores=None):
+        """Rebuilds the index from scratch."""
+        self._sorted = np.sort(self._clean(scores))
+
+    def add(self, scores):
+        """Merges newly scored samples into the index."""
+        new = np.sort(self._clean(scores))
+        if len(new):
+            positions = np.searchsorted(self._sorted, new)
+            self._sorted = np.insert(self._sorted, positions, new)
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def count_above(self, thresholds):
+        """
+        Counts the samples strictly above each threshold.
+
+        Args:
+            thresholds: A scalar or array-like of thresholds.
+
+        Returns:
+            An int for a scalar threshold, otherwise an array of counts.
+        """
+        counts = len(self._sorted) - np.searchsorted(self._sorted, thresholds, side='right')
+        return int(counts) if np.ndim(counts) == 0 else counts
+
+    def fraction_above(self, thresholds):
+        """Fraction of indexed samples strictly above each threshold."""
+        if len(self._sorted) == 0:
+            return 0.0 if np.ndim(thresholds) == 0 else np.zeros(len(thresholds))
+        return self.count_above(thresholds) / len(self._sorted)
+
+    def quantile(self, q: float) -> float:
+        """Score at quantile `q`, e.g. to pick a threshold for a target alarm rate."""
+        if len(self._sorted) == 0:
+            return float('nan')
+        return float(self._sorted[min(len(self._sorted) - 1, int(q * len(self._sorted)))])
+
+    @staticmethod
+    def _clean(scores) -> np.ndarray:
+        if scores is None:
+            return np.empty(0)
+        scores = np.asarray(scores, dtype=float).ravel()
+        return scores[~np.isnan(scores)]
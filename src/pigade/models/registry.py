@@ -0,0 +1,398 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pigade.models.runtime import PRECISIONS, RUNTIMES, quantize_weights
+
+# Bumped when the artifact layout changes incompatibly
+ARTIFACT_FORMAT = 1
+
+# Weighted layers of each model type in the order they appear in its encoder and decoder
+VAE_LAYERS = {
+    'encoder': ('encoder/hidden', 'encoder/z_mean', 'encoder/z_log_var'),
+    'decoder': ('decoder/hidden', 'decoder/output'),
+}
+TEMPORAL_VAE_LAYERS = {
+    'encoder': ('encoder/gru', 'encoder/z_mean', 'encoder/z_log_var'),
+    'decoder': ('decoder/hidden', 'decoder/output'),
+}
+MODEL_LAYERS = {'dense': VAE_LAYERS, 'temporal': TEMPORAL_VAE_LAYERS}
+
+# Mirrors the alpha-to-proton ratio constraint in pigade.physics.constraints
+DEFAULT_PHYSICS_CONFIG = {'max_alpha_proton_ratio': 0.08, 'weight': 0.0}
+
+DEFAULT_THRESHOLDS = {'enter': 0.65, 'exit': 0.5}
+
+
+def _weight_name(variable) -> str:
+    """'kernel', 'recurrent_kernel' or 'bias' from a Keras variable name such as 'gru/gru_cell/kernel:0'."""
+    return variable.name.split('/')[-1].split(':')[0]
+
+
+def export_vae_weights(vae, model_type: str = 'dense') -> Dict[str, np.ndarray]:
+    """
+    Extracts the layer weights of a trained VAE.
+
+    Args:
+        vae: A `pigade.models.vae.VAE` ('dense') or
+             `pigade.models.temporal_vae.TemporalVAE` ('temporal') instance.
+        model_type: Key of `MODEL_LAYERS` describing the model.
+
+    Returns:
+        A dict mapping '<layer>/<weight>' (e.g. 'encoder/hidden/kernel') to
+        float32 arrays, using the layer names in `MODEL_LAYERS`.
+    """
+    weights = {}
+    for part, names in MODEL_LAYERS[model_type].items():
+        weighted = [layer for layer in getattr(vae, part).layers if layer.weights]
+        for name, layer in zip(names, weighted):
+            for variable, value in zip(layer.weights, layer.get_weights()):
+                weights[f'{name}/{_weight_name(variable)}'] = value.astype(np.float32)
+    return weights
+
+
+def load_vae_weights(vae, weights: Dict[str, np.ndarray], model_type: str = 'dense'):
+    """Sets weights exported by `export_vae_weights` on a freshly built model of the same type."""
+    for part, names in MODEL_LAYERS[model_type].items():
+        weighted = [layer for layer in getattr(vae, part).layers if layer.weights]
+        for name, layer in zip(names, weighted):
+            layer.set_weights([weights[f'{name}/{_weight_name(variable)}'] for variable in layer.weights])
+
+
+def fit_scaler(features: pd.DataFrame) -> Dict[str, List[float]]:
+    """Min-max scaling parameters per column, in the form stored in an artifact."""
+    return {
+        'min': features.min().astype(float).tolist(),
+        'max': features.max().astype(float).tolist(),
+    }
+
+
+class ModelArtifact:
+    """
+    A loaded model version: its manifest plus the weight arrays.
+
+    Loading reads one small JSON file and one or two uncompressed .npz files,
+    so an artifact is ready in milliseconds. Scoring runs on a NumPy forward
+    pass (`pigade.models.runtime`) at the artifact's runtime precision and
+    never imports TensorFlow; callers that hold a reference to an artifact
+    can keep scoring with it after a newer version has been swapped in.
+    """
+    def __init__(self, version: int, path: str, manifest: Dict[str, Any], weights: Dict[str, np.ndarray],
+                 load_seconds: float, runtime_weights: Optional[Dict[str, np.ndarray]] = None,
+                 precision: str = 'float32'):
+        self.version = version
+        self.path = path
+        self.manifest = manifest
+        self.weights = weights
+        self.runtime_weights = runtime_weights if runtime_weights is not None else weights
+        self.precision = precision
+        self.load_seconds = load_seconds
+        self.loaded_at = datetime.now()
+        self._runtime = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.manifest['feature_names']
+
+    @property
+    def thresholds(self) -> Dict[str, float]:
+        return self.manifest['thresholds']
+
+    @property
+    def model_type(self) -> str:
+        return self.manifest['architecture'].get('type', 'dense')
+
+    def accepts(self, df: pd.DataFrame) -> bool:
+        """True if `df` has every feature the model was trained on"""
+        return all(name in df.columns for name in self.feature_names)
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        """Selects and min-max scales the model's features; missing values map to mid-range."""
+        values = df[self.feature_names].to_numpy(dtype=np.float32)
+        low = np.asarray(self.manifest['scaler']['min'], dtype=np.float32)
+        high = np.asarray(self.manifest['scaler']['max'], dtype=np.float32)
+        scaled = (values - low) / np.where(high > low, high - low, 1.0)
+        return np.clip(np.nan_to_num(scaled, nan=0.5), 0.0, 1.0)
+
+    def build(self):
+        """Builds (once) and returns the NumPy scoring runtime for the model type."""
+        if self._runtime is None:
+            self._runtime = RUNTIMES[self.model_type](self.runtime_weights, self.precision)
+        return self._runtime
+
+    def stream(self) -> 'StreamingScorer':
+        """A scorer that continues from the previous call's state (see `StreamingScorer`)."""
+        return StreamingScorer(self)
+
+    def to_keras(self):
+        """Builds (once) and returns a full-precision Keras model carrying this artifact's weights."""
+        with self._lock:
+            if self._model is None:
+                if self.model_type == 'temporal':
+                    from pigade.models.temporal_vae import TemporalVAE as model_class
+                else:
+                    from pigade.models.vae import VAE as model_class
+
+                arch = self.manifest['architecture']
+                vae = model_class(original_dim=arch['original_dim'], latent_dim=arch['latent_dim'],
+                                  intermediate_dim=arch['intermediate_dim'])
+                load_vae_weights(vae, self.weights, self.model_type)
+                self._model = vae
+            return self._model
+
+    def reconstruction_error(self, x: np.ndarray) -> np.ndarray:
+        """
+        Mean squared reconstruction error per row, decoding the latent mean.
+        Temporal models treat `x` as one time-ordered sequence from a fresh state.
+        """
+        return self.build().reconstruction_error(x)
+
+    def score(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Scores every sample of `df` in [0, 1].
+
+        The reconstruction error is divided by the artifact's `score_scale`
+        (set at training time from the error on normal data) and capped at 1,
+        so the result is comparable with the detector thresholds.
+        """
+        return self.stream().update(df)
+
+
+class StreamingScorer:
+    """
+    Scores consecutive chunks of a time-ordered series with one model.
+
+    Temporal models carry their recurrent state from one `update` to the
+    next, so each new sample costs one step; for the dense VAE every row is
+    scored independently and there is no state to carry.
+
+    Rows whose features may still be revised can be scored provisionally: an
+    `update` can keep a checkpoint of the state before them, and `rewind`
+    returns there so the revised rows are scored again.
+    """
+    def __init__(self, artifact: ModelArtifact):
+        self.artifact = artifact
+        self.state = None
+        self.last_timestamp = None
+        self.checkpoint = None  # (last_timestamp, state) saved by `update`
+
+    def update(self, df: pd.DataFrame, checkpoint: Optional[int] = None) -> pd.Series:
+        """
+        Scores `df`, whose rows must follow those of the previous call, in [0, 1].
+
+        Args:
+            df: Samples with the model's features.
+            checkpoint: Keep the state after this many rows of `df` for `rewind`.
+        """
+        runtime = self.artifact.build()
+        x = self.artifact.transform(df)
+        if checkpoint is None:
+            error, self.state = runtime.run(x, self.state)
+        else:
+            checkpoint = min(max(checkpoint, 0), len(df))
+            head, self.state = runtime.run(x[:checkpoint], self.state)
+            if checkpoint:
+                self.last_timestamp = df.index[checkpoint - 1]
+            self.checkpoint = (self.last_timestamp, self.state)
+            tail, self.state = runtime.run(x[checkpoint:], self.state)
+            error = np.concatenate([head, tail])
+        if len(df):
+            self.last_timestamp = df.index[-1]
+        score = np.minimum(1.0, error / self.artifact.manifest['score_scale'])
+        return pd.Series(score, index=df.index, name='anomaly_score')
+
+    def rewind(self):
+        """Returns to the state kept by the last `update` given a checkpoint."""
+        self.last_timestamp, self.state = self.checkpoint
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts on the local filesystem.
+
+    Each version is a directory `v<NNNNNN>` holding `manifest.json` (feature
+    list, architecture, scaler, thresholds, physics-constraint config and
+    training metrics) and `weights.npz`. A save claims its version by
+    creating the directory exclusively and moves the manifest in last, and
+    the version to serve is named by an atomically replaced CURRENT file, so
+    concurrent saves never collide and readers never see a partial artifact. `export_runtime` can add a reduced-precision copy of the
+    weights (`weights-<precision>.npz`) that is then used for scoring,
+    recorded with its accuracy check in `runtime.json`.
+    """
+    def __init__(self, root: str):
+        self.root = root
+        self._pointer = os.path.join(root, 'CURRENT')
+
+    def save(self, weights: Dict[str, np.ndarray], feature_names: List[str], architecture: Dict[str, int],
+             scaler: Dict[str, List[float]], score_scale: float, thresholds: Optional[Dict[str, float]] = None,
+             physics: Optional[Dict[str, Any]] = None, metrics: Optional[Dict[str, Any]] = None,
+             activate: bool = True) -> int:
+        """
+        Stores a new model version.
+
+        Args:
+            weights: Layer weights as returned by `export_vae_weights`.
+            feature_names: Input columns, in the order the model expects them.
+            architecture: original_dim, latent_dim and intermediate_dim of the model,
+                plus 'type' ('dense' or 'temporal', default 'dense').
+            scaler: Min-max parameters as returned by `fit_scaler`.
+            score_scale: Reconstruction error that maps to an anomaly score of 1.
+            thresholds: Detector 'enter'/'exit' scores; defaults to DEFAULT_THRESHOLDS.
+            physics: Physics-constraint config used in training.
+            metrics: Training or evaluation metrics to keep with the artifact.
+            activate: Make this the version served by default.
+
+        Returns:
+            The new version number.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.root)
+        # Uncompressed so loading is a plain read of each array
+        np.savez(os.path.join(staging, 'weights.npz'), **weights)
+
+        # Claim the version by creating its directory, so concurrent saves never share one
+        version = max(self._version_numbers(), default=0) + 1
+        while True:
+            try:
+                os.makedirs(self._version_dir(version), exist_ok=False)
+                break
+            except FileExistsError:
+                version += 1
+
+        manifest = {
+            'format': ARTIFACT_FORMAT,
+            'version': version,
+            'created': datetime.now().isoformat(),
+            'feature_names': list(feature_names),
+            'architecture': {'type': 'dense', **architecture},
+            'scaler': scaler,
+            'score_scale': float(score_scale),
+            'thresholds': thresholds or dict(DEFAULT_THRESHOLDS),
+            'physics': physics or dict(DEFAULT_PHYSICS_CONFIG),
+            'metrics': metrics or {},
+        }
+
+        with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        # A version is visible once its manifest exists, so move the manifest in last
+        path = self._version_dir(version)
+        os.replace(os.path.join(staging, 'weights.npz'), os.path.join(path, 'weights.npz'))
+        os.replace(os.path.join(staging, 'manifest.json'), os.path.join(path, 'manifest.json'))
+        os.rmdir(staging)
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def versions(self) -> List[Dict[str, Any]]:
+        """Manifests of all stored versions, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        manifests = []
+        for name in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, name, 'manifest.json')
+            if name.startswith('v') and name[1:].isdigit() and os.path.exists(path):
+                with open(path) as f:
+                    manifests.append(json.load(f))
+        return manifests
+
+    def current_version(self) -> Optional[int]:
+        """Version named by CURRENT, or None if no version has been activated."""
+        try:
+            with open(self._pointer) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def activate(self, version: int):
+        """Makes `version` the one served by default."""
+        if not os.path.exists(os.path.join(self._version_dir(version), 'manifest.json')):
+            raise KeyError(f"Model version {version} does not exist")
+        tmp = f'{self._pointer}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(str(version))
+        os.replace(tmp, self._pointer)
+
+    def export_runtime(self, version: int, precision: str, accuracy: Dict[str, Any]):
+        """
+        Stores reduced-precision weights for `version` and makes them its scoring runtime.
+
+        Args:
+            version: Registry version to export.
+            precision: One of `pigade.models.runtime.PRECISIONS`.
+            accuracy: Result of the accuracy check against the full-precision model.
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {PRECISIONS}")
+        path = self._version_dir(version)
+        with np.load(os.path.join(path, 'weights.npz')) as archive:
+            weights = {name: archive[name] for name in archive.files}
+
+        if precision != 'float32':
+            # np.savez appends .npz to names without it, so keep the suffix on the temp file
+            tmp = os.path.join(path, f'.weights-{precision}.{os.getpid()}.npz')
+            np.savez(tmp, **quantize_weights(weights, precision))
+            os.replace(tmp, os.path.join(path, f'weights-{precision}.npz'))
+
+        runtime = {'precision': precision, 'exported': datetime.now().isoformat(), 'accuracy': accuracy}
+        tmp = os.path.join(path, f'.runtime.{os.getpid()}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(runtime, f, indent=2)
+        os.replace(tmp, os.path.join(path, 'runtime.json'))
+
+    def load(self, version: Optional[int] = None, precision: Optional[str] = None) -> ModelArtifact:
+        """
+        Loads a model version (the current one by default).
+
+        The scoring runtime uses `precision` if given, else the precision
+        exported for the version, else float32.
+
+        Raises:
+            KeyError: If the version does not exist or none is current.
+            ValueError: If the artifact was written in an unsupported format.
+        """
+        version = version or self.current_version()
+        path = self._version_dir(version) if version else None
+        if path is None or not os.path.exists(os.path.join(path, 'manifest.json')):
+            raise KeyError(f"Model version {version} does not exist")
+
+        started = time.perf_counter()
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported model artifact format {manifest.get('format')}")
+        with np.load(os.path.join(path, 'weights.npz')) as archive:
+            weights = {name: archive[name] for name in archive.files}
+
+        runtime_path = os.path.join(path, 'runtime.json')
+        if os.path.exists(runtime_path):
+            with open(runtime_path) as f:
+                manifest['runtime'] = json.load(f)
+        precision = precision or manifest.get('runtime', {}).get('precision', 'float32')
+        runtime_weights = None
+        if precision != 'float32':
+            runtime_file = os.path.join(path, f'weights-{precision}.npz')
+            if not os.path.exists(runtime_file):
+                raise KeyError(f"Model version {version} has no {precision} runtime")
+            with np.load(runtime_file) as archive:
+                runtime_weights = {name: archive[name] for name in archive.files}
+        return ModelArtifact(version, path, manifest, weights, time.perf_counter() - started,
+                             runtime_weights=runtime_weights, precision=precision)
+
+    def _version_numbers(self) -> List[int]:
+        """Numbers of all version directories, including ones still being written."""
+        if not os.path.isdir(self.root):
+            return []
+        return [int(name[1:]) for name in os.listdir(self.root) if name.startswith('v') and name[1:].isdigit()]
+
+    def _version_dir(self, version: int) -> str:
+        return os.path.join(self.root, f'v{version:06d}')
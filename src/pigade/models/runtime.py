@@ -0,0 +1,193 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+PRECISIONS = ('float32', 'float16', 'int8')
+
+
+def quantize_weights(weights: Dict[str, np.ndarray], precision: str) -> Dict[str, np.ndarray]:
+    """
+    Converts float32 VAE weights to a reduced-precision storage format.
+
+    float16 halves every array. int8 stores each kernel as int8 values with
+    one float32 scale per output unit (symmetric, per-channel), which keeps
+    the error of small and large columns alike; biases stay float32.
+
+    Args:
+        weights: Weights as returned by `pigade.models.registry.export_vae_weights`.
+        precision: One of PRECISIONS.
+
+    Returns:
+        A dict of arrays to store, readable by `dequantize_weights`.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}")
+    if precision == 'float32':
+        return {name: value.astype(np.float32) for name, value in weights.items()}
+    if precision == 'float16':
+        return {name: value.astype(np.float16) for name, value in weights.items()}
+
+    stored = {}
+    for name, value in weights.items():
+        if name.endswith('/kernel'):
+            scale = np.abs(value).max(axis=0) / 127.0
+            scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+            stored[name] = np.clip(np.round(value / scale), -127, 127).astype(np.int8)
+            stored[f'{name}/scale'] = scale
+        else:
+            stored[name] = value.astype(np.float32)
+    return stored
+
+
+def dequantize_weights(stored: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Expands stored weights of any precision back to float32 arrays."""
+    weights = {}
+    for name, value in stored.items():
+        if name.endswith('/scale'):
+            continue
+        if value.dtype == np.int8:
+            weights[name] = value.astype(np.float32) * stored[f'{name}/scale']
+        else:
+            weights[name] = value.astype(np.float32)
+    return weights
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    # Clipped so saturated units do not overflow exp
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -60.0, 60.0)))
+
+
+class NumpyVAE:
+    """
+    Deterministic forward pass of the VAE in plain NumPy.
+
+    Scoring only needs the encoder mean and the decoder, i.e. four small
+    dense layers, so each call is a handful of matrix products with no
+    framework dispatch and no TensorFlow import. Reduced-precision weights
+    are expanded to float32 once at construction, since NumPy has no fast
+    int8 or float16 matrix product on CPU.
+    """
+    def __init__(self, stored_weights: Dict[str, np.ndarray], precision: str = 'float32'):
+        self.precision = precision
+        w = dequantize_weights(stored_weights)
+        self._layers = [
+            (w['encoder/hidden/kernel'], w['encoder/hidden/bias']),
+            (w['encoder/z_mean/kernel'], w['encoder/z_mean/bias']),
+            (w['decoder/hidden/kernel'], w['decoder/hidden/bias']),
+            (w['decoder/output/kernel'], w['decoder/output/bias']),
+        ]
+
+    def reconstruct(self, x: np.ndarray) -> np.ndarray:
+        (w1, b1), (wz, bz), (w2, b2), (wo, bo) = self._layers
+        h = np.maximum(x @ w1 + b1, 0.0)
+        z_mean = h @ wz + bz
+        h = np.maximum(z_mean @ w2 + b2, 0.0)
+        return _sigmoid(h @ wo + bo)
+
+    def reconstruction_error(self, x: np.ndarray) -> np.ndarray:
+        """Mean squared reconstruction error per row."""
+        x = np.asarray(x, dtype=np.float32)
+        return np.mean(np.square(x - self.reconstruct(x)), axis=1)
+
+    def run(self, x: np.ndarray, state: Optional[np.ndarray] = None) -> Tuple[np.ndarray, None]:
+        """Same signature as `NumpyTemporalVAE.run`; rows are independent, so there is no state."""
+        return self.reconstruction_error(x), None
+
+
+class NumpyTemporalVAE:
+    """
+    Causal streaming forward pass of `pigade.models.temporal_vae.TemporalVAE`.
+
+    Implements the Keras GRU (reset_after=True, gates ordered update, reset,
+    candidate) followed by the per-step latent mean and decoder. `run`
+    carries the GRU hidden state across calls, so scoring a new minute costs
+    one recurrent step instead of re-encoding the window. The input
+    projections, latent mean and decoder are computed for all rows at once;
+    only the recurrent matrix-vector product runs step by step.
+
+    A fresh state starts at zero, as in training, so the first minutes of a
+    stream score slightly higher until the GRU has seen some context.
+    """
+    def __init__(self, stored_weights: Dict[str, np.ndarray], precision: str = 'float32'):
+        self.precision = precision
+        w = dequantize_weights(stored_weights)
+        self.kernel = w['encoder/gru/kernel']
+        self.recurrent_kernel = w['encoder/gru/recurrent_kernel']
+        self.input_bias, self.recurrent_bias = w['encoder/gru/bias']
+        self.units = self.recurrent_kernel.shape[0]
+        self._latent = (w['encoder/z_mean/kernel'], w['encoder/z_mean/bias'])
+        self._decoder = [
+            (w['decoder/hidden/kernel'], w['decoder/hidden/bias']),
+            (w['decoder/output/kernel'], w['decoder/output/bias']),
+        ]
+
+    def initial_state(self) -> np.ndarray:
+        return np.zeros(self.units, dtype=np.float32)
+
+    def encode(self, x: np.ndarray, state: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """GRU outputs for each row of a time-ordered sequence, and the final state."""
+        u = self.units
+        projected = x @ self.kernel + self.input_bias
+        outputs = np.empty((len(x), u), dtype=np.float32)
+        h = self.initial_state() if state is None else state
+        for t in range(len(x)):
+            recurrent = h @ self.recurrent_kernel + self.recurrent_bias
+            gates = _sigmoid(projected[t, :2 * u] + recurrent[:2 * u])
+            update, reset = gates[:u], gates[u:]
+            candidate = np.tanh(projected[t, 2 * u:] + reset * recurrent[2 * u:])
+            h = update * h + (1.0 - update) * candidate
+            outputs[t] = h
+        return outputs, h
+
+    def run(self, x: np.ndarray, state: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores a time-ordered sequence continuing from `state`.
+
+        Args:
+            x: Scaled samples, one row per time step, oldest first.
+            state: GRU state returned by the previous call, or None to start fresh.
+
+        Returns:
+            Per-row mean squared reconstruction error and the state to pass to the next call.
+        """
+        x = np.asarray(x, dtype=np.float32)
+        outputs, state = self.encode(x, state)
+        kernel, bias = self._latent
+        h = outputs @ kernel + bias
+        (w1, b1), (wo, bo) = self._decoder
+        reconstructed = _sigmoid(np.maximum(h @ w1 + b1, 0.0) @ wo + bo)
+        return np.mean(np.square(x - reconstructed), axis=1), state
+
+    def reconstruction_error(self, x: np.ndarray) -> np.ndarray:
+        """Mean squared reconstruction error per row of a sequence scored from a fresh state."""
+        return self.run(x)[0]
+
+
+RUNTIMES = {'dense': NumpyVAE, 'temporal': NumpyTemporalVAE}
+
+
+def compare_errors(reference: np.ndarray, candidate: np.ndarray, score_scale: float,
+                   threshold: float) -> Dict[str, float]:
+    """
+    Accuracy of a reduced-precision scorer against the full-precision one.
+
+    Args:
+        reference: Reconstruction errors of the full-precision model.
+        candidate: Reconstruction errors of the exported runtime, same rows.
+        score_scale: Error that maps to an anomaly score of 1.
+        threshold: Detector enter threshold, for the agreement rate.
+
+    Returns:
+        Dict with the maximum and mean relative error, the maximum absolute
+        difference in anomaly score and the fraction of rows on the same side
+        of the threshold.
+    """
+    relative = np.abs(candidate - reference) / np.maximum(np.abs(reference), 1e-12)
+    reference_score = np.minimum(1.0, reference / score_scale)
+    candidate_score = np.minimum(1.0, candidate / score_scale)
+    return {
+        'maxRelativeError': float(relative.max()),
+        'meanRelativeError': float(relative.mean()),
+        'maxScoreDifference': float(np.abs(candidate_score - reference_score).max()),
+        'thresholdAgreement': float(np.mean((candidate_score >= threshold) == (reference_score >= threshold))),
+    }
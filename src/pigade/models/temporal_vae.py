@@ -0,0 +1,65 @@
+import tensorflow as tf
+from tensorflow.keras import layers, models, backend as K
+
+class TemporalVAE(models.Model):
+    """
+    A recurrent Variational Autoencoder over windows of consecutive samples.
+
+    A GRU reads the window causally and produces a latent distribution for
+    every time step, from which the decoder reconstructs that step. The
+    latent code at minute t therefore depends on minutes <= t only, so the
+    model picks up the temporal structure of shocks and sheaths while still
+    scoring one minute at a time, with the GRU state carried forward (see
+    `pigade.models.runtime.NumpyTemporalVAE`).
+    """
+    def __init__(self, original_dim, latent_dim=2, intermediate_dim=32, name="temporal_vae", **kwargs):
+        super(TemporalVAE, self).__init__(name=name, **kwargs)
+
+        self.original_dim = original_dim
+        self.latent_dim = latent_dim
+        self.intermediate_dim = intermediate_dim
+
+        # Encoder: (batch, time, features) -> per-step latent mean and log-variance
+        encoder_inputs = layers.Input(shape=(None, original_dim))
+        h = layers.GRU(intermediate_dim, return_sequences=True, name="gru")(encoder_inputs)
+        self.z_mean = layers.Dense(latent_dim, name="z_mean")(h)
+        self.z_log_var = layers.Dense(latent_dim, name="z_log_var")(h)
+        self.encoder = models.Model(encoder_inputs, [self.z_mean, self.z_log_var], name="encoder")
+
+        # Decoder: reconstructs each step from its own latent code
+        latent_inputs = layers.Input(shape=(None, latent_dim))
+        h_decoded = layers.Dense(intermediate_dim, activation='relu', name="hidden")(latent_inputs)
+        outputs = layers.Dense(original_dim, activation='sigmoid', name="output")(h_decoded)
+        self.decoder = models.Model(latent_inputs, outputs, name="decoder")
+
+    def call(self, inputs):
+        z_mean, z_log_var = self.encoder(inputs)
+        z = self._sampling([z_mean, z_log_var])
+        reconstructed = self.decoder(z)
+
+        # Add KL divergence loss
+        kl_loss = -0.5 * tf.reduce_mean(z_log_var - tf.square(z_mean) - tf.exp(z_log_var) + 1)
+        self.add_loss(kl_loss)
+
+        return reconstructed
+
+    def _sampling(self, args):
+        """Reparameterization trick by sampling from an isotropic unit Gaussian."""
+        z_mean, z_log_var = args
+        epsilon = K.random_normal(shape=tf.shape(z_mean))
+        return z_mean + tf.exp(0.5 * z_log_var) * epsilon
+
+# Example Usage
+if __name__ == '__main__':
+    import numpy as np
+
+    # Windows of 60 one-minute samples with 5 features
+    train_windows = np.random.rand(500, 60, 5).astype('float32')
+
+    vae = TemporalVAE(original_dim=5, latent_dim=2, intermediate_dim=16)
+    vae.compile(optimizer='adam', loss='mse')
+    vae.fit(train_windows, train_windows, epochs=2, batch_size=32, verbose=1)
+
+    z_mean, _ = vae.encoder.predict(train_windows[:1])
+    reconstructed = vae.decoder.predict(z_mean)
+    print("Per-minute reconstruction error:", np.mean(np.square(train_windows[:1] - reconstructed), axis=2))
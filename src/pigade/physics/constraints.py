@@ -40,6 +40,38 @@ def calculate_physics_loss(reconstructed_data: tf.Tensor, feature_names: list) -
 
     return tf.constant(loss, dtype=tf.float32)
 
+def alpha_proton_ratio_penalty(reconstructed: tf.Tensor, feature_names: list, scaler: dict = None,
+                               max_ratio: float = 0.08) -> tf.Tensor:
+    """
+    Tensor-only form of the alpha-to-proton ratio constraint in
+    `calculate_physics_loss`, usable inside a compiled Keras loss.
+
+    Args:
+        reconstructed: The decoder output, with features on the last axis
+                       (rows, or windows of rows for the temporal VAE).
+        feature_names: Names of the features on the last axis.
+        scaler: Min-max parameters ('min', 'max' per feature) the model
+                inputs were scaled with, to recover physical densities; None
+                if `reconstructed` is already in physical units.
+        max_ratio: Largest plausible alpha-to-proton ratio in normal wind.
+
+    Returns:
+        A scalar tensor: the mean amount by which the ratio exceeds `max_ratio`.
+    """
+    if 'alpha_density' not in feature_names or 'proton_density' not in feature_names:
+        return tf.constant(0.0, dtype=tf.float32)
+
+    alpha_index = feature_names.index('alpha_density')
+    proton_index = feature_names.index('proton_density')
+    alpha = reconstructed[..., alpha_index]
+    proton = reconstructed[..., proton_index]
+    if scaler is not None:
+        alpha = alpha * (scaler['max'][alpha_index] - scaler['min'][alpha_index]) + scaler['min'][alpha_index]
+        proton = proton * (scaler['max'][proton_index] - scaler['min'][proton_index]) + scaler['min'][proton_index]
+
+    ratio = alpha / (proton + 1e-6)
+    return tf.reduce_mean(tf.maximum(0.0, ratio - max_ratio))
+
 # Example Usage
 if __name__ == '__main__':
     # Define feature names as they would appear in the data
@@ -0,0 +1,194 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Upper bounds in seconds; covers sub-millisecond endpoints up to slow pipeline runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram.
+
+    Observing a value is a binary search over the bucket bounds and a counter
+    increment, so it is cheap enough to leave on every request. Quantiles are
+    estimated by linear interpolation inside the matching bucket.
+    """
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimates the q-quantile (0 <= q <= 1) from the bucket counts."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+
+class MetricsRegistry:
+    """
+    Process-wide store of counters, gauges and histograms.
+
+    Metrics are identified by a name plus keyword labels, mirroring the
+    Prometheus data model, and can be rendered in its text exposition format.
+    """
+    def __init__(self):
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+        self._gauges: Dict[Tuple[str, tuple], float] = {}
+        self._histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        """Sets the HELP line shown for `name` in the Prometheus output."""
+        self._help[name] = help_text
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def add(self, name: str, amount: float, **labels):
+        """Adjusts a gauge, e.g. an in-flight count, by `amount`."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """
+        Times the enclosed block into histogram `name`.
+
+        Yields a dict whose 'seconds' entry holds the elapsed time once the
+        block exits, for callers that also need the duration.
+        """
+        result = {'seconds': 0.0}
+        started = time.perf_counter()
+        try:
+            yield result
+        finally:
+            result['seconds'] = time.perf_counter() - started
+            self.observe(name, result['seconds'], **labels)
+
+    def counter(self, name: str, **labels) -> float:
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0.0)
+
+    def gauge(self, name: str, **labels) -> Optional[float]:
+        return self._gauges.get((name, tuple(sorted(labels.items()))))
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def merged_histogram(self, name: str) -> Histogram:
+        """Combines every label set of histogram `name` into one."""
+        merged = Histogram()
+        with self._lock:
+            for (metric, _), histogram in self._histograms.items():
+                if metric == name:
+                    merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                    merged.sum += histogram.sum
+                    merged.count += histogram.count
+        return merged
+
+    def sum_counter(self, name: str, **match) -> float:
+        """Sums counter `name` over all label sets that include the `match` labels."""
+        wanted = set(match.items())
+        return sum(value for (metric, labels), value in list(self._counters.items())
+                   if metric == name and wanted <= set(labels))
+
+    def render_prometheus(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        self.set('process_resident_memory_bytes', resident_memory_bytes())
+        self.set('process_uptime_seconds', time.time() - self.started_at)
+
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+        def header(name, kind, emitted):
+            if name not in emitted:
+                emitted.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        emitted = set()
+        for (name, labels), value in counters:
+            header(name, 'counter', emitted)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), value in gauges:
+            header(name, 'gauge', emitted)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), histogram in histograms:
+            header(name, 'histogram', emitted)
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + (float('inf'),), histogram.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:g}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def resident_memory_bytes() -> float:
+    """Current resident set size of this process, or peak RSS where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes on Linux
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Shared registry for the API process
+registry = MetricsRegistry()
@@ -0,0 +1,192 @@
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+PROFILE_MODES = ('cprofile', 'sampling')
+ARTIFACT_EXTENSIONS = {'cprofile': '.pstats', 'sampling': '.collapsed'}
+
+
+class SamplingProfiler:
+    """
+    Samples the call stack of one thread at a fixed interval.
+
+    A background thread reads the target thread's current frame, so the
+    profiled code runs unmodified. Stacks are aggregated in the collapsed
+    format consumed by flamegraph tools (`frame;frame;frame count`).
+    """
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.001):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or self.thread_id == own:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """
+    Opt-in profiler for API requests and pipeline runs.
+
+    Nothing is profiled until `arm` is called; the request path then only
+    checks the `remaining` counter, so a disarmed profiler costs an integer
+    comparison per request. Each capture is written to `output_dir` as a
+    pstats file (cProfile) or a collapsed-stack file (sampling) whose name
+    is the artifact id. Only the newest `max_artifacts` artifacts are kept.
+    """
+    def __init__(self, output_dir: str, max_artifacts: int = 50):
+        self.output_dir = output_dir
+        self.max_artifacts = max_artifacts
+        self.remaining = 0
+        self.mode = 'cprofile'
+        self.endpoint = None
+        self._active = False
+        self._lock = threading.Lock()
+
+    def arm(self, requests: int, mode: str = 'cprofile', endpoint: Optional[str] = None):
+        """
+        Profiles the next `requests` requests (optionally only those whose
+        path starts with `endpoint`).
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"mode must be one of {PROFILE_MODES}")
+        self.mode = mode
+        self.endpoint = endpoint
+        self.remaining = requests
+
+    def disarm(self):
+        self.remaining = 0
+
+    def claim(self, path: str) -> bool:
+        """
+        Reserves a capture for a request to `path`, consuming one of the
+        armed requests. Only one capture runs at a time, since cProfile
+        cannot be nested and overlapping samples would mix requests.
+        """
+        if self.endpoint and not path.startswith(self.endpoint):
+            return False
+        with self._lock:
+            if self.remaining <= 0 or self._active:
+                return False
+            self.remaining -= 1
+            self._active = True
+            return True
+
+    @contextmanager
+    def capture(self, label: str, mode: Optional[str] = None, claimed: bool = False):
+        """
+        Profiles the enclosed block and writes the artifact. Only the
+        calling thread is profiled.
+
+        Args:
+            label: Short description used in the artifact id (e.g. the request path).
+            mode: 'cprofile' or 'sampling'; defaults to the armed mode.
+            claimed: True if the caller already reserved the capture with `claim`.
+
+        Yields:
+            A dict whose 'id' entry names the artifact once the block exits.
+        """
+        mode = mode or self.mode
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"mode must be one of {PROFILE_MODES}")
+        if not claimed:
+            with self._lock:
+                if self._active:
+                    raise RuntimeError("Another profile capture is already running")
+                self._active = True
+
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', label).strip('-')[:60] or 'capture'
+        artifact = {'id': f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{slug}-{mode}", 'mode': mode}
+        started = time.perf_counter()
+
+        if mode == 'cprofile':
+            profile = cProfile.Profile()
+            profile.enable()
+        else:
+            profile = SamplingProfiler()
+            profile.start()
+        try:
+            yield artifact
+        finally:
+            if mode == 'cprofile':
+                profile.disable()
+            else:
+                profile.stop()
+            artifact['seconds'] = time.perf_counter() - started
+
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, artifact['id'] + ARTIFACT_EXTENSIONS[mode])
+            if mode == 'cprofile':
+                profile.dump_stats(path)
+            else:
+                with open(path, 'w') as f:
+                    f.write(profile.collapsed())
+            self._prune()
+            with self._lock:
+                self._active = False
+
+    def list_artifacts(self) -> List[Dict[str, object]]:
+        """Lists stored artifacts, newest first."""
+        if not os.path.isdir(self.output_dir):
+            return []
+        artifacts = []
+        for name in os.listdir(self.output_dir):
+            stem, ext = os.path.splitext(name)
+            if ext in ARTIFACT_EXTENSIONS.values():
+                path = os.path.join(self.output_dir, name)
+                artifacts.append({
+                    'id': stem,
+                    'format': ext.lstrip('.'),
+                    'bytes': os.path.getsize(path),
+                    'created': datetime.fromtimestamp(os.path.getmtime(path)).isoformat(),
+                })
+        return sorted(artifacts, key=lambda a: a['id'], reverse=True)
+
+    def _prune(self):
+        # Ids start with the capture time, so the oldest sort last
+        for stale in self.list_artifacts()[self.max_artifacts:]:
+            try:
+                os.remove(os.path.join(self.output_dir, stale['id'] + '.' + stale['format']))
+            except FileNotFoundError:
+                pass
+
+    def artifact_path(self, artifact_id: str) -> Optional[str]:
+        """Resolves an artifact id to its file, or None if it does not exist."""
+        if not re.fullmatch(r'[A-Za-z0-9-]+', artifact_id):
+            return None
+        for ext in ARTIFACT_EXTENSIONS.values():
+            path = os.path.join(self.output_dir, artifact_id + ext)
+            if os.path.exists(path):
+                return path
+        return None
@@ -1,4 +1,3 @@
-import shap
 import numpy as np
 import pandas as pd
 
@@ -19,6 +18,9 @@ def explain_anomaly(model, normal_data, anomalous_instance, feature_names):
     Returns:
         A SHAP explanation object, which can be used for plotting.
     """
+    # Imported here so importing this module does not pull in shap
+    import shap
+
     # SHAP needs a function that takes an array and returns the model's output.
     # For a VAE-based anomaly detector, the "output" is the reconstruction error (MSE).
     def model_predict_mse(data):
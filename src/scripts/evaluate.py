@@ -0,0 +1,238 @@
+"""
+Offline evaluation of the CME detection path.
+
+Replays a labelled archive (or synthetic solar wind with injected CMEs)
+through the same cleaning, resampling, feature and scoring steps as the API,
+sweeps detection thresholds and writes a JSON report that
+`/api/anomaly-detection/metrics` serves.
+
+Like the API, scores come from the model registry's current version (or
+--model-version) when there is one, else from the heuristic scorer. The
+report records which model version it evaluated.
+
+Usage:
+    python src/scripts/evaluate.py --synthetic --days 90 --events 20
+    python src/scripts/evaluate.py --archive data/raw --labels data/labels/cme_events.csv
+    python src/scripts/evaluate.py --synthetic --model-version 3
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from pigade.data_processing.features import add_derived_features
+from pigade.data_processing.preprocessing import clean_solar_wind, handle_missing_values, resample_time_series
+from pigade.data_processing.synthetic import generate_solar_wind, inject_cme_events
+from pigade.detection.events import StreamingEventDetector
+from pigade.detection.metrics import (event_metrics, event_threshold_sweep, labels_from_intervals,
+                                      pointwise_threshold_sweep)
+from pigade.detection.scoring import calculate_anomaly_scores
+from pigade.models.registry import DEFAULT_THRESHOLDS, ModelArtifact, ModelRegistry
+
+DEFAULT_REPORT_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'evaluation', 'report.json'))
+DEFAULT_REGISTRY_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'models', 'vae'))
+
+
+def process_frame(df: pd.DataFrame, kalman: bool = False) -> pd.DataFrame:
+    """
+    Runs raw samples through the API's cleaning, resampling and feature steps.
+    `kalman` enables the Kalman filter in cleaning (PIGADE_KALMAN_SMOOTHING in the API).
+    """
+    df, _ = clean_solar_wind(df, kalman=kalman)
+    df = handle_missing_values(df, method='interpolate')
+    df = resample_time_series(df, rule='1T')
+    return add_derived_features(df)
+
+
+def score_frame(df: pd.DataFrame, model: Optional[ModelArtifact] = None, kalman: bool = False) -> pd.Series:
+    """
+    Runs raw samples through the API's processing steps and returns per-minute scores.
+
+    Args:
+        df: Raw samples indexed by timestamp.
+        model: Registry model to score with. As in the API, the heuristic
+            scorer is used if there is none or it lacks one of its features.
+        kalman: Run the Kalman filter in the cleaning step.
+    """
+    features = process_frame(df, kalman=kalman)
+    if model is None or not model.accepts(features):
+        return calculate_anomaly_scores(features)
+    return model.score(features)
+
+
+def load_model(registry_dir: str, version: Optional[int] = None) -> Optional[ModelArtifact]:
+    """
+    Loads the model the API would score with: `version` if given, else the
+    registry's current version, else None for the heuristic scorer.
+    """
+    registry = ModelRegistry(registry_dir)
+    if version is None and registry.current_version() is None:
+        return None
+    return registry.load(version)
+
+
+def load_archive(archive_dir: str) -> pd.DataFrame:
+    """Loads and time-orders every CDF file under `archive_dir`."""
+    from pigade.data_processing.loaders import load_cdf_to_dataframe
+
+    frames = []
+    for root, _, files in os.walk(archive_dir):
+        for file in sorted(files):
+            if file.endswith('.cdf'):
+                df = load_cdf_to_dataframe(os.path.join(root, file))
+                if not df.empty:
+                    frames.append(df)
+    if not frames:
+        raise ValueError(f"No valid data found in CDF files under {archive_dir}")
+    return pd.concat(frames).sort_index()
+
+
+def load_labels(path: str) -> pd.DataFrame:
+    """Reads labelled CME intervals from a CSV with 'start' and 'end' columns."""
+    labels = pd.read_csv(path, parse_dates=['start', 'end'])
+    return labels.sort_values('start').reset_index(drop=True)
+
+
+def evaluate(scores: pd.Series, truth: pd.DataFrame, thresholds: np.ndarray,
+             operating_threshold: float, hysteresis: float = 0.15) -> dict:
+    """
+    Computes point-wise and event-level metrics for a scored series.
+
+    Args:
+        scores: Per-sample anomaly scores indexed by timestamp.
+        truth: Labelled CME intervals ('start', 'end').
+        thresholds: Thresholds to sweep.
+        operating_threshold: Threshold reported as the operating point.
+        hysteresis: Gap between enter and exit thresholds, as in the API.
+
+    Returns:
+        The report dict (without run metadata).
+    """
+    values = scores.to_numpy(dtype=float)
+    labels = labels_from_intervals(scores.index, truth)
+
+    pointwise = pointwise_threshold_sweep(values, labels, thresholds)
+    events = event_threshold_sweep(scores.index, values, truth, thresholds, hysteresis=hysteresis)
+
+    detector = StreamingEventDetector(enter_threshold=operating_threshold,
+                                      exit_threshold=max(0.0, operating_threshold - hysteresis))
+    detected = detector.process(scores.index, values) + detector.flush()
+    point_op = pointwise_threshold_sweep(values, labels, [operating_threshold])
+
+    sweep = []
+    for i, threshold in enumerate(thresholds):
+        sweep.append({
+            'threshold': float(threshold),
+            'pointPrecision': float(pointwise['precision'][i]),
+            'pointRecall': float(pointwise['recall'][i]),
+            'pointF1': float(pointwise['f1'][i]),
+            'eventPrecision': events[i]['precision'],
+            'eventRecall': events[i]['recall'],
+            'eventF1': events[i]['f1'],
+            'eventTruePositives': events[i]['tp'],
+            'eventFalsePositives': events[i]['fp'],
+            'latencyMinutes': events[i]['latency_minutes'],
+        })
+
+    return {
+        'samples': int(len(values)),
+        'labelledEvents': int(len(truth)),
+        'labelledSamples': int(labels.sum()),
+        'operatingPoint': {
+            'threshold': float(operating_threshold),
+            'pointwise': {key: float(value[0]) for key, value in point_op.items()},
+            'event': event_metrics(detected, truth),
+            'detectedEvents': len(detected),
+        },
+        'sweep': sweep,
+    }
+
+
+def _json_safe(value):
+    """Replaces NaN with None so the report is strict JSON."""
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate PIGADE-X CME detection offline")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--archive', help="Directory of CDF files to replay")
+    source.add_argument('--synthetic', action='store_true', help="Replay synthetic solar wind with injected CMEs (default)")
+    parser.add_argument('--labels', help="CSV of labelled CME intervals (required with --archive)")
+    parser.add_argument('--days', type=int, default=90, help="Synthetic series length in days")
+    parser.add_argument('--events', type=int, default=20, help="Number of synthetic CMEs to inject")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for synthetic data")
+    parser.add_argument('--threshold', type=float,
+                        help="Operating threshold (default: the model's enter threshold, else 0.65)")
+    parser.add_argument('--n-thresholds', type=int, default=101, help="Number of thresholds to sweep over [0, 1]")
+    parser.add_argument('--output', default=DEFAULT_REPORT_PATH, help="Report path")
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY_PATH, help="Model registry directory")
+    scorer = parser.add_mutually_exclusive_group()
+    scorer.add_argument('--model-version', type=int, help="Registry version to score with (default: current)")
+    scorer.add_argument('--heuristic', action='store_true', help="Score with the heuristic even if a model is active")
+    args = parser.parse_args(argv)
+
+    model = None if args.heuristic else load_model(args.registry, args.model_version)
+    thresholds = model.thresholds if model is not None else DEFAULT_THRESHOLDS
+    operating_threshold = args.threshold if args.threshold is not None else thresholds['enter']
+
+    if args.archive:
+        if not args.labels:
+            parser.error("--labels is required with --archive")
+        raw = load_archive(args.archive)
+        truth = load_labels(args.labels)
+        source_name = os.path.abspath(args.archive)
+    else:
+        rng = np.random.default_rng(args.seed)
+        raw = generate_solar_wind(hours=args.days * 24, rng=rng)
+        raw, truth = inject_cme_events(raw, args.events, rng=rng)
+        source_name = f"synthetic(days={args.days}, events={args.events}, seed={args.seed})"
+
+    started = time.perf_counter()
+    scores = score_frame(raw, model)
+    scored = time.perf_counter()
+
+    report = evaluate(scores, truth, np.linspace(0.0, 1.0, args.n_thresholds), operating_threshold)
+    finished = time.perf_counter()
+
+    report = {
+        'generatedAt': datetime.now().isoformat(),
+        'source': source_name,
+        'modelVersion': model.version if model is not None else None,
+        'modelPrecision': model.precision if model is not None else None,
+        'rowsPerSecond': len(raw) / max(scored - started, 1e-9),
+        'durationSeconds': finished - started,
+        **report,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(_json_safe(report), f, indent=2)
+
+    op = report['operatingPoint']
+    print(f"Scored with {'model version %d' % model.version if model is not None else 'the heuristic scorer'}")
+    print(f"Scored {report['samples']} samples in {scored - started:.2f}s "
+          f"({report['rowsPerSecond']:.0f} rows/s)")
+    print(f"Threshold {op['threshold']:.2f}: point F1 {op['pointwise']['f1']:.3f}, "
+          f"event precision {op['event']['precision']:.3f}, recall {op['event']['recall']:.3f}, "
+          f"F1 {op['event']['f1']:.3f}, latency {op['event']['latency_minutes']:.1f} min")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
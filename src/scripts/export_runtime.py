@@ -0,0 +1,99 @@
+"""
+Exports a registered VAE to the reduced-precision NumPy scoring runtime.
+
+The weights are quantized to the requested precision and the resulting
+reconstruction errors are compared with the full-precision model (the Keras
+VAE if TensorFlow is installed, otherwise the float32 NumPy forward pass,
+which computes the same function) on processed solar wind including CMEs.
+The export is only recorded in the registry if the anomaly scores stay
+within the tolerance, after which the API scores with it on its next model
+load.
+
+Usage:
+    python src/scripts/export_runtime.py --precision int8
+    python src/scripts/export_runtime.py --version 3 --precision float16 --tolerance 0.005
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from pigade.data_processing.synthetic import generate_solar_wind, inject_cme_events
+from pigade.models.registry import ModelRegistry
+from pigade.models.runtime import PRECISIONS, RUNTIMES, compare_errors, quantize_weights
+from evaluate import process_frame
+from train import DEFAULT_REGISTRY_PATH
+
+
+def reference_errors(artifact, x: np.ndarray):
+    """Full-precision reconstruction errors, and which model produced them."""
+    try:
+        vae = artifact.to_keras()
+    except ImportError:
+        runtime = RUNTIMES[artifact.model_type](artifact.weights)
+        return runtime.reconstruction_error(x), 'numpy-float32'
+    # A temporal model reads the rows as one sequence
+    batch = x[np.newaxis] if artifact.model_type == 'temporal' else x
+    z_mean, _ = vae.encoder.predict(batch, batch_size=4096, verbose=0)
+    reconstructed = vae.decoder.predict(z_mean, batch_size=4096, verbose=0)
+    return np.mean(np.square(batch - reconstructed), axis=-1).reshape(-1), 'keras-float32'
+
+
+def _time_per_row(fn, x: np.ndarray, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(x)
+        times.append(time.perf_counter() - started)
+    return float(np.median(times)) / len(x)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a registered VAE to the NumPy scoring runtime")
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY_PATH, help="Model registry directory")
+    parser.add_argument('--version', type=int, help="Version to export (default: current)")
+    parser.add_argument('--precision', choices=PRECISIONS, default='int8')
+    parser.add_argument('--days', type=int, default=30, help="Days of synthetic data for the accuracy check")
+    parser.add_argument('--events', type=int, default=10, help="CMEs injected into the check data")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help="Maximum allowed anomaly score difference from the full-precision model")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.registry)
+    artifact = registry.load(args.version, precision='float32')
+
+    rng = np.random.default_rng(args.seed)
+    raw, _ = inject_cme_events(generate_solar_wind(hours=args.days * 24, rng=rng), args.events, rng=rng)
+    features = process_frame(raw)
+    x = artifact.transform(features[artifact.feature_names].dropna())
+
+    reference, reference_name = reference_errors(artifact, x)
+    runtime = RUNTIMES[artifact.model_type](quantize_weights(artifact.weights, args.precision), args.precision)
+    candidate = runtime.reconstruction_error(x)
+
+    accuracy = compare_errors(reference, candidate, artifact.manifest['score_scale'],
+                              artifact.thresholds['enter'])
+    accuracy.update({
+        'reference': reference_name,
+        'rows': int(len(x)),
+        'tolerance': args.tolerance,
+        'microsecondsPerRow': _time_per_row(runtime.reconstruction_error, x) * 1e6,
+    })
+    print(json.dumps(accuracy, indent=2))
+
+    if accuracy['maxScoreDifference'] > args.tolerance:
+        print(f"{args.precision} export exceeds the score tolerance of {args.tolerance}; not exported")
+        sys.exit(1)
+    registry.export_runtime(artifact.version, args.precision, accuracy)
+    print(f"Exported version {artifact.version} as {args.precision}; "
+          f"reload the model (POST /api/model/activate) to serve it")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+Historical backfill: rescore the whole archive through the live scoring path.
+
+CDF files are replayed in time order, in chunks of several files. Chunks are
+loaded, cleaned, resampled, featurized and scored in parallel worker
+processes; the parent feeds the scores through the same event detector the API
+uses, in order, and writes per-chunk score and event files plus a checkpoint
+after every chunk. Re-running the same command resumes after the last
+completed chunk.
+
+Each chunk is scored together with the neighbouring file on either side so
+that interpolation, minute resampling and rolling features see the same
+context as a single in-memory run, and only the minutes that belong to the
+chunk are kept. Results therefore match the live path as long as no single
+data gap or feature window spans a whole file.
+
+Scores come from the model registry's current version (or --model-version)
+when there is one, else from the heuristic scorer, as in the API. The
+version is fixed in the checkpoint, so a resumed run never mixes models.
+A temporal model starts each chunk from a fresh recurrent state warmed up
+over the previous file, as the API does at the start of its window. The
+event thresholds and the Kalman cleaning setting (which defaults to the
+API's PIGADE_KALMAN_SMOOTHING) are fixed in the checkpoint the same way.
+
+Usage:
+    python src/scripts/infer.py --archive data/raw --output data/scores/backfill
+    python src/scripts/infer.py --archive data/raw --output data/scores/backfill --workers 8 --files-per-chunk 4
+    python src/scripts/infer.py --archive data/raw --output data/scores/backfill --model-version 3
+    python src/scripts/infer.py --archive data/raw --output data/scores/backfill --kalman-smoothing
+"""
+import argparse
+import dataclasses
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from pigade.detection.events import CMEEvent, StreamingEventDetector
+from pigade.models.registry import DEFAULT_THRESHOLDS, ModelArtifact, ModelRegistry
+from evaluate import DEFAULT_REGISTRY_PATH, load_model, score_frame
+
+CHECKPOINT_FILE = 'checkpoint.json'
+
+# Models loaded in this worker process, by (registry, version)
+_models = {}
+
+
+def find_archive_files(archive_dir: str) -> List[str]:
+    """Lists the CDF files under `archive_dir` in time order (file names carry the date)."""
+    files = []
+    for root, _, names in os.walk(archive_dir):
+        files.extend(os.path.join(root, name) for name in names if name.endswith('.cdf'))
+    return sorted(files, key=os.path.basename)
+
+
+def plan_chunks(files: List[str], files_per_chunk: int) -> List[dict]:
+    """Groups files into chunks, each with its neighbouring files as context."""
+    chunks = []
+    for i in range(0, len(files), files_per_chunk):
+        chunks.append({
+            'index': len(chunks),
+            'files': files[i:i + files_per_chunk],
+            'prev': files[i - 1] if i > 0 else None,
+            'next': files[i + files_per_chunk] if i + files_per_chunk < len(files) else None,
+        })
+    return chunks
+
+
+def _load(path: Optional[str]) -> pd.DataFrame:
+    from pigade.data_processing.loaders import load_cdf_to_dataframe
+
+    if path is None:
+        return pd.DataFrame()
+    return load_cdf_to_dataframe(path)
+
+
+def _model(registry_dir: Optional[str], version: Optional[int]) -> Optional[ModelArtifact]:
+    if version is None:
+        return None
+    key = (registry_dir, version)
+    if key not in _models:
+        _models[key] = ModelRegistry(registry_dir).load(version)
+    return _models[key]
+
+
+def score_chunk(chunk: dict) -> dict:
+    """
+    Scores one chunk in a worker process, with the model version named by
+    the chunk's 'registry' and 'model_version' (the heuristic if None) and
+    the Kalman filter in cleaning if the chunk's 'kalman' is set.
+
+    Returns:
+        Dict with the chunk index, the per-minute scores that belong to the
+        chunk, and the number of raw rows and bytes read for the chunk itself.
+    """
+    own = [df for df in (_load(path) for path in chunk['files']) if not df.empty]
+    if not own:
+        return {'index': chunk['index'], 'scores': pd.Series(dtype=float, name='anomaly_score'),
+                'rows': 0, 'bytes': 0}
+
+    prev_df, next_df = _load(chunk['prev']), _load(chunk['next'])
+    raw = pd.concat([df for df in [prev_df] + own + [next_df] if not df.empty]).sort_index()
+    raw = raw[~raw.index.duplicated(keep='first')]
+    scores = score_frame(raw, _model(chunk.get('registry'), chunk.get('model_version')),
+                         kalman=chunk.get('kalman', False))
+
+    # Keep the minutes from this chunk's first sample up to the next chunk's first sample
+    window_start = min(df.index.min() for df in own).floor('min')
+    keep = scores.index >= window_start
+    if not next_df.empty:
+        keep &= scores.index < next_df.index.min().floor('min')
+
+    return {
+        'index': chunk['index'],
+        'scores': scores[keep],
+        'rows': sum(len(df) for df in own),
+        'bytes': sum(os.path.getsize(path) for path in chunk['files']),
+    }
+
+
+def _write_events(path: str, events):
+    columns = [field.name for field in dataclasses.fields(CMEEvent)]
+    pd.DataFrame([dataclasses.asdict(event) for event in events], columns=columns).to_csv(path, index=False)
+
+
+def _write_checkpoint(output_dir: str, checkpoint: dict):
+    # Write-then-rename so an interrupted run never leaves a torn checkpoint
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def _load_checkpoint(output_dir: str) -> Optional[dict]:
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def backfill(archive_dir: str, output_dir: str, workers: int, files_per_chunk: int,
+             enter_threshold: Optional[float] = None, exit_threshold: Optional[float] = None,
+             restart: bool = False, model: Optional[ModelArtifact] = None,
+             registry_dir: str = DEFAULT_REGISTRY_PATH, kalman: bool = False) -> dict:
+    """
+    Rescores the archive, resuming from a checkpoint in `output_dir` if present.
+
+    Args:
+        model: Registry model to score with (loaded from `registry_dir` in
+            each worker), or None for the heuristic scorer.
+        enter_threshold, exit_threshold: Event thresholds. Default to the
+            model's own; the exit threshold defaults to 0.15 below a given
+            enter threshold, as in the API.
+        kalman: Run the Kalman filter in the cleaning step.
+
+    Returns:
+        The final checkpoint dict, including total rows and throughput.
+    """
+    files = find_archive_files(archive_dir)
+    if not files:
+        raise ValueError(f"No CDF files found under {archive_dir}")
+    model_version = model.version if model is not None else None
+    chunks = plan_chunks(files, files_per_chunk)
+    for chunk in chunks:
+        chunk.update(registry=registry_dir, model_version=model_version, kalman=kalman)
+
+    thresholds = model.thresholds if model is not None else DEFAULT_THRESHOLDS
+    if enter_threshold is None:
+        enter_threshold = thresholds['enter']
+        exit_threshold = thresholds['exit'] if exit_threshold is None else exit_threshold
+    elif exit_threshold is None:
+        # As when a threshold is set through the API
+        exit_threshold = max(0.0, enter_threshold - 0.15)
+
+    os.makedirs(os.path.join(output_dir, 'scores'), exist_ok=True)
+    os.makedirs(os.path.join(output_dir, 'events'), exist_ok=True)
+
+    detector = StreamingEventDetector(enter_threshold=enter_threshold, exit_threshold=exit_threshold)
+    checkpoint = None if restart else _load_checkpoint(output_dir)
+    if checkpoint is not None:
+        if checkpoint['files'] != files or checkpoint['files_per_chunk'] != files_per_chunk:
+            raise ValueError("Archive or chunking changed since the checkpoint was written; use --restart")
+        if checkpoint.get('model_version') != model_version:
+            raise ValueError(f"Checkpoint was scored with model version {checkpoint.get('model_version')}, "
+                             f"not {model_version}; use --restart or --model-version")
+        if checkpoint['thresholds'] != [enter_threshold, exit_threshold]:
+            raise ValueError(f"Checkpoint detected events with thresholds {checkpoint['thresholds']}, "
+                             f"not {[enter_threshold, exit_threshold]}; use --restart or --threshold")
+        if checkpoint.get('kalman', False) != kalman:
+            raise ValueError(f"Checkpoint was cleaned with kalman={checkpoint.get('kalman', False)}, "
+                             f"not {kalman}; use --restart")
+        detector.set_state(checkpoint['detector'])
+        print(f"Resuming after chunk {checkpoint['next_chunk'] - 1} of {len(chunks)}")
+    else:
+        checkpoint = {
+            'files': files,
+            'files_per_chunk': files_per_chunk,
+            'model_version': model_version,
+            'thresholds': [enter_threshold, exit_threshold],
+            'kalman': kalman,
+            'next_chunk': 0,
+            'rows': 0,
+            'bytes': 0,
+            'seconds': 0.0,
+            'complete': False,
+            'detector': detector.get_state(),
+        }
+
+    pending = chunks[checkpoint['next_chunk']:]
+    started = time.perf_counter()
+    elapsed_before = checkpoint['seconds']
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded window of chunks in flight and consume results in order,
+        # since the event detector must see the scores in time order.
+        in_flight = [pool.submit(score_chunk, chunk) for chunk in pending[:2 * workers]]
+        submitted = len(in_flight)
+        while in_flight:
+            result = in_flight.pop(0).result()
+            if submitted < len(pending):
+                in_flight.append(pool.submit(score_chunk, pending[submitted]))
+                submitted += 1
+
+            index, scores = result['index'], result['scores']
+            scores.rename_axis('timestamp').to_csv(os.path.join(output_dir, 'scores', f'chunk_{index:06d}.csv'))
+            events = detector.process(scores.index, scores.to_numpy()) if len(scores) else []
+            _write_events(os.path.join(output_dir, 'events', f'chunk_{index:06d}.csv'), events)
+
+            checkpoint['next_chunk'] = index + 1
+            checkpoint['rows'] += result['rows']
+            checkpoint['bytes'] += result['bytes']
+            checkpoint['seconds'] = elapsed_before + time.perf_counter() - started
+            checkpoint['detector'] = detector.get_state()
+            _write_checkpoint(output_dir, checkpoint)
+
+            rate = checkpoint['rows'] / max(checkpoint['seconds'], 1e-9)
+            print(f"chunk {index + 1}/{len(chunks)}: {checkpoint['rows']} rows, {rate:,.0f} rows/s")
+
+    # Close the trailing event and gather all events into one file
+    _write_events(os.path.join(output_dir, 'events', 'final.csv'), detector.flush())
+    event_files = sorted(glob.glob(os.path.join(output_dir, 'events', 'chunk_*.csv')))
+    event_files.append(os.path.join(output_dir, 'events', 'final.csv'))
+    frames = [pd.read_csv(path) for path in event_files]
+    # Chunks without events only contribute the header; final.csv always supplies the columns
+    events = [frame for frame in frames if len(frame)] or frames[-1:]
+    pd.concat(events).to_csv(os.path.join(output_dir, 'events.csv'), index=False)
+
+    checkpoint['complete'] = True
+    checkpoint['rows_per_second'] = checkpoint['rows'] / max(checkpoint['seconds'], 1e-9)
+    _write_checkpoint(output_dir, checkpoint)
+    return checkpoint
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rescore the SWIS archive with the live scoring path")
+    parser.add_argument('--archive', required=True, help="Directory of CDF files to replay")
+    parser.add_argument('--output', required=True, help="Directory for scores, events and the checkpoint")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument('--files-per-chunk', type=int, default=8, help="CDF files scored per task")
+    parser.add_argument('--threshold', type=float, help="Event enter threshold (default: the model's)")
+    parser.add_argument('--exit-threshold', type=float, help="Event exit threshold (default: the model's)")
+    parser.add_argument('--restart', action='store_true', help="Ignore any existing checkpoint")
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY_PATH, help="Model registry directory")
+    parser.add_argument('--kalman-smoothing', action='store_true',
+                        help="Also Kalman-filter every channel in the cleaning stage "
+                             "(same as PIGADE_KALMAN_SMOOTHING=1, as for the API)")
+    scorer = parser.add_mutually_exclusive_group()
+    scorer.add_argument('--model-version', type=int, help="Registry version to score with (default: current)")
+    scorer.add_argument('--heuristic', action='store_true', help="Score with the heuristic even if a model is active")
+    args = parser.parse_args(argv)
+
+    model = None if args.heuristic else load_model(args.registry, args.model_version)
+    # Clean like the API, which reads the same environment variable
+    kalman = args.kalman_smoothing or os.environ.get('PIGADE_KALMAN_SMOOTHING', '').lower() in ('1', 'true', 'yes')
+    result = backfill(args.archive, args.output, args.workers, args.files_per_chunk,
+                      enter_threshold=args.threshold, exit_threshold=args.exit_threshold,
+                      restart=args.restart, model=model, registry_dir=args.registry, kalman=kalman)
+    print(f"Scored {result['rows']} rows ({result['bytes'] / 1024**2:.1f} MB) in {result['seconds']:.1f}s "
+          f"({result['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,416 @@
+"""
+Hyperparameter sweep for the VAE: latent size, hidden width and physics-loss weight.
+
+Trials train in parallel worker processes, each pinned to its own CPU cores
+with a fixed TensorFlow/BLAS thread count so that workers do not
+oversubscribe the machine. The parent processes the dataset once and writes
+it as .npy files that every worker memory-maps, so all workers share one copy
+through the page cache.
+
+Configurations are pruned by successive halving: every configuration trains
+for --min-epochs, the best 1/--eta by the ranking metric continue until
+--eta times as many epochs, and so on up to --max-epochs. Within a rung,
+early stopping ends a trial whose validation loss stopped improving; such a
+trial keeps its result and is not trained further. After every rung each
+trial is scored on held-out labelled data with the same event metrics as
+`evaluate.py`, and all trials are written to a leaderboard.
+
+Usage:
+    python src/scripts/sweep.py --synthetic --days 60 --events 20 --workers 8
+    python src/scripts/sweep.py --latent-dims 2 4 --intermediate-dims 32 64 --physics-weights 0 0.5 --register-best
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from pigade.data_processing.synthetic import generate_solar_wind, inject_cme_events
+from pigade.models.registry import DEFAULT_PHYSICS_CONFIG, ModelRegistry, export_vae_weights, fit_scaler
+from pigade.models.runtime import RUNTIMES
+from evaluate import _json_safe, evaluate, load_archive, load_labels, process_frame
+from train import (DEFAULT_REGISTRY_PATH, MODEL_FEATURES, quiet_mask, reconstruction_errors, scale,
+                   train_vae, training_windows)
+
+DEFAULT_SWEEP_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'sweeps'))
+
+# Read by NumPy's BLAS and TensorFlow when they start, so they must be set before workers spawn
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                   'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS')
+
+RANK_METRICS = {
+    # name: (result key, True if higher is better)
+    'eventF1': ('eventF1', True),
+    'valLoss': ('valLoss', False),
+}
+
+# Per-process state of a worker
+_worker = {'threads': 1, 'tensorflow_configured': False, 'dataset': None}
+
+
+def prepare_dataset(raw: pd.DataFrame, truth: pd.DataFrame, data_dir: str, model_type: str = 'dense',
+                    window: int = 120, eval_fraction: float = 0.3) -> dict:
+    """
+    Processes the data once and writes it for the workers to memory-map.
+
+    The series is split in time: quiet samples from the first part are the
+    training set, and the last `eval_fraction` (all samples, with the
+    labelled CMEs that fall in it) is the evaluation set.
+
+    Args:
+        raw: Raw samples indexed by timestamp.
+        truth: Labelled CME intervals ('start', 'end').
+        data_dir: Directory for the .npy files and metadata.
+        model_type: 'dense' (training rows) or 'temporal' (training windows).
+        window: Window length in minutes for 'temporal'.
+        eval_fraction: Fraction of the series held out for evaluation.
+
+    Returns:
+        The dataset metadata, also written to meta.json.
+    """
+    features = process_frame(raw)
+    split = int(len(features) * (1 - eval_fraction))
+    train_features, eval_features = features.iloc[:split], features.iloc[split:]
+
+    mask = quiet_mask(train_features)
+    scaler = fit_scaler(train_features.loc[mask, MODEL_FEATURES])
+    if model_type == 'temporal':
+        train = training_windows(scale(train_features, scaler), mask, window, stride=window // 2)
+    else:
+        train = scale(train_features.loc[mask], scaler)
+    # Same treatment of out-of-range and missing values as ModelArtifact.transform
+    evaluation = np.clip(np.nan_to_num(scale(eval_features, scaler), nan=0.5), 0.0, 1.0)
+
+    os.makedirs(data_dir, exist_ok=True)
+    np.save(os.path.join(data_dir, 'train.npy'), train)
+    np.save(os.path.join(data_dir, 'eval.npy'), evaluation)
+    np.save(os.path.join(data_dir, 'eval_index.npy'), eval_features.index.asi8)
+    eval_truth = truth[(truth['end'] >= eval_features.index[0]) & (truth['start'] <= eval_features.index[-1])]
+    eval_truth.to_csv(os.path.join(data_dir, 'labels.csv'), index=False)
+
+    meta = {
+        'modelType': model_type,
+        'window': window if model_type == 'temporal' else None,
+        'featureNames': MODEL_FEATURES,
+        'scaler': scaler,
+        'trainSamples': int(len(train)),
+        'evalSamples': int(len(evaluation)),
+        'evalEvents': int(len(eval_truth)),
+    }
+    with open(os.path.join(data_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def load_dataset(data_dir: str) -> dict:
+    """Memory-maps a dataset written by `prepare_dataset`."""
+    with open(os.path.join(data_dir, 'meta.json')) as f:
+        meta = json.load(f)
+    index = pd.DatetimeIndex(np.load(os.path.join(data_dir, 'eval_index.npy')).view('datetime64[ns]'))
+    return {
+        'meta': meta,
+        'train': np.load(os.path.join(data_dir, 'train.npy'), mmap_mode='r'),
+        'eval': np.load(os.path.join(data_dir, 'eval.npy'), mmap_mode='r'),
+        'eval_index': index,
+        'truth': load_labels(os.path.join(data_dir, 'labels.csv')),
+    }
+
+
+def _init_worker(threads: int, counter):
+    """Pins a new worker to its own `threads` cores (where supported)."""
+    _worker['threads'] = threads
+    with counter.get_lock():
+        slot = counter.value
+        counter.value += 1
+    if hasattr(os, 'sched_setaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+        first = (slot * threads) % len(cpus)
+        os.sched_setaffinity(0, cpus[first:first + threads] or cpus)
+
+
+def _configure_tensorflow():
+    if not _worker['tensorflow_configured']:
+        import tensorflow as tf
+
+        tf.config.threading.set_intra_op_parallelism_threads(_worker['threads'])
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+        _worker['tensorflow_configured'] = True
+
+
+def _dataset(data_dir: str) -> dict:
+    if _worker['dataset'] is None or _worker['dataset']['dir'] != data_dir:
+        _worker['dataset'] = {'dir': data_dir, **load_dataset(data_dir)}
+    return _worker['dataset']
+
+
+def evaluate_weights(weights: Dict[str, np.ndarray], score_scale: float, data: dict,
+                     n_thresholds: int = 51, operating_threshold: float = 0.65) -> dict:
+    """
+    Event metrics of a model on the evaluation set, scored with the API's NumPy runtime.
+
+    Returns:
+        Metrics at the best threshold of the sweep and at `operating_threshold`.
+    """
+    runtime = RUNTIMES[data['meta']['modelType']](weights)
+    errors = runtime.reconstruction_error(np.asarray(data['eval']))
+    scores = pd.Series(np.minimum(1.0, errors / score_scale), index=data['eval_index'])
+    report = evaluate(scores, data['truth'], np.linspace(0.0, 1.0, n_thresholds), operating_threshold)
+
+    # On ties prefer the higher threshold, which raises fewer alerts in operation
+    best = max(report['sweep'], key=lambda row: (row['eventF1'], row['threshold']))
+    operating = report['operatingPoint']['event']
+    return {
+        'bestThreshold': best['threshold'],
+        'eventF1': best['eventF1'],
+        'eventPrecision': best['eventPrecision'],
+        'eventRecall': best['eventRecall'],
+        'latencyMinutes': best['latencyMinutes'],
+        'pointF1': best['pointF1'],
+        'operatingEventF1': operating['f1'],
+    }
+
+
+def run_trial(task: dict) -> dict:
+    """
+    Trains one configuration for its next rung and evaluates it (runs in a worker).
+
+    Continues from the trial's saved weights if an earlier rung trained it,
+    and saves the new weights to the trial directory.
+    """
+    _configure_tensorflow()
+    data = _dataset(task['data_dir'])
+    meta = data['meta']
+    config = task['config']
+    weights_path = os.path.join(task['trial_dir'], 'weights.npz')
+    initial_weights = None
+    if os.path.exists(weights_path):
+        with np.load(weights_path) as archive:
+            initial_weights = {name: archive[name] for name in archive.files}
+
+    started = time.perf_counter()
+    vae, history = train_vae(
+        data['train'], meta['modelType'], config['latentDim'], config['intermediateDim'],
+        epochs=task['epochs'], batch_size=task['batch_size'], seed=task['seed'],
+        physics_weight=config['physicsWeight'], scaler=meta['scaler'], initial_weights=initial_weights,
+        patience=task['patience'], verbose=0,
+    )
+    seconds = time.perf_counter() - started
+
+    weights = export_vae_weights(vae, meta['modelType'])
+    os.makedirs(task['trial_dir'], exist_ok=True)
+    np.savez(weights_path, **weights)
+
+    errors = reconstruction_errors(vae, np.asarray(data['train']))
+    score_scale = 2.0 * float(np.quantile(errors, 0.999))
+    val_losses = history.history['val_loss']
+    return {
+        'trialId': task['trial_id'],
+        'epochsTrained': len(val_losses),
+        'stoppedEarly': len(val_losses) < task['epochs'],
+        'valLoss': float(min(val_losses)),
+        'scoreScale': score_scale,
+        'trainingSeconds': seconds,
+        **evaluate_weights(weights, score_scale, data, task['n_thresholds']),
+    }
+
+
+def successive_halving(configs: List[dict], executor, settings: dict,
+                       trial_fn: Callable[[dict], dict] = run_trial) -> List[dict]:
+    """
+    Runs every configuration through successive-halving rungs.
+
+    Args:
+        configs: Hyperparameter dicts (latentDim, intermediateDim, physicsWeight).
+        executor: Executor the trials are submitted to.
+        settings: data_dir, trials_dir, min_epochs, max_epochs, eta, patience,
+                  batch_size, seed, n_thresholds and rank_by.
+        trial_fn: Function that trains and evaluates one task.
+
+    Returns:
+        One result per configuration, from the last rung it reached.
+    """
+    key, higher_is_better = RANK_METRICS[settings['rank_by']]
+    trials = {i: {'trialId': i, **config, 'epochs': 0, 'rung': -1, 'stoppedEarly': False}
+              for i, config in enumerate(configs)}
+    survivors = list(trials)
+    budget, rung = settings['min_epochs'], 0
+
+    while survivors:
+        futures = {}
+        for trial_id in survivors:
+            trial = trials[trial_id]
+            if trial['stoppedEarly'] or trial['epochs'] >= budget:
+                continue
+            task = {
+                'trial_id': trial_id,
+                'config': {name: trial[name] for name in ('latentDim', 'intermediateDim', 'physicsWeight')},
+                'epochs': budget - trial['epochs'],
+                'trial_dir': os.path.join(settings['trials_dir'], f'trial_{trial_id:03d}'),
+                **{name: settings[name] for name in ('data_dir', 'patience', 'batch_size', 'seed', 'n_thresholds')},
+            }
+            futures[executor.submit(trial_fn, task)] = trial_id
+
+        for future in as_completed(futures):
+            result = future.result()
+            trial = trials[futures[future]]
+            trial.update({name: value for name, value in result.items() if name != 'epochsTrained'})
+            trial['epochs'] += result['epochsTrained']
+            print(f"rung {rung} trial {trial['trialId']:3d} latent={trial['latentDim']} "
+                  f"hidden={trial['intermediateDim']} physics={trial['physicsWeight']:g}: "
+                  f"{trial['epochs']} epochs, val loss {trial['valLoss']:.5f}, event F1 {trial['eventF1']:.3f}")
+        # Trials that stopped early keep their result and still count as reaching the rung
+        for trial_id in survivors:
+            trials[trial_id]['rung'] = rung
+
+        if budget >= settings['max_epochs'] or len(survivors) == 1:
+            break
+        ranked = sorted(survivors, key=lambda i: trials[i].get(key, float('nan')), reverse=higher_is_better)
+        survivors = ranked[:max(1, math.ceil(len(survivors) / settings['eta']))]
+        budget = min(settings['max_epochs'], budget * settings['eta'])
+        rung += 1
+
+    return list(trials.values())
+
+
+def leaderboard(trials: List[dict], rank_by: str) -> pd.DataFrame:
+    """Trials ordered by rung reached, then by the ranking metric."""
+    key, higher_is_better = RANK_METRICS[rank_by]
+    board = pd.DataFrame(trials)
+    board = board.sort_values(['rung', key], ascending=[False, not higher_is_better]).reset_index(drop=True)
+    board.insert(0, 'rank', np.arange(1, len(board) + 1))
+    return board
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep for the PIGADE-X VAE")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--archive', help="Directory of CDF files")
+    source.add_argument('--synthetic', action='store_true', help="Synthetic solar wind with injected CMEs (default)")
+    parser.add_argument('--labels', help="CSV of labelled CME intervals (required with --archive)")
+    parser.add_argument('--days', type=int, default=60, help="Synthetic series length in days")
+    parser.add_argument('--events', type=int, default=20, help="Number of synthetic CMEs to inject")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    parser.add_argument('--model-type', choices=('dense', 'temporal'), default='dense')
+    parser.add_argument('--window', type=int, default=120, help="Window length in minutes (temporal only)")
+    parser.add_argument('--latent-dims', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--intermediate-dims', type=int, nargs='+', default=[16, 32, 64])
+    parser.add_argument('--physics-weights', type=float, nargs='+', default=[0.0, 0.1, 1.0])
+    parser.add_argument('--min-epochs', type=int, default=2, help="Epochs in the first rung")
+    parser.add_argument('--max-epochs', type=int, default=18, help="Epochs in the last rung")
+    parser.add_argument('--eta', type=int, default=3, help="Keep 1/eta of the trials per rung")
+    parser.add_argument('--patience', type=int, default=3, help="Early-stopping patience in epochs")
+    parser.add_argument('--batch-size', type=int, help="Rows (dense, default 256) or windows (temporal, default 32)")
+    parser.add_argument('--rank-by', choices=sorted(RANK_METRICS), default='eventF1')
+    parser.add_argument('--eval-fraction', type=float, default=0.3, help="Trailing fraction held out for evaluation")
+    parser.add_argument('--n-thresholds', type=int, default=51, help="Thresholds swept when evaluating a trial")
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPUs / threads per worker)")
+    parser.add_argument('--output', help="Sweep directory (default: data/sweeps/<timestamp>)")
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY_PATH, help="Model registry directory")
+    parser.add_argument('--register-best', action='store_true', help="Register the winning model (not activated)")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.join(DEFAULT_SWEEP_DIR, datetime.now().strftime('%Y%m%dT%H%M%S'))
+    data_dir = os.path.join(output, 'data')
+
+    if args.archive:
+        if not args.labels:
+            parser.error("--labels is required with --archive")
+        raw, truth = load_archive(args.archive), load_labels(args.labels)
+        source_name = os.path.abspath(args.archive)
+    else:
+        rng = np.random.default_rng(args.seed)
+        raw, truth = inject_cme_events(generate_solar_wind(hours=args.days * 24, rng=rng), args.events, rng=rng)
+        source_name = f"synthetic(days={args.days}, events={args.events}, seed={args.seed})"
+    meta = prepare_dataset(raw, truth, data_dir, args.model_type, args.window, args.eval_fraction)
+    print(f"Prepared {meta['trainSamples']} training samples and {meta['evalSamples']} evaluation "
+          f"samples ({meta['evalEvents']} labelled events) in {data_dir}")
+
+    configs = [{'latentDim': latent, 'intermediateDim': hidden, 'physicsWeight': weight}
+               for latent, hidden, weight in itertools.product(args.latent_dims, args.intermediate_dims,
+                                                               args.physics_weights)]
+    settings = {
+        'data_dir': data_dir,
+        'trials_dir': os.path.join(output, 'trials'),
+        'min_epochs': args.min_epochs,
+        'max_epochs': args.max_epochs,
+        'eta': args.eta,
+        'patience': args.patience,
+        'batch_size': args.batch_size or (32 if args.model_type == 'temporal' else 256),
+        'seed': args.seed,
+        'n_thresholds': args.n_thresholds,
+        'rank_by': args.rank_by,
+    }
+
+    threads = args.threads_per_worker
+    workers = args.workers or max(1, (os.cpu_count() or 1) // threads)
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads if name != 'TF_NUM_INTEROP_THREADS' else 1)
+    # Spawned (not forked) workers start their thread pools with the limits above
+    context = multiprocessing.get_context('spawn')
+    counter = context.Value('i', 0)
+
+    started = time.perf_counter()
+    print(f"Sweeping {len(configs)} configurations on {workers} workers x {threads} threads")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(threads, counter)) as executor:
+        trials = successive_halving(configs, executor, settings)
+    elapsed = time.perf_counter() - started
+
+    board = leaderboard(trials, args.rank_by)
+    board.to_csv(os.path.join(output, 'leaderboard.csv'), index=False)
+    with open(os.path.join(output, 'leaderboard.json'), 'w') as f:
+        json.dump(_json_safe({
+            'generatedAt': datetime.now().isoformat(),
+            'source': source_name,
+            'dataset': meta,
+            'settings': {name: value for name, value in settings.items() if not name.endswith('_dir')},
+            'workers': workers,
+            'threadsPerWorker': threads,
+            'durationSeconds': elapsed,
+            'trials': board.to_dict(orient='records'),
+        }), f, indent=2)
+
+    columns = ['rank', 'latentDim', 'intermediateDim', 'physicsWeight', 'epochs', 'valLoss', 'eventF1',
+               'bestThreshold', 'latencyMinutes']
+    print(f"\nSweep finished in {elapsed:.1f}s; leaderboard written to {output}")
+    print(board[columns].head(10).to_string(index=False))
+
+    if args.register_best:
+        best = board.iloc[0]
+        with np.load(os.path.join(settings['trials_dir'], f"trial_{int(best['trialId']):03d}", 'weights.npz')) as archive:
+            weights = {name: archive[name] for name in archive.files}
+        architecture = {'type': args.model_type, 'original_dim': len(MODEL_FEATURES),
+                        'latent_dim': int(best['latentDim']), 'intermediate_dim': int(best['intermediateDim'])}
+        if args.model_type == 'temporal':
+            architecture['window'] = args.window
+        threshold = float(best['bestThreshold'])
+        version = ModelRegistry(args.registry).save(
+            weights,
+            feature_names=MODEL_FEATURES,
+            architecture=architecture,
+            scaler=meta['scaler'],
+            score_scale=float(best['scoreScale']),
+            thresholds={'enter': threshold, 'exit': max(0.0, threshold - 0.15)},
+            physics={**DEFAULT_PHYSICS_CONFIG, 'weight': float(best['physicsWeight'])},
+            metrics=_json_safe({'source': source_name, 'sweep': output, 'epochs': int(best['epochs']),
+                                'valLoss': float(best['valLoss']), 'eventF1': float(best['eventF1']),
+                                'latencyMinutes': float(best['latencyMinutes'])}),
+            activate=False,
+        )
+        print(f"Registered the best configuration as version {version} (activate with POST /api/model/activate)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+# The package lives under src/; the scripts and the API modules import each other by name
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'scripts'))
+sys.path.insert(0, os.path.join(ROOT, 'deployment', 'api'))
+
+MODEL_FEATURES = ['proton_density', 'alpha_density', 'proton_velocity', 'proton_temperature', 'alpha_proton_ratio']
+
+
+def dense_weights(rng: np.random.Generator, original_dim: int = 5, intermediate_dim: int = 8,
+                  latent_dim: int = 2) -> dict:
+    """Random weights in the layout of registry.export_vae_weights for the dense VAE"""
+    shapes = {
+        'encoder/hidden': (original_dim, intermediate_dim),
+        'encoder/z_mean': (intermediate_dim, latent_dim),
+        'encoder/z_log_var': (intermediate_dim, latent_dim),
+        'decoder/hidden': (latent_dim, intermediate_dim),
+        'decoder/output': (intermediate_dim, original_dim),
+    }
+    weights = {}
+    for name, (rows, columns) in shapes.items():
+        weights[f'{name}/kernel'] = rng.normal(0, 0.5, (rows, columns)).astype(np.float32)
+        weights[f'{name}/bias'] = rng.normal(0, 0.1, columns).astype(np.float32)
+    return weights
+
+
+def temporal_weights(rng: np.random.Generator, original_dim: int = 5, units: int = 6, intermediate_dim: int = 8,
+                     latent_dim: int = 2) -> dict:
+    """Random weights in the layout of registry.export_vae_weights for the temporal VAE"""
+    return {
+        'encoder/gru/kernel': rng.normal(0, 0.5, (original_dim, 3 * units)),
+        'encoder/gru/recurrent_kernel': rng.normal(0, 0.5, (units, 3 * units)),
+        'encoder/gru/bias': rng.normal(0, 0.1, (2, 3 * units)),
+        'encoder/z_mean/kernel': rng.normal(0, 0.5, (units, latent_dim)),
+        'encoder/z_mean/bias': rng.normal(0, 0.1, latent_dim),
+        'decoder/hidden/kernel': rng.normal(0, 0.5, (latent_dim, intermediate_dim)),
+        'decoder/hidden/bias': rng.normal(0, 0.1, intermediate_dim),
+        'decoder/output/kernel': rng.normal(0, 0.5, (intermediate_dim, original_dim)),
+        'decoder/output/bias': rng.normal(0, 0.1, original_dim),
+    }
+
+
+@pytest.fixture
+def model_registry(tmp_path):
+    """A registry under tmp_path/models/vae holding one active dense model"""
+    from pigade.models.registry import ModelRegistry
+
+    registry = ModelRegistry(str(tmp_path / 'models' / 'vae'))
+    registry.save(
+        dense_weights(np.random.default_rng(0)), MODEL_FEATURES,
+        {'original_dim': 5, 'latent_dim': 2, 'intermediate_dim': 8},
+        {'min': [1.0, 0.01, 200.0, 10000.0, 0.0], 'max': [40.0, 3.0, 900.0, 300000.0, 0.2]},
+        score_scale=0.1, thresholds={'enter': 0.7, 'exit': 0.55}
+    )
+    return registry
@@ -0,0 +1,472 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import MODEL_FEATURES, dense_weights, temporal_weights
+from data_plane import DataPlane
+from data_service import DataService
+from ingest import ingest_once
+from pigade.data_processing.synthetic import generate_solar_wind, inject_cme_events
+from pigade.utils.profiling import Profiler
+
+
+@pytest.fixture
+def solar_wind():
+    """36 hours of one-minute solar wind with four CME signatures"""
+    rng = np.random.default_rng(3)
+    df = generate_solar_wind(hours=36, end=pd.Timestamp('2026-01-01 12:00'), rng=rng)
+    df, _ = inject_cme_events(df, 4, min_hours=1, max_hours=3, rng=rng)
+    return df
+
+
+@pytest.fixture
+def service(tmp_path):
+    return DataService(str(tmp_path))
+
+
+def test_metrics_endpoint_exposes_request_timings():
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    assert client.get('/api/data-pipeline/steps').status_code == 200
+    response = client.get('/metrics')
+    assert response.headers['content-type'].startswith('text/plain')
+    lines = response.text.splitlines()
+    assert any(line.startswith('api_requests_total{endpoint="/api/data-pipeline/steps",status="200"} ')
+               for line in lines)
+    assert any(line.startswith('api_request_seconds_bucket{endpoint="/api/data-pipeline/steps",method="GET",le="+Inf"} ')
+               for line in lines)
+
+
+def test_response_cache_evicts_least_recently_used():
+    from response_cache import ResponseCache, etag_matches
+
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    first = cache.put(('a',), b'1234')
+    cache.put(('b',), b'5678')
+    assert cache.get(('a',)) is first
+    cache.put(('c',), b'90')
+    # ('b',) was the least recently used
+    assert cache.get(('b',)) is None and len(cache) == 2
+
+    cache.put(('d',), b'123456')
+    assert cache.get(('a',)) is None and cache.size_bytes == 8
+    # Oversized bodies are returned but never retained
+    assert cache.put(('e',), b'x' * 11).body == b'x' * 11
+    assert cache.get(('e',)) is None and cache.size_bytes == 8
+
+    etag = first.etag
+    assert etag == cache.put(('f',), b'1234').etag
+    assert etag_matches(etag, etag) and etag_matches(f'"other", W/{etag}', etag) and etag_matches('*', etag)
+    assert not etag_matches(None, etag) and not etag_matches('"other"', etag)
+
+
+def test_warm_up_moves_from_cold_to_ready(service, solar_wind):
+    assert service.warmup_state['status'] == 'cold' and not service.is_ready
+    seen = []
+
+    def load():
+        seen.append((service.warmup_state['status'], service.is_ready))
+        return solar_wind
+
+    service.load_real_data = load
+    service.warm_up()
+    assert seen == [('warming', False)]
+    assert service.warmup_state['status'] == 'ready' and service.is_ready
+    assert service.warmup_state['error'] is None and service.warmup_state['seconds'] >= 0
+
+
+def test_failed_warm_up_is_reported(service):
+    def load():
+        raise OSError('archive unavailable')
+
+    service.load_real_data = load
+    service.warm_up()
+    assert service.warmup_state['status'] == 'failed' and not service.is_ready
+    assert service.warmup_state['error'] == 'archive unavailable'
+
+
+def test_api_imports_within_budget_without_heavy_libraries():
+    lazy = ('spacepy', 'sklearn', 'tensorflow', 'shap')
+    probe = ("import json, sys, time; started = time.perf_counter(); import main; "
+             f"print(json.dumps([time.perf_counter() - started, [m for m in {lazy!r} if m in sys.modules]]))")
+    api_dir = os.path.join(os.path.dirname(__file__), '..', 'deployment', 'api')
+    runs = []
+    for _ in range(3):
+        completed = subprocess.run([sys.executable, '-W', 'ignore', '-c', probe], cwd=api_dir,
+                                   capture_output=True, text=True, check=True)
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    # The same budget as the benchmarks' startup group, on the fastest of three runs
+    assert min(seconds for seconds, _ in runs) < 1.5
+    assert runs[0][1] == []
+
+
+def test_sample_records_encode_like_per_sample_dicts():
+    from records import encode_samples, sample_records
+
+    index = pd.date_range('2026-01-01', periods=4, freq='1min')
+    features = pd.DataFrame({
+        'proton_density': [5.0, np.nan, 0.1 + 0.2, 7.25],
+        'proton_velocity': [400.0, 410.5, np.inf, 1e-7],
+        'proton_temperature': [1e5, 2e5, 3e5, 4e5],
+    }, index=index)
+    scores = pd.Series([0.1, 0.9, np.nan, 0.333], index=index)
+    records = sample_records(features, scores)
+
+    def number(value):
+        return value if np.isfinite(value) else None
+
+    expected = [{
+        'timestamp': t.isoformat(), 'anomalyScore': number(scores[t]),
+        'protonDensity': number(features.at[t, 'proton_density']), 'alphaDensity': 0.0,
+        'protonVelocity': number(features.at[t, 'proton_velocity']),
+        'protonTemperature': number(features.at[t, 'proton_temperature']),
+    } for t in index]
+    assert json.loads(encode_samples(records)) == expected
+    assert json.loads(encode_samples(records[:0])) == []
+
+    # Sub-second timestamps keep their microseconds
+    records['timestamp'] += np.timedelta64(500, 'ms')
+    assert json.loads(encode_samples(records))[0]['timestamp'] == (index[0] + pd.Timedelta(milliseconds=500)).isoformat()
+
+
+def test_encoded_detections_match_json_dumps():
+    from records import Detection, encode_detections
+
+    detection = Detection(7, '2026-01-01T00:05:00', 'Halo CME', 0.8125, 81, 'ongoing', ['proton_velocity', 'a "b"'],
+                          '2026-01-01T00:05:00', '2026-01-01T00:10:00', '2026-01-01T00:30:00', float('nan'))
+    [decoded] = json.loads(encode_detections([detection]))
+    assert list(decoded) == ['id', 'timestamp', 'type', 'score', 'confidence', 'status', 'features',
+                             'startTime', 'peakTime', 'endTime', 'durationMinutes']
+    assert decoded['features'] == ['proton_velocity', 'a "b"']
+    assert decoded['score'] == 0.8125 and decoded['durationMinutes'] is None
+    assert json.loads(encode_detections([])) == []
+
+
+def test_detections_after_window_slides(service, solar_wind):
+    service.process_data_pipeline(solar_wind.iloc[:24 * 60])
+    assert service.get_anomaly_detections(limit=None)
+
+    # The second window drops the first 12 hours, along with the events in them
+    window = solar_wind.iloc[12 * 60:]
+    service.process_data_pipeline(window)
+    detections = service.get_anomaly_detections(limit=None)
+    assert detections
+    for detection in detections:
+        assert pd.Timestamp(detection.start_time) >= window.index[0]
+    assert len(service.get_anomaly_detections()) == min(3, len(detections))
+
+
+def test_threshold_change_keeps_window_events(service, solar_wind):
+    service.process_data_pipeline(solar_wind.iloc[:24 * 60])
+    service.process_data_pipeline(solar_wind.iloc[12 * 60:])
+    ingested = service.event_store.query()
+    threshold = service.detection_threshold
+
+    service.set_detection_threshold(threshold + 0.1)
+    assert service.evaluate_threshold(threshold)['eventCount'] >= len(ingested)
+    service.set_detection_threshold(threshold)
+    assert service.event_store.query() == ingested
+
+
+def test_readers_never_see_a_partial_store(service, solar_wind):
+    service.process_data_pipeline(solar_wind)
+    threshold = service.detection_threshold
+    counts = set()
+    for candidate in (threshold, threshold + 0.1):
+        service.set_detection_threshold(candidate)
+        counts.add(len(service.event_store.query()))
+
+    stop = threading.Event()
+
+    def toggle():
+        while not stop.is_set():
+            service.set_detection_threshold(threshold + 0.1)
+            service.set_detection_threshold(threshold)
+
+    writer = threading.Thread(target=toggle)
+    writer.start()
+    try:
+        for _ in range(2000):
+            assert len(service.event_store.query()) in counts
+            service.get_anomaly_detections(limit=None)
+    finally:
+        stop.set()
+        writer.join()
+
+
+def test_load_model_swaps_scores_and_events_together(service, solar_wind, model_registry):
+    service.process_data_pipeline(solar_wind)
+    heuristic = service.detection
+
+    artifact = service.load_model()
+    assert service.model is artifact
+    assert service.detection is not heuristic
+    assert service.detection.features is heuristic.features
+    assert service.detection_threshold == artifact.thresholds['enter']
+    assert service.event_detector.exit_threshold == artifact.thresholds['exit']
+    assert service.anomaly_scores.equals(artifact.score(service.current_data))
+
+
+def test_workers_serve_the_model_the_ingestor_published(tmp_path, solar_wind, model_registry):
+    plane = DataPlane(str(tmp_path / 'plane'))
+    ingestor = DataService(str(tmp_path))
+    ingestor.load_real_data = lambda: solar_wind
+    ingest_once(ingestor, plane)
+
+    worker = DataService(str(tmp_path))
+    worker.attach_data_plane(DataPlane(str(tmp_path / 'plane')))
+    status = worker.get_model_status()
+    assert worker.model is None
+    assert status['status'] == 'active' and status['version'] == '1'
+    assert worker.detection_threshold == status['thresholds']['enter']
+    assert np.array_equal(worker.anomaly_scores.to_numpy(), ingestor.anomaly_scores.to_numpy(dtype=float))
+    # The sample records are mapped from the snapshot, not rebuilt
+    records = worker.sample_records()
+    assert isinstance(records, np.memmap) and not records.flags.writeable
+    assert records.tobytes() == ingestor.sample_records().tobytes()
+    assert np.shares_memory(worker.get_real_time_data(hours=1), records)
+
+    # Activating a version repoints the registry; the ingestor follows it on its next run
+    manifest = model_registry.load(1).manifest
+    version = model_registry.save(model_registry.load(1).weights, manifest['feature_names'],
+                                  manifest['architecture'], manifest['scaler'], manifest['score_scale'])
+    assert ingestor.model_outdated()
+    ingest_once(ingestor, plane)
+    worker.sync()
+    assert worker.get_model_status()['version'] == str(version)
+
+
+def test_probes_do_not_count_against_availability():
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    before = main.data_service._availability()
+    # Not warmed up (no lifespan), so /ready answers 503
+    assert client.get('/ready').status_code == 503
+    assert client.get('/health').status_code == 200
+    assert main.data_service._availability() == before
+
+
+def test_admin_endpoints_need_a_configured_token(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', None)
+    assert client.get('/api/admin/profiles').status_code == 404
+
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', 'secret')
+    assert client.get('/api/admin/profiles').status_code == 403
+    assert client.get('/api/admin/profiles', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert client.get('/api/admin/profiles', headers={'X-Admin-Token': 'secret'}).status_code == 200
+
+
+def test_pipeline_profile_leaves_served_data_alone(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(main, 'profiler', Profiler(str(tmp_path / 'profiles'), max_artifacts=2))
+    served = main.data_service.detection
+    version = main.data_service.data_version
+
+    client = TestClient(main.app)
+    ids = []
+    for _ in range(3):
+        response = client.post('/api/admin/profile/pipeline', headers={'X-Admin-Token': 'secret'})
+        assert response.status_code == 200
+        ids.append(response.json()['id'])
+
+    assert main.data_service.detection is served
+    assert main.data_service.data_version == version
+    # Only the newest artifacts are kept
+    assert [a['id'] for a in main.profiler.list_artifacts()] == ids[:0:-1]
+
+
+def test_cached_pipeline_metrics_follow_a_pipeline_run(service, solar_wind, monkeypatch):
+    from response_cache import ResponseCache
+
+    cache = ResponseCache()
+
+    def metrics_body():
+        key = ('/api/data-pipeline/metrics', service.data_version)
+        cached = cache.get(key)
+        if cached is None:
+            cached = cache.put(key, repr(service.get_data_metrics()).encode())
+        return cached.body
+
+    # A request served while the pipeline is updating the quality metrics
+    update = service._update_quality_metrics
+
+    def update_during_request(flags):
+        metrics_body()
+        update(flags)
+
+    monkeypatch.setattr(service, '_update_quality_metrics', update_during_request)
+    service.process_data_pipeline(solar_wind.iloc[:12 * 60])
+    gappy = solar_wind.iloc[12 * 60:].copy()
+    gappy.iloc[::3, 0] = np.nan
+    service.process_data_pipeline(gappy)
+
+    assert service.get_data_metrics()['missingDataRate'] > 30
+    assert metrics_body() == repr(service.get_data_metrics()).encode()
+
+
+def test_detection_metrics_keep_live_and_evaluated_counts_apart(service, solar_wind):
+    service.process_data_pipeline(solar_wind)
+    live = service.get_detection_metrics()['liveDetections']
+    assert live >= len(service.event_store.query())
+
+    os.makedirs(os.path.dirname(service.evaluation_report_path))
+    with open(service.evaluation_report_path, 'w') as f:
+        json.dump({'generatedAt': '2026-01-01T00:00:00', 'source': 'synthetic', 'modelVersion': None, 'sweep': [{
+            'threshold': service.detection_threshold, 'eventTruePositives': 18, 'eventFalsePositives': 2,
+            'eventPrecision': 0.9, 'eventRecall': 0.9, 'eventF1': 0.9, 'latencyMinutes': 12.0,
+        }]}, f)
+    metrics = service.get_detection_metrics()
+    assert metrics['liveDetections'] == live
+    assert metrics['totalDetections'] == metrics['truePositives'] + metrics['falsePositives'] == 20
+
+
+def test_kalman_smoothing_is_configured_from_the_environment(tmp_path, monkeypatch):
+    assert not DataService(str(tmp_path)).kalman_smoothing
+    monkeypatch.setenv('PIGADE_KALMAN_SMOOTHING', '1')
+    assert DataService(str(tmp_path)).kalman_smoothing
+    monkeypatch.setenv('PIGADE_KALMAN_SMOOTHING', '0')
+    assert not DataService(str(tmp_path)).kalman_smoothing
+
+
+def test_probes_answer_while_a_slow_warm_up_runs(tmp_path, monkeypatch, solar_wind):
+    import httpx
+    import main
+
+    service = DataService(str(tmp_path))
+    loading = threading.Event()
+
+    def slow_load():
+        loading.set()
+        time.sleep(1.0)
+        return solar_wind
+
+    service.load_real_data = slow_load
+    monkeypatch.setattr(main, 'data_service', service)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            # As the app lifespan does
+            warm_up = loop.run_in_executor(None, service.warm_up)
+            await loop.run_in_executor(None, loading.wait)
+            started = time.perf_counter()
+            data = asyncio.ensure_future(client.get('/api/real-time/data?hours=1'))
+            await asyncio.sleep(0.05)
+            ready, health = await client.get('/ready'), await client.get('/health')
+            probe_seconds = time.perf_counter() - started
+            await warm_up
+            return ready, health, probe_seconds, await data
+
+    ready, health, probe_seconds, data = asyncio.run(run())
+    # The data request waits for the warm-up without holding up the probes
+    assert ready.status_code == 503 and health.status_code == 200
+    assert probe_seconds < 0.5
+    assert data.status_code == 200 and len(data.json()) == 60
+
+
+def test_failed_activation_keeps_the_current_model(tmp_path, monkeypatch, solar_wind, model_registry):
+    from fastapi.testclient import TestClient
+    import main
+
+    service = DataService(str(tmp_path))
+    service.process_data_pipeline(solar_wind)
+    service.load_model()
+    monkeypatch.setattr(main, 'data_service', service)
+    served = service.detection
+
+    # A version whose weights were cut short, as by an interrupted copy
+    artifact = model_registry.load(1)
+    version = model_registry.save(artifact.weights, artifact.manifest['feature_names'],
+                                  artifact.manifest['architecture'], artifact.manifest['scaler'],
+                                  artifact.manifest['score_scale'], activate=False)
+    weights = os.path.join(model_registry._version_dir(version), 'weights.npz')
+    with open(weights, 'rb') as f:
+        data = f.read()
+    with open(weights, 'wb') as f:
+        f.write(data[:len(data) // 2])
+
+    client = TestClient(main.app)
+    response = client.post('/api/model/activate', params={'version': version})
+    assert response.status_code >= 400
+    assert model_registry.current_version() == 1
+    assert service.model.version == 1 and service.detection is served
+
+    assert client.post('/api/model/activate', params={'version': 99}).status_code == 404
+    assert model_registry.current_version() == 1
+
+
+@pytest.mark.parametrize('model_type', ['dense', 'temporal'])
+def test_incremental_scoring_matches_a_full_rescore(service, solar_wind, model_registry, model_type):
+    rng = np.random.default_rng(11)
+    if model_type == 'temporal':
+        weights, architecture = temporal_weights(rng), {'type': 'temporal', 'units': 6}
+    else:
+        weights, architecture = dense_weights(rng), {}
+    manifest = model_registry.load(1).manifest
+    model_registry.save(weights, MODEL_FEATURES, {**manifest['architecture'], **architecture},
+                        manifest['scaler'], score_scale=1.0)
+    artifact = service.load_model()
+    assert artifact.model_type == model_type
+
+    # A gap and spikes near the ends of some of the windows, whose cleaning later samples revise
+    raw = solar_wind.copy()
+    raw.iloc[1000:1040] = np.nan
+    raw.iloc[[1290, 1300, 1301], 0] *= 30
+    for end in (600, 990, 1010, 1050, 1295, 1302, 1330, 1700, len(raw)):
+        service.process_data_pipeline(raw.iloc[:end])
+        expected = artifact.score(service.current_data)
+        np.testing.assert_allclose(service.anomaly_scores.to_numpy(), expected.to_numpy(), rtol=1e-5)
+        assert service.anomaly_scores.index.equals(expected.index)
+
+
+def test_placeholder_explanation_is_not_reported_as_a_pipeline_stage():
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    assert client.get('/api/xai/explanation/1').status_code == 200
+    assert 'stage="explain"' not in client.get('/metrics').text
+
+
+def test_recent_detections_report_the_ongoing_event(service, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    rng = np.random.default_rng(3)
+    df = generate_solar_wind(hours=24, end=pd.Timestamp('2026-01-01'), rng=rng)
+    df, labels = inject_cme_events(df, 2, min_hours=2, max_hours=3, rng=rng)
+    # Cut the data off in the middle of the last CME, so its event is still open
+    last = labels.iloc[-1]
+    service.process_data_pipeline(df[df.index < last['start'] + (last['end'] - last['start']) / 2])
+    monkeypatch.setattr(main, 'data_service', service)
+    client = TestClient(main.app)
+
+    detections = client.get('/api/anomaly-detection/recent', params={'limit': 1}).json()
+    assert len(detections) == 1 and detections[0]['status'] == 'ongoing'
+    ongoing = detections[0]
+    assert pd.Timestamp(ongoing['endTime']) >= pd.Timestamp(ongoing['startTime'])
+    assert ongoing['durationMinutes'] >= 0
+    assert client.get('/api/anomaly-detection/recent').json()[-1] == ongoing
+
+    for limit in (0, -1, main.MAX_DETECTIONS_LIMIT + 1):
+        assert client.get('/api/anomaly-detection/recent', params={'limit': limit}).status_code == 422
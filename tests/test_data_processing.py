@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pigade.data_processing.preprocessing import (QC_HAMPEL, QC_MISSING, QC_SPIKE, StreamingCleaner,
+                                                  clean_solar_wind)
+from pigade.data_processing.synthetic import generate_solar_wind
+
+
+@pytest.fixture
+def glitchy_solar_wind():
+    """Two days of one-minute solar wind with spikes, outliers and gaps"""
+    rng = np.random.default_rng(5)
+    df = generate_solar_wind(hours=48, end=pd.Timestamp('2026-01-03'), rng=rng)
+    values = df.to_numpy(dtype=float, copy=True)
+    rows = rng.choice(len(df), 60, replace=False)
+    values[rows, rng.integers(0, values.shape[1], 60)] *= rng.choice([0.05, 20.0], 60)
+    values[rng.random(values.shape) < 0.02] = np.nan
+    return pd.DataFrame(values, index=df.index, columns=df.columns)
+
+
+@pytest.mark.parametrize('kalman', [False, True])
+def test_chunked_cleaning_matches_one_pass(glitchy_solar_wind, kalman):
+    # One call with the whole series as window context
+    reference = StreamingCleaner(kalman=kalman)
+    expected, expected_flags = reference._clean(glitchy_solar_wind, 0, len(glitchy_solar_wind))
+    assert (expected_flags & QC_SPIKE).any() and (expected_flags & QC_HAMPEL).any()
+    assert (expected_flags & QC_MISSING).any()
+
+    # Chunks shorter than the filter lag, and some empty ones
+    cleaner = StreamingCleaner(kalman=kalman)
+    bounds = np.cumsum(np.random.default_rng(0).integers(0, 40, 200))
+    bounds = [0, *bounds[bounds < len(glitchy_solar_wind)], len(glitchy_solar_wind)]
+    parts = [cleaner.process(glitchy_solar_wind.iloc[i:j]) for i, j in zip(bounds, bounds[1:])]
+    parts.append(cleaner.flush())
+    streamed = pd.concat([part[0] for part in parts])
+    streamed_flags = pd.concat([part[1] for part in parts])
+    pd.testing.assert_frame_equal(streamed, expected)
+    pd.testing.assert_series_equal(streamed_flags, expected_flags)
+
+    batch, batch_flags = clean_solar_wind(glitchy_solar_wind, kalman=kalman, chunk_size=1000)
+    pd.testing.assert_frame_equal(batch, expected)
+    pd.testing.assert_series_equal(batch_flags, expected_flags)
+
+
+def test_cleaning_empty_input_keeps_columns(glitchy_solar_wind):
+    cleaned, flags = clean_solar_wind(glitchy_solar_wind.iloc[:0])
+    pd.testing.assert_frame_equal(cleaned, glitchy_solar_wind.iloc[:0])
+    assert flags.dtype == np.uint8 and flags.index.equals(glitchy_solar_wind.index[:0])
@@ -0,0 +1,155 @@
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pigade.detection.events import CMEEvent, EventStore, StreamingEventDetector
+from pigade.detection.metrics import event_metrics, labels_from_intervals, pointwise_threshold_sweep
+from pigade.detection.thresholds import ScoreIndex
+
+
+def _noisy_scores(n: int = 5000, seed: int = 0) -> pd.Series:
+    """Scores that drift in and out of the thresholds, with gaps in the time axis and some NaN"""
+    rng = np.random.default_rng(seed)
+    steps = rng.choice([1, 1, 1, 1, 2, 15], size=n)
+    index = pd.Timestamp('2026-01-01') + pd.to_timedelta(np.cumsum(steps), unit='min')
+    scores = np.clip(0.5 + 0.3 * np.sin(np.arange(n) / 40.0) + rng.normal(0, 0.12, n), 0, 1)
+    scores[rng.random(n) < 0.01] = np.nan
+    return pd.Series(scores, index=index)
+
+
+def _events(detector: StreamingEventDetector, scores: pd.Series, chunks=None):
+    events = []
+    if chunks is None:
+        for timestamp, score in scores.items():
+            events.extend(detector.update(timestamp, score))
+    else:
+        for part in np.array_split(np.arange(len(scores)), chunks):
+            events.extend(detector.process(scores.index[part], scores.to_numpy()[part]))
+    return events + detector.flush()
+
+
+def _assert_same_events(actual, expected):
+    # The vectorized path sums scores in a different order, so means can differ in the last bit
+    assert [replace(e, mean_score=0.0) for e in actual] == [replace(e, mean_score=0.0) for e in expected]
+    np.testing.assert_allclose([e.mean_score for e in actual], [e.mean_score for e in expected], rtol=1e-12)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_vectorized_segmentation_matches_sample_by_sample(seed):
+    scores = _noisy_scores(seed=seed)
+    streamed = _events(StreamingEventDetector(), scores)
+    vectorized = _events(StreamingEventDetector(), scores, chunks=1)
+    assert streamed
+    _assert_same_events(vectorized, streamed)
+
+
+def test_chunked_processing_matches_one_pass():
+    scores = _noisy_scores()
+    one_pass = _events(StreamingEventDetector(), scores, chunks=1)
+    _assert_same_events(_events(StreamingEventDetector(), scores, chunks=7), one_pass)
+
+
+def test_resumed_detector_matches_one_pass():
+    scores = _noisy_scores()
+    one_pass = _events(StreamingEventDetector(), scores, chunks=1)
+
+    # Checkpoint halfway, as the backfill does, and resume in a new detector
+    half = len(scores) // 2
+    first = StreamingEventDetector()
+    events = first.process(scores.index[:half], scores.to_numpy()[:half])
+    resumed = StreamingEventDetector()
+    resumed.set_state(first.get_state())
+    events += resumed.process(scores.index[half:], scores.to_numpy()[half:]) + resumed.flush()
+    _assert_same_events(events, one_pass)
+
+
+def test_hysteresis_merges_dips_and_drops_transients():
+    index = pd.date_range('2026-01-01', periods=60, freq='1min')
+    scores = np.zeros(60)
+    scores[5:20] = 0.8
+    scores[10:12] = 0.55  # between exit and enter: the event stays open
+    scores[20:23] = 0.2   # below exit for 3 minutes, within max_gap: not counted
+    scores[23:30] = 0.7   # re-enters: merged into the first event
+    scores[50:52] = 0.9   # 1 minute long, past max_gap: a transient
+    events = _events(StreamingEventDetector(enter_threshold=0.65, exit_threshold=0.5), pd.Series(scores, index))
+
+    assert len(events) == 1
+    event = events[0]
+    assert (event.start, event.end) == (index[5], index[29])
+    assert event.peak_score == 0.8 and event.n_samples == 22
+
+
+def test_exit_threshold_must_not_exceed_enter():
+    with pytest.raises(ValueError):
+        StreamingEventDetector(enter_threshold=0.5, exit_threshold=0.6)
+
+
+def test_event_store_queries_by_overlap():
+    start = pd.Timestamp('2026-01-01')
+    store = EventStore()
+    store.extend([
+        CMEEvent(i + 1, start + pd.Timedelta(hours=2 * i), start + pd.Timedelta(hours=2 * i, minutes=30),
+                 start + pd.Timedelta(hours=2 * i + 1), 0.8, 0.7, 60)
+        for i in range(5)
+    ])
+
+    assert [e.event_id for e in store.query(start + pd.Timedelta(hours=3), start + pd.Timedelta(hours=4))] == [2, 3]
+    assert store.count(start + pd.Timedelta(hours=8, minutes=30)) == 1
+    assert [e.event_id for e in store.latest(2)] == [4, 5]
+
+
+def test_score_index_counts_above_thresholds():
+    scores = np.array([0.1, 0.5, np.nan, 0.7, 0.5, 0.9])
+    index = ScoreIndex(scores[:3])
+    index.add(scores[3:])
+    assert len(index) == 5
+    assert list(index.count_above([0.0, 0.5, 0.9])) == [5, 2, 0]
+    assert index.fraction_above(0.5) == pytest.approx(0.4)
+
+
+def test_labels_from_intervals_are_inclusive():
+    index = pd.date_range('2026-01-01', periods=10, freq='1min')
+    intervals = pd.DataFrame({'start': [index[1], index[6]], 'end': [index[3], index[6]]})
+    assert labels_from_intervals(index, intervals).tolist() == [
+        False, True, True, True, False, False, True, False, False, False
+    ]
+    assert not labels_from_intervals(index, intervals.iloc[:0]).any()
+
+
+def test_pointwise_sweep_matches_direct_counts():
+    rng = np.random.default_rng(0)
+    scores = rng.random(1000)
+    scores[::50] = np.nan
+    labels = rng.random(1000) < 0.2
+    thresholds = [0.0, 0.25, 0.5, 0.9]
+    sweep = pointwise_threshold_sweep(scores, labels, thresholds)
+    for i, threshold in enumerate(thresholds):
+        predicted = scores > threshold
+        assert sweep['tp'][i] == np.sum(predicted & labels)
+        assert sweep['fp'][i] == np.sum(predicted & ~labels)
+        assert sweep['fn'][i] == np.sum(~predicted & labels)
+
+
+def test_event_metrics_count_overlaps_and_latency():
+    start = pd.Timestamp('2026-01-01')
+
+    def event(event_id, begin, end):
+        return CMEEvent(event_id, start + pd.Timedelta(minutes=begin), start + pd.Timedelta(minutes=begin),
+                        start + pd.Timedelta(minutes=end), 0.8, 0.7, end - begin)
+
+    truth = pd.DataFrame({
+        'start': [start + pd.Timedelta(minutes=m) for m in (0, 100, 200)],
+        'end': [start + pd.Timedelta(minutes=m) for m in (60, 160, 260)],
+    })
+    # Finds the first event 10 minutes late and the second one early, misses the third,
+    # and raises one false alarm
+    detected = [event(1, 10, 70), event(2, 95, 150), event(3, 400, 420)]
+    metrics = event_metrics(detected, truth)
+
+    assert (metrics['tp'], metrics['fp'], metrics['fn']) == (2, 1, 1)
+    assert metrics['precision'] == pytest.approx(2 / 3)
+    assert metrics['recall'] == pytest.approx(2 / 3)
+    assert metrics['start_error_minutes'] == pytest.approx(7.5)
+    assert metrics['latency_minutes'] == pytest.approx(5.0)
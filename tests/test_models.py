@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from conftest import MODEL_FEATURES, dense_weights, temporal_weights
+from pigade.models.runtime import NumpyTemporalVAE, NumpyVAE, compare_errors, quantize_weights
+
+
+def test_registry_round_trip(model_registry):
+    artifact = model_registry.load()
+    assert artifact.version == model_registry.current_version() == 1
+    assert artifact.feature_names == MODEL_FEATURES
+    assert artifact.manifest['architecture'].items() >= {'original_dim': 5, 'latent_dim': 2,
+                                                         'intermediate_dim': 8}.items()
+    assert artifact.thresholds == {'enter': 0.7, 'exit': 0.55} and artifact.manifest['score_scale'] == 0.1
+    expected = dense_weights(np.random.default_rng(0))
+    assert artifact.weights.keys() == expected.keys()
+    for name, value in expected.items():
+        np.testing.assert_array_equal(artifact.weights[name], value)
+
+    version = model_registry.save(dense_weights(np.random.default_rng(1)), MODEL_FEATURES,
+                                  artifact.manifest['architecture'], artifact.manifest['scaler'], 0.2,
+                                  activate=False)
+    assert (version, model_registry.current_version()) == (2, 1)
+    model_registry.activate(version)
+    assert model_registry.load().manifest['score_scale'] == 0.2
+    with pytest.raises(KeyError):
+        model_registry.activate(3)
+
+
+def test_exported_runtime_is_loaded_at_its_precision(model_registry):
+    with pytest.raises(KeyError):
+        model_registry.load(1, precision='int8')
+
+    model_registry.export_runtime(1, 'int8', {'maxScoreDifference': 0.01})
+    quantized = model_registry.load(1)
+    assert quantized.precision == 'int8' and quantized.manifest['runtime']['accuracy'] == {'maxScoreDifference': 0.01}
+    assert quantized.runtime_weights['encoder/hidden/kernel'].dtype == np.int8
+    np.testing.assert_array_equal(quantized.weights['encoder/hidden/kernel'],
+                                  dense_weights(np.random.default_rng(0))['encoder/hidden/kernel'])
+    assert model_registry.load(1, precision='float32').precision == 'float32'
+
+
+def _reference_errors(weights: dict, x: np.ndarray) -> np.ndarray:
+    """The dense VAE's deterministic forward pass in float64"""
+    w = {name: value.astype(np.float64) for name, value in weights.items()}
+    h = np.maximum(x @ w['encoder/hidden/kernel'] + w['encoder/hidden/bias'], 0)
+    z = h @ w['encoder/z_mean/kernel'] + w['encoder/z_mean/bias']
+    h = np.maximum(z @ w['decoder/hidden/kernel'] + w['decoder/hidden/bias'], 0)
+    reconstructed = 1 / (1 + np.exp(-(h @ w['decoder/output/kernel'] + w['decoder/output/bias'])))
+    return np.mean(np.square(x - reconstructed), axis=1)
+
+
+@pytest.mark.parametrize('precision, tolerance', [('float32', 1e-6), ('float16', 0.01), ('int8', 0.05)])
+def test_runtime_matches_the_reference_forward_pass(precision, tolerance):
+    weights = dense_weights(np.random.default_rng(0))
+    x = np.random.default_rng(1).random((500, 5))
+    reference = _reference_errors(weights, x)
+    runtime = NumpyVAE(quantize_weights(weights, precision), precision)
+
+    accuracy = compare_errors(reference, runtime.reconstruction_error(x), score_scale=0.1, threshold=0.7)
+    assert accuracy['maxScoreDifference'] < tolerance
+    assert accuracy['thresholdAgreement'] > 0.95
+
+
+def test_temporal_runtime_carries_state_across_chunks():
+    rng = np.random.default_rng(0)
+    weights = temporal_weights(rng)
+    runtime = NumpyTemporalVAE(quantize_weights(weights, 'float32'))
+    x = rng.random((300, 5))
+    one_pass, final_state = runtime.run(x)
+
+    errors, state = [], None
+    for chunk in np.array_split(x, [1, 50, 51, 200]):
+        error, state = runtime.run(chunk, state)
+        errors.append(error)
+    np.testing.assert_allclose(np.concatenate(errors), one_pass, rtol=1e-6)
+    np.testing.assert_allclose(state, final_state, rtol=1e-6)
+
+
+def test_concurrent_saves_get_distinct_versions(model_registry):
+    manifest = model_registry.load(1).manifest
+    weights = model_registry.load(1).weights
+
+    def save(_):
+        return model_registry.save(weights, MODEL_FEATURES, manifest['architecture'], manifest['scaler'],
+                                   manifest['score_scale'], activate=False)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        versions = list(pool.map(save, range(16)))
+
+    assert sorted(versions) == list(range(2, 18))
+    assert [entry['version'] for entry in model_registry.versions()] == list(range(1, 18))
@@ -0,0 +1,117 @@
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import infer
+import sweep
+from pigade.data_processing.synthetic import generate_solar_wind, inject_cme_events
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    """Six daily archive files of raw solar wind with CME signatures"""
+    rng = np.random.default_rng(7)
+    df = generate_solar_wind(hours=6 * 24, end=pd.Timestamp('2026-01-06 23:59'), rng=rng)
+    df, _ = inject_cme_events(df, 3, min_hours=2, max_hours=4, rng=rng)
+    directory = tmp_path / 'archive'
+    directory.mkdir()
+    for day, part in df.groupby(df.index.floor('D')):
+        part.to_pickle(directory / f'swis_{day:%Y%m%d}.cdf')
+
+    def read_archive_file(path):
+        return pd.DataFrame() if path is None else pd.read_pickle(path)
+
+    # Stand-in for the CDF reader; the backfill's worker processes are forked with it in place
+    monkeypatch.setattr(infer, '_load', read_archive_file)
+    return str(directory)
+
+
+def _scores(output_dir: str) -> pd.Series:
+    paths = sorted(glob.glob(os.path.join(output_dir, 'scores', 'chunk_*.csv')))
+    return pd.concat([pd.read_csv(path, index_col=0, parse_dates=True).iloc[:, 0] for path in paths])
+
+
+def test_backfill_resumes_after_an_interruption(archive, tmp_path, monkeypatch):
+    one_pass = str(tmp_path / 'one_pass')
+    expected = infer.backfill(archive, one_pass, workers=2, files_per_chunk=1)
+    assert expected['complete'] and expected['next_chunk'] == 6
+
+    class Interrupted(Exception):
+        pass
+
+    write_events = infer._write_events
+
+    def interrupt_at_chunk_3(path, events):
+        if os.path.basename(path) == 'chunk_000003.csv':
+            raise Interrupted
+        write_events(path, events)
+
+    output = str(tmp_path / 'resumed')
+    monkeypatch.setattr(infer, '_write_events', interrupt_at_chunk_3)
+    with pytest.raises(Interrupted):
+        infer.backfill(archive, output, workers=2, files_per_chunk=1)
+    assert infer._load_checkpoint(output)['next_chunk'] == 3
+
+    monkeypatch.setattr(infer, '_write_events', write_events)
+    resumed = infer.backfill(archive, output, workers=2, files_per_chunk=1)
+    assert resumed['rows'] == expected['rows'] and resumed['bytes'] == expected['bytes']
+    pd.testing.assert_series_equal(_scores(output), _scores(one_pass))
+    events = pd.read_csv(os.path.join(output, 'events.csv'))
+    assert len(events)
+    pd.testing.assert_frame_equal(events, pd.read_csv(os.path.join(one_pass, 'events.csv')))
+
+    # A checkpoint is only resumed with the chunking it was written with
+    with pytest.raises(ValueError):
+        infer.backfill(archive, output, workers=2, files_per_chunk=2)
+
+
+def test_successive_halving_promotes_the_best_of_each_rung(tmp_path):
+    configs = [{'latentDim': 2, 'intermediateDim': 8, 'physicsWeight': weight}
+               for weight in np.linspace(0.0, 0.8, 9)]
+    budgets = {}
+
+    def trial(task):
+        budgets.setdefault(task['trial_id'], []).append(task['epochs'])
+        # A larger physics weight ranks higher
+        weight = task['config']['physicsWeight']
+        return {'epochsTrained': task['epochs'], 'valLoss': 1.0 - weight, 'eventF1': weight}
+
+    settings = {
+        'data_dir': str(tmp_path), 'trials_dir': str(tmp_path / 'trials'), 'min_epochs': 2, 'max_epochs': 18,
+        'eta': 3, 'patience': 2, 'batch_size': 32, 'seed': 0, 'n_thresholds': 10, 'rank_by': 'eventF1',
+    }
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        trials = sweep.successive_halving(configs, executor, settings, trial_fn=trial)
+
+    # 9 trials at 2 epochs, the best 3 continue to 6 and the best one to 18
+    rungs = {trial['trialId']: trial['rung'] for trial in trials}
+    assert sorted(rungs.values()) == [0] * 6 + [1] * 2 + [2]
+    assert [rungs[i] for i in (6, 7, 8)] == [1, 1, 2]
+    assert budgets[8] == [2, 4, 12] and budgets[6] == [2, 4] and budgets[0] == [2]
+    assert {trial['trialId']: trial['epochs'] for trial in trials}[8] == 18
+
+
+def test_backfill_refuses_a_checkpoint_scored_differently(archive, tmp_path, model_registry):
+    output = str(tmp_path / 'backfill')
+    plain = infer.backfill(archive, output, workers=2, files_per_chunk=3)
+    assert plain['thresholds'] == [0.65, 0.5] and not plain['kalman']
+    heuristic = _scores(output)
+
+    # Resuming must not mix scores, thresholds or cleaning settings
+    with pytest.raises(ValueError, match='model version'):
+        infer.backfill(archive, output, workers=2, files_per_chunk=3, model=model_registry.load(1))
+    with pytest.raises(ValueError, match='thresholds'):
+        infer.backfill(archive, output, workers=2, files_per_chunk=3, enter_threshold=0.8)
+    with pytest.raises(ValueError, match='kalman'):
+        infer.backfill(archive, output, workers=2, files_per_chunk=3, kalman=True)
+    assert infer.backfill(archive, output, workers=2, files_per_chunk=3) == plain
+
+    # The Kalman setting reaches the cleaning step in the workers
+    smoothed = infer.backfill(archive, output, workers=2, files_per_chunk=3, kalman=True, restart=True)
+    assert smoothed['kalman'] and smoothed['rows'] == plain['rows']
+    kalman_scores = _scores(output)
+    assert kalman_scores.index.equals(heuristic.index) and not np.allclose(kalman_scores, heuristic)
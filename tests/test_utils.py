@@ -0,0 +1,38 @@
+import pytest
+
+from pigade.utils.instrumentation import Histogram, MetricsRegistry
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+    for value in (0.05, 0.1, 0.5, 0.5, 2.0, 20.0):
+        histogram.observe(value)
+
+    # Bounds are inclusive upper limits, like Prometheus `le` buckets; the last bucket is overflow
+    assert histogram.counts == [2, 2, 1, 1]
+    assert histogram.count == 6 and histogram.mean == pytest.approx(23.15 / 6)
+    # The median (rank 3) lies halfway through the second bucket
+    assert histogram.quantile(0.5) == pytest.approx(0.55)
+    assert histogram.quantile(1.0) == 10.0
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_prometheus_text_has_cumulative_buckets_and_escaped_labels():
+    metrics = MetricsRegistry()
+    metrics.describe('request_seconds', 'Request latency')
+    metrics.inc('requests_total', endpoint='/a', status='200')
+    metrics.inc('requests_total', 2, endpoint='/a', status='200')
+    for value in (0.05, 0.5, 20.0):
+        metrics.observe('request_seconds', value, endpoint='/a "b"')
+    lines = metrics.render_prometheus().splitlines()
+
+    assert '# TYPE requests_total counter' in lines
+    assert 'requests_total{endpoint="/a",status="200"} 3' in lines
+    assert lines.index('# HELP request_seconds Request latency') + 1 == lines.index('# TYPE request_seconds histogram')
+    buckets = [line for line in lines if line.startswith('request_seconds_bucket')]
+    assert buckets[0] == 'request_seconds_bucket{endpoint="/a \\"b\\"",le="0.0005"} 0'
+    assert buckets[-1] == 'request_seconds_bucket{endpoint="/a \\"b\\"",le="+Inf"} 3'
+    cumulative = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+    assert cumulative == sorted(cumulative)
+    assert 'request_seconds_count{endpoint="/a \\"b\\""} 3' in lines
+    assert any(line.startswith('process_resident_memory_bytes ') for line in lines)